@@ -0,0 +1,69 @@
+import time
+from django.core.cache import cache
+
+
+def _clave_version(clave):
+    return f"{clave}:version"
+
+
+def _clave_modificacion(clave):
+    return f"{clave}:modificado"
+
+
+def obtener_version(clave):
+    """
+    Devuelve la versión actual asociada a `clave`.
+    Se usa para armar claves de cache que quedan obsoletas al incrementar la versión.
+    """
+    clave_version = _clave_version(clave)
+    version = cache.get(clave_version)
+    if version is None:
+        # Inicializamos con un valor basado en el tiempo: si la entrada se pierde
+        # del cache nunca se vuelve a usar una versión que ya fue servida.
+        cache.add(clave_version, time.time_ns(), None)
+        version = cache.get(clave_version)
+    return version
+
+
+def incrementar_version(clave):
+    """
+    Invalida todas las entradas de cache construidas con la versión actual de `clave`.
+    """
+    clave_version = _clave_version(clave)
+    cache.set(_clave_modificacion(clave), int(time.time()), None)
+    try:
+        return cache.incr(clave_version)
+    except ValueError:
+        # La versión no existía (o fue desalojada): arrancamos una nueva.
+        version = time.time_ns()
+        cache.set(clave_version, version, None)
+        return version
+
+
+def obtener_modificacion(clave):
+    """
+    Momento (timestamp en segundos) del último incremento de la versión de `clave`.
+    Si no se registró ninguno se toma el momento de la consulta, así nunca se informa
+    una fecha anterior a un cambio real.
+    """
+    clave_modificacion = _clave_modificacion(clave)
+    modificado = cache.get(clave_modificacion)
+    if modificado is None:
+        cache.add(clave_modificacion, int(time.time()), None)
+        modificado = cache.get(clave_modificacion)
+    return modificado
+
+
+def obtener_validadores(claves):
+    """
+    (versiones, última modificación) de varias claves con una sola lectura del cache en
+    el caso habitual; las que falten se inicializan como en obtener_version().
+    """
+    nombres = {_clave_version(clave) for clave in claves} | {_clave_modificacion(clave) for clave in claves}
+    valores = cache.get_many(nombres)
+    versiones = []
+    modificaciones = []
+    for clave in claves:
+        versiones.append(valores.get(_clave_version(clave)) or obtener_version(clave))
+        modificaciones.append(valores.get(_clave_modificacion(clave)) or obtener_modificacion(clave))
+    return versiones, max(modificaciones, default=int(time.time()))
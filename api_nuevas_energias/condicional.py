@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .cache import obtener_validadores
+
+
+class CatalogoCondicionalMixin:
+    """
+    GET condicional para catálogos que cambian poco (ver CATALOGOS_CACHE_SEGUNDOS).
+
+    El ETag y el Last-Modified salen de los contadores de versión de `claves_version`,
+    que incrementan las señales de los modelos del catálogo (ver api_nuevas_energias/cache.py).
+    Si el cliente ya tiene la versión vigente (If-None-Match / If-Modified-Since) se
+    responde 304 sin ejecutar el queryset ni el serializer; la autenticación y los
+    permisos se comprueban igual, antes de llegar al método.
+
+    `cache_publica` permite que proxies compartidos guarden la respuesta: solo para
+    catálogos sin datos personales.
+    """
+    claves_version = ()
+    cache_publica = False
+
+    def list(self, request, *args, **kwargs):
+        return self._responder_condicional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._responder_condicional(super().retrieve, request, *args, **kwargs)
+
+    def _responder_condicional(self, generar, request, *args, **kwargs):
+        versiones, modificado = obtener_validadores(self.claves_version)
+        # El formato entra en el ETag: la misma URL puede devolver JSON o la API navegable.
+        etag = quote_etag('-'.join([request.accepted_renderer.format, *map(str, versiones)]))
+        respuesta = get_conditional_response(request, etag=etag, last_modified=modificado)
+        if respuesta is None:
+            respuesta = generar(request, *args, **kwargs)
+        if respuesta.status_code in (200, 304):
+            respuesta['ETag'] = etag
+            respuesta['Last-Modified'] = http_date(modificado)
+            segundos = getattr(settings, 'CATALOGOS_CACHE_SEGUNDOS', 60)
+            if self.cache_publica:
+                patch_cache_control(respuesta, public=True, max_age=segundos, must_revalidate=True)
+            else:
+                patch_cache_control(respuesta, private=True, max_age=segundos, must_revalidate=True)
+            patch_vary_headers(respuesta, ('Accept',))
+        return respuesta
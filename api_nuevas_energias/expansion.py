@@ -0,0 +1,188 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def _arbol(valor):
+    """'id_empl,descargos.autor' -> {'id_empl': {}, 'descargos': {'autor': {}}}"""
+    arbol = {}
+    for ruta in (valor or '').split(','):
+        nodo = arbol
+        for parte in filter(None, (parte.strip() for parte in ruta.split('.'))):
+            nodo = nodo.setdefault(parte, {})
+    return arbol
+
+
+def _podar(valor, campos):
+    """Deja en `valor` (dict o lista de dicts) solo las claves del árbol `campos`."""
+    if isinstance(valor, list):
+        return [_podar(elemento, campos) for elemento in valor]
+    if not isinstance(valor, dict):
+        return valor
+    return {
+        clave: _podar(dato, campos[clave]) if campos[clave] else dato
+        for clave, dato in valor.items() if clave in campos
+    }
+
+
+def expansiones_pedidas(request):
+    """Árbol de relaciones pedidas con ?expand= (vacío sin request o sin el parámetro)."""
+    parametros = getattr(request, 'query_params', None) or {}
+    return _arbol(parametros.get('expand'))
+
+
+def campos_pedidos(request):
+    """Árbol de campos pedidos con ?fields=, o None si se piden todos."""
+    parametros = getattr(request, 'query_params', None) or {}
+    return _arbol(parametros.get('fields')) or None
+
+
+class CampoExpandible(serializers.Field):
+    """
+    Relación que por defecto se muestra compacta y completa solo si se pide con ?expand=.
+    Se declara como cualquier campo en un serializer con SerializerExpandibleMixin:
+
+        id_empl = CampoExpandible(EmpleadoSerializer, compacto=EmpleadoBasicoSerializer,
+                                  precargar=optimizar_consulta_empleados)
+
+    - serializer: representación completa.
+    - compacto: representación por defecto; sin él se muestra el id (o la lista de ids).
+    - many: la relación es múltiple (los descargos de un incidente).
+    - precargar: función (queryset, prefijo) -> queryset con lo que necesita la
+      representación completa además del select_related/prefetch_related de la relación.
+
+    Es de solo lectura: para escribir la relación se declara aparte un
+    PrimaryKeyRelatedField de solo escritura.
+    """
+
+    def __init__(self, serializer, compacto=None, many=False, precargar=None, **kwargs):
+        self.serializer = serializer
+        self.compacto = compacto
+        self.many = many
+        self.precargar = precargar
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def resolver(self, expandir=None, campos=None):
+        """Campo concreto: completo si `expandir` no es None (subárbol de ?expand=)."""
+        kwargs = {'read_only': True, 'many': self.many}
+        if self.source is not None:
+            kwargs['source'] = self.source
+        if expandir is None:
+            if self.compacto is None:
+                return serializers.PrimaryKeyRelatedField(**kwargs)
+            return self.compacto(**kwargs)
+        if issubclass(self.serializer, SerializerExpandibleMixin):
+            kwargs.update(expandir=expandir, campos=campos)
+        return self.serializer(**kwargs)
+
+
+class SerializerExpandibleMixin:
+    """
+    Mixin para ModelSerializer con relaciones CampoExpandible. En el serializer de la
+    vista (no en los anidados) lee de la request:
+
+    - ?fields=id,estado,id_empl.nombre: solo esos campos en la respuesta. No cambia los
+      campos que se aceptan al escribir.
+    - ?expand=id_empl,descargos.autor: esas relaciones completas; el punto baja un nivel
+      (descargos completos y, dentro de cada uno, el autor completo).
+
+    Las consultas se arman con optimizar_consulta(), que precarga justo lo que se va a
+    serializar según lo pedido.
+    """
+
+    def __init__(self, *args, expandir=None, campos=None, **kwargs):
+        self._expandir = expandir
+        self._campos = campos
+        super().__init__(*args, **kwargs)
+
+    def _es_raiz(self):
+        padre = self.parent
+        if isinstance(padre, serializers.ListSerializer):
+            padre = padre.parent
+        return padre is None
+
+    def _pedido(self):
+        """(expandir, campos) de este serializer."""
+        if self._expandir is None and self._campos is None and self._es_raiz():
+            request = self.context.get('request')
+            return expansiones_pedidas(request), campos_pedidos(request)
+        return self._expandir or {}, self._campos
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expandir, campos = self._pedido()
+        for nombre, campo in fields.items():
+            if isinstance(campo, CampoExpandible):
+                fields[nombre] = campo.resolver(
+                    expandir.get(nombre), (campos or {}).get(nombre) or None,
+                )
+        return fields
+
+    @property
+    def _readable_fields(self):
+        _, campos = self._pedido()
+        for campo in super()._readable_fields:
+            if campos is None or campo.field_name in campos:
+                yield campo
+
+    def to_representation(self, instance):
+        ret = super().to_representation(instance)
+        _, campos = self._pedido()
+        if campos:
+            # Los serializers anidados que no usan este mixin no filtran sus campos.
+            for nombre, subcampos in campos.items():
+                if subcampos and nombre in ret:
+                    ret[nombre] = _podar(ret[nombre], subcampos)
+        return ret
+
+    @classmethod
+    def campos_expandibles(cls):
+        return {nombre: campo for nombre, campo in cls._declared_fields.items() if isinstance(campo, CampoExpandible)}
+
+    @classmethod
+    def optimizar_consulta(cls, queryset, request=None, expandir=None):
+        """
+        Agrega al queryset los select_related/prefetch_related de las relaciones que se
+        van a serializar: las compactas y las expandidas con ?expand= (o `expandir`).
+        Las relaciones múltiples se precargan con un Prefetch cuyo queryset se optimiza
+        igual, así ningún nivel hace una consulta por fila.
+        """
+        if expandir is None:
+            expandir = expansiones_pedidas(request)
+        return cls._optimizar(queryset, expandir, '', queryset.model)
+
+    @classmethod
+    def _optimizar(cls, queryset, expandir, prefijo, modelo):
+        for nombre, campo in cls.campos_expandibles().items():
+            relacion = campo.source or nombre
+            try:
+                relacionado = modelo._meta.get_field(relacion).related_model
+            except FieldDoesNotExist:
+                # No es una relación del modelo (p. ej. un método): no se puede precargar.
+                continue
+            camino = f'{prefijo}__{relacion}' if prefijo else relacion
+            subarbol = expandir.get(nombre)
+
+            if subarbol is None:
+                if campo.many:
+                    queryset = queryset.prefetch_related(camino)
+                elif campo.compacto is not None:
+                    queryset = queryset.select_related(camino)
+                # El id de una clave foránea ya está en la fila.
+                continue
+
+            if campo.many:
+                hijos = relacionado._default_manager.all()
+                if campo.precargar is not None:
+                    hijos = campo.precargar(hijos, '')
+                if issubclass(campo.serializer, SerializerExpandibleMixin):
+                    hijos = campo.serializer._optimizar(hijos, subarbol, '', relacionado)
+                queryset = queryset.prefetch_related(Prefetch(camino, queryset=hijos))
+            else:
+                queryset = queryset.select_related(camino)
+                if campo.precargar is not None:
+                    queryset = campo.precargar(queryset, camino)
+                if issubclass(campo.serializer, SerializerExpandibleMixin):
+                    queryset = campo.serializer._optimizar(queryset, subarbol, camino, relacionado)
+        return queryset
@@ -0,0 +1,28 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class CursorPaginacion(CursorPagination):
+    """
+    Paginación por defecto de la API: cursor opaco sobre un orden estable, así el costo
+    de cada página no crece con la posición y no se repiten ni saltean filas cuando se
+    insertan registros mientras se recorre el listado.
+
+    El orden es '-pk' salvo que la vista defina `orden_cursor`. El primer campo de ese
+    orden es el que guarda el cursor: debe ser un campo del modelo (o una anotación),
+    sin '__', que no cambie y sea único o casi único.
+
+    El cliente puede pedir otro tamaño con ?page_size=, hasta PAGINACION_TAMANO_MAXIMO.
+    """
+    page_size = getattr(settings, 'PAGINACION_TAMANO', 50)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'PAGINACION_TAMANO_MAXIMO', 200)
+    ordering = '-pk'
+
+    def get_ordering(self, request, queryset, view):
+        orden = getattr(view, 'orden_cursor', None)
+        if orden is None:
+            return super().get_ordering(request, queryset, view)
+        if isinstance(orden, str):
+            return (orden,)
+        return tuple(orden)
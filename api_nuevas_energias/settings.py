@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'corsheaders',
@@ -52,6 +53,7 @@ INSTALLED_APPS = [
     'incidentes',
     'sanciones',
     'asistencias',
+    'archivos',
 ]
 
 MIDDLEWARE = [
@@ -106,6 +108,32 @@ DATABASES = {
 }
 
 
+# Cache
+# Se usa la base de datos para que todos los procesos del servidor compartan
+# el cache y sus invalidaciones. Crear la tabla con: python manage.py createcachetable
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache_api',
+    },
+    # Cache en memoria del proceso para datos chicos que se leen en cada petición
+    # (p. ej. los grupos del usuario): no cuesta consultas a la base.
+    'roles': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'roles',
+    },
+}
+
+# Tiempo (en segundos) que se conservan los reportes calculados.
+REPORTES_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Segundos que se reutilizan los grupos de un usuario entre peticiones (0 los consulta
+# en cada petición). El cache es por proceso: los cambios de grupo se invalidan al
+# instante en el proceso que los hace y en los demás a más tardar al vencer este plazo.
+ROLES_CACHE_ALIAS = 'roles'
+ROLES_CACHE_TIMEOUT = 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -156,8 +184,15 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Todos los listados se paginan por cursor; los catálogos chicos lo desactivan con pagination_class = None
+    'DEFAULT_PAGINATION_CLASS': 'api_nuevas_energias.pagination.CursorPaginacion',
 }
 
+# --- PAGINACIÓN ---
+# Tamaño de página por defecto y máximo que puede pedir el cliente con ?page_size=
+PAGINACION_TAMANO = 50
+PAGINACION_TAMANO_MAXIMO = 200
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -167,9 +202,95 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Puedes ajustar este valor según tus necesidades
 TOKEN_LIFETIME = timedelta(hours=12) # Ejemplo: 12 horas
 
+# Cache en memoria de los tokens validados (por proceso): segundos que se reutiliza una
+# validación sin ir a la base y cantidad máxima de tokens guardados (se desalojan los
+# menos usados). Un token revocado desde otro proceso sigue valiendo a lo sumo TOKEN_CACHE_TTL.
+TOKEN_CACHE_TTL = 30
+TOKEN_CACHE_MAXSIZE = 1000
+
+# La expiración del token es deslizante: TOKEN_LIFETIME se cuenta desde el último uso.
+# El uso de cada token se anota a lo sumo una vez por TOKEN_ACTIVIDAD_INTERVALO y lo
+# anotado se escribe en lote cada TOKEN_ACTIVIDAD_VOLCADO, después de enviar la respuesta.
+TOKEN_ACTIVIDAD_INTERVALO = timedelta(minutes=5)
+TOKEN_ACTIVIDAD_VOLCADO = timedelta(seconds=30)
+
+# --- IMPORTACIÓN MASIVA DE EMPLEADOS ---
+# Filas que se crean por transacción y procesos para calcular los hashes de las
+# contraseñas (None usa la cantidad de CPUs).
+EMPLEADOS_IMPORTACION_LOTE = 100
+EMPLEADOS_IMPORTACION_PROCESOS = None
+
+# --- TAREAS EN SEGUNDO PLANO ---
+# Hilos del pool de api_nuevas_energias/tareas.py. Con TAREAS_EN_SEGUNDO_PLANO = False las
+# tareas corren en el mismo hilo que las encola.
+TAREAS_HILOS = 2
+TAREAS_EN_SEGUNDO_PLANO = True
+
+# --- MINIATURAS DE FOTOS DE EMPLEADOS ---
+# Lados (en px) de las miniaturas cuadradas WebP y su calidad.
+EMPLEADOS_MINIATURAS_TAMANOS = (64, 256)
+EMPLEADOS_MINIATURAS_CALIDAD = 80
+
+# --- RECOMPRESIÓN DE IMÁGENES SUBIDAS ---
+# Campos cuyas imágenes se achican y recomprimen en segundo plano al subirse
+# (archivos/imagenes.py): lado mayor máximo en px, formato (JPEG o WEBP) y calidad. Con
+# ARCHIVOS_IMAGENES_CONSERVAR_ORIGINAL se guarda también el archivo tal como se subió.
+ARCHIVOS_IMAGENES_CAMPOS = ['empleados.Documento.ruta_archivo', 'incidentes.Descargo.ruta_archivo_descargo']
+ARCHIVOS_IMAGENES_LADO_MAXIMO = 2000
+ARCHIVOS_IMAGENES_FORMATO = 'JPEG'
+ARCHIVOS_IMAGENES_CALIDAD = 82
+ARCHIVOS_IMAGENES_CONSERVAR_ORIGINAL = False
+
+# --- DESCARGAS PROTEGIDAS ---
+# Cómo se entregan los archivos de /api/descargas/ (archivos/descargas.py): 'x-accel'
+# (nginx: location interna DESCARGAS_PREFIJO_INTERNO con alias a MEDIA_ROOT),
+# 'x-sendfile' (Apache/lighttpd) o 'django' (los envía el proceso de Python).
+# Los enlaces firmados vencen entre DESCARGAS_ENLACE_DURACION y el doble de ese lapso.
+# Los recibos y documentos de legajo se guardan en MEDIA_ROOT/archivos/: en producción
+# esa carpeta no se sirve en público bajo MEDIA_URL (solo por la location interna), si no
+# cualquiera con la ruta saltea el control de acceso. Por eso las API devuelven
+# url_descarga y no ruta_pdf ni ruta_archivo.
+DESCARGAS_MODO = 'django'
+DESCARGAS_PREFIJO_INTERNO = '/media-protegida/'
+DESCARGAS_ENLACE_DURACION = timedelta(minutes=30)
+
+# --- BÚSQUEDA DE EMPLEADOS ---
+# Resultados por defecto y máximos de la búsqueda para autocompletar.
+EMPLEADOS_BUSQUEDA_LIMITE = 10
+EMPLEADOS_BUSQUEDA_LIMITE_MAXIMO = 50
+
+# --- MARCAS DE ASISTENCIA ---
+# Duración máxima de una jornada: una salida solo se empareja con una entrada dentro de este lapso.
+ASISTENCIA_JORNADA_MAXIMA = timedelta(hours=16)
+# Tiempo mínimo entre la entrada y la salida, para no registrar una salida con el mismo reconocimiento.
+ASISTENCIA_INTERVALO_MINIMO_SALIDA = timedelta(minutes=30)
+# Meses posteriores al actual cuyas particiones prepara el comando crear_particiones_asistencia.
+ASISTENCIA_PARTICIONES_ADELANTADAS = 3
+# Meses anteriores al actual que archivar_asistencias mantiene en la tabla.
+ASISTENCIA_MESES_EN_LINEA = 24
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# --- CATÁLOGOS CON GET CONDICIONAL ---
+# Segundos que el navegador (y los proxies, en los catálogos públicos) reutilizan la
+# respuesta sin preguntar; después revalida con ETag y recibe 304 si no cambió.
+CATALOGOS_CACHE_SEGUNDOS = 60
+
+# --- CORREOS SALIENTES ---
+# Los correos se guardan en la bandeja de salida (notificaciones.CorreoSaliente) y los
+# envía `manage.py enviar_correos` en lotes, por una sola conexión SMTP por lote.
+CORREOS_LOTE = 50
+# Intentos antes de marcar un correo como fallido.
+CORREOS_MAXIMO_INTENTOS = 5
+# Espera después del primer fallo, en segundos; se duplica en cada intento hasta el máximo.
+CORREOS_ESPERA_BASE = 60
+CORREOS_ESPERA_MAXIMA = 3600
+# Segundos que un envío se reserva un lote; si el proceso muere, pasado este lapso otro lo retoma.
+CORREOS_TIEMPO_RESERVA = 300
+# Intentar el envío en segundo plano apenas se confirma la transacción, además del comando.
+CORREOS_ENVIO_INMEDIATO = True
+
 # --- CONFIGURACIÓN DE DRF-SPECTACULAR (SWAGGER) ---
 SPECTACULAR_SETTINGS = {
     'TITLE': 'API Nuevas Energías',
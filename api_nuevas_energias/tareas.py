@@ -0,0 +1,54 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_lock = threading.Lock()
+
+
+def _obtener_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'TAREAS_HILOS', 2),
+                thread_name_prefix='tareas',
+            )
+        return _executor
+
+
+def _ejecutar(funcion, args, kwargs):
+    close_old_connections()
+    try:
+        funcion(*args, **kwargs)
+    except Exception:
+        logger.exception(f"Error en la tarea en segundo plano {funcion.__module__}.{funcion.__name__}")
+    finally:
+        # Cada hilo abre su propia conexión: se cierra al terminar para no dejarla colgada.
+        connections.close_all()
+
+
+def encolar(funcion, *args, **kwargs):
+    """
+    Ejecuta `funcion(*args, **kwargs)` en un hilo del pool de tareas del proceso, una vez
+    confirmada la transacción en curso (si no hay ninguna, enseguida). Sirve para trabajo
+    que no debe demorar la respuesta, como generar miniaturas de imágenes.
+
+    Con TAREAS_EN_SEGUNDO_PLANO = False la tarea corre en el mismo hilo (útil en tests y
+    comandos). Los errores de la tarea se registran en el log y no se propagan.
+    """
+    def enviar():
+        if getattr(settings, 'TAREAS_EN_SEGUNDO_PLANO', True):
+            _obtener_executor().submit(_ejecutar, funcion, args, kwargs)
+        else:
+            try:
+                funcion(*args, **kwargs)
+            except Exception:
+                logger.exception(f"Error en la tarea {funcion.__module__}.{funcion.__name__}")
+
+    transaction.on_commit(enviar)
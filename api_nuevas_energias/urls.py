@@ -33,6 +33,8 @@ urlpatterns = [
         path('', include('incidentes.urls')),
         path('', include('sanciones.urls')),
         path('', include('asistencias.urls')),
+        path('', include('archivos.urls')),
+        path('', include('notificaciones.urls')),
        
         # demas apps...
     ])),
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class ArchivosConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'archivos'
+
+    def ready(self):
+        # Registra los receptores de señales de la app.
+        from . import signals  # noqa: F401
@@ -0,0 +1,190 @@
+import math
+import mimetypes
+import os
+import re
+import time
+from urllib.parse import quote, urlencode
+
+from django.apps import apps
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import http_date
+
+from usuarios.roles import es_admin, es_admin_o_consultor
+
+from .storage import es_blob
+
+TAMANO_BLOQUE = 64 * 1024
+
+
+def _es_dueno(user, empleado):
+    return empleado is not None and user.is_authenticated and empleado.user_id == user.pk
+
+
+# tipo -> (modelo, campo de archivo, relaciones a precargar, quién puede descargarlo).
+# Las reglas son las de los listados: el dueño ve lo suyo (MisRecibosView, legajo
+# propio) y administración ve todo.
+DESCARGABLES = {
+    'recibo': (
+        'recibos.Recibo_Sueldos', 'ruta_pdf', ('id_empl',),
+        lambda user, recibo: es_admin_o_consultor(user) or _es_dueno(user, recibo.id_empl),
+    ),
+    'documento': (
+        'empleados.Documento', 'ruta_archivo', ('id_leg__id_empl',),
+        lambda user, documento: es_admin(user) or _es_dueno(user, documento.id_leg.id_empl),
+    ),
+}
+
+
+def obtener_descargable(tipo, pk):
+    """Devuelve (objeto, archivo) o (None, None) si el tipo, la fila o el archivo no existen."""
+    if tipo not in DESCARGABLES:
+        return None, None
+    etiqueta, campo, relaciones, _ = DESCARGABLES[tipo]
+    objeto = apps.get_model(etiqueta)._default_manager.select_related(*relaciones).filter(pk=pk).first()
+    archivo = getattr(objeto, campo) if objeto is not None else None
+    if not archivo:
+        return None, None
+    return objeto, archivo
+
+
+def puede_descargar(user, tipo, objeto):
+    return DESCARGABLES[tipo][3](user, objeto)
+
+
+def _firma(tipo, pk, expira, nombre):
+    # El nombre del archivo entra en la firma: si el archivo se reemplaza, los enlaces
+    # viejos dejan de valer.
+    return salted_hmac('archivos.descargas', f"{tipo}:{pk}:{expira}:{nombre}", algorithm='sha256').hexdigest()
+
+
+def enlace_firmado(tipo, objeto, request=None):
+    """
+    URL de descarga que no necesita autenticación y vence entre DESCARGAS_ENLACE_DURACION
+    y el doble de ese lapso. El vencimiento se redondea a ese lapso, así todos los enlaces
+    a un archivo generados en el mismo período son iguales y se pueden cachear.
+    """
+    duracion = int(settings.DESCARGAS_ENLACE_DURACION.total_seconds())
+    expira = (math.floor(time.time() / duracion) + 2) * duracion
+    archivo = getattr(objeto, DESCARGABLES[tipo][1])
+    consulta = urlencode({'expira': expira, 'firma': _firma(tipo, objeto.pk, expira, archivo.name)})
+    url = f"{reverse('descargar-archivo', args=[tipo, objeto.pk])}?{consulta}"
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def enlace_si_puede(tipo, objeto, request):
+    """
+    enlace_firmado() solo si el usuario de la request puede descargar el archivo; si no
+    (o si no hay archivo ni request), None. Un enlace firmado no pide autenticación: no
+    se le puede dar a alguien que no pasaría el control de descargar_archivo.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not getattr(objeto, DESCARGABLES[tipo][1]) or not puede_descargar(user, tipo, objeto):
+        return None
+    return enlace_firmado(tipo, objeto, request)
+
+
+def segundos_vigentes(tipo, objeto, archivo, expira, firma):
+    """Segundos que le quedan a un enlace firmado, o None si la firma no vale o ya venció."""
+    try:
+        expira = int(expira)
+    except (TypeError, ValueError):
+        return None
+    restantes = expira - time.time()
+    if restantes <= 0 or not constant_time_compare(firma or '', _firma(tipo, objeto.pk, expira, archivo.name)):
+        return None
+    return restantes
+
+
+def _etag(archivo):
+    # Los blobs se llaman por el SHA-256 de su contenido; el resto, por tamaño y fecha.
+    if es_blob(archivo.name):
+        return f'"{os.path.splitext(os.path.basename(archivo.name))[0]}"'
+    estado = os.stat(archivo.path)
+    return f'"{estado.st_size:x}-{int(estado.st_mtime):x}"'
+
+
+def _rango(cabecera, tamano):
+    """(inicio, fin) del único rango pedido, None si hay que enviar todo o 'invalido'."""
+    coincidencia = re.fullmatch(r'bytes=(\d*)-(\d*)', (cabecera or '').strip())
+    if not coincidencia or coincidencia.groups() == ('', ''):
+        # Sin Range, con varios rangos o con otra unidad se envía el archivo completo.
+        return None
+    inicio, fin = coincidencia.groups()
+    if inicio == '':
+        largo = int(fin)
+        if largo == 0:
+            return 'invalido'
+        return max(tamano - largo, 0), tamano - 1
+    inicio = int(inicio)
+    fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or inicio > fin:
+        return 'invalido'
+    return inicio, fin
+
+
+def _leer(ruta, inicio, largo):
+    with open(ruta, 'rb') as archivo:
+        archivo.seek(inicio)
+        while largo > 0:
+            bloque = archivo.read(min(TAMANO_BLOQUE, largo))
+            if not bloque:
+                break
+            largo -= len(bloque)
+            yield bloque
+
+
+def respuesta_archivo(request, archivo, max_age=0):
+    """
+    Respuesta que entrega `archivo`. Con DESCARGAS_MODO 'x-accel' (nginx) o 'x-sendfile'
+    (Apache, lighttpd) Django solo arma las cabeceras y el proxy envía los bytes; con
+    'django' los envía este proceso, con soporte de ETag/If-None-Match y Range.
+    """
+    modo = getattr(settings, 'DESCARGAS_MODO', 'django')
+    tipo_contenido = mimetypes.guess_type(archivo.name)[0] or 'application/octet-stream'
+    nombre = os.path.basename(archivo.name)
+
+    if modo == 'x-accel':
+        respuesta = HttpResponse(content_type=tipo_contenido)
+        respuesta['X-Accel-Redirect'] = quote(f"{settings.DESCARGAS_PREFIJO_INTERNO.rstrip('/')}/{archivo.name}")
+    elif modo == 'x-sendfile':
+        respuesta = HttpResponse(content_type=tipo_contenido)
+        respuesta['X-Sendfile'] = archivo.path
+    else:
+        respuesta = _respuesta_django(request, archivo, tipo_contenido)
+
+    respuesta['Content-Disposition'] = f"inline; filename*=UTF-8''{quote(nombre)}"
+    respuesta['Cache-Control'] = f"private, max-age={max(int(max_age), 0)}"
+    return respuesta
+
+
+def _respuesta_django(request, archivo, tipo_contenido):
+    try:
+        estado = os.stat(archivo.path)
+    except FileNotFoundError:
+        return HttpResponse(status=404)
+    etag = _etag(archivo)
+    if etag in [valor.strip() for valor in request.headers.get('If-None-Match', '').split(',')]:
+        respuesta = HttpResponseNotModified()
+        respuesta['ETag'] = etag
+        return respuesta
+
+    rango = _rango(request.headers.get('Range'), estado.st_size)
+    if rango is not None and request.headers.get('If-Range', etag) != etag:
+        rango = None
+    if rango == 'invalido':
+        respuesta = HttpResponse(status=416)
+        respuesta['Content-Range'] = f"bytes */{estado.st_size}"
+    elif rango is not None:
+        inicio, fin = rango
+        respuesta = StreamingHttpResponse(_leer(archivo.path, inicio, fin - inicio + 1), status=206, content_type=tipo_contenido)
+        respuesta['Content-Range'] = f"bytes {inicio}-{fin}/{estado.st_size}"
+        respuesta['Content-Length'] = str(fin - inicio + 1)
+    else:
+        respuesta = FileResponse(open(archivo.path, 'rb'), content_type=tipo_contenido)
+    respuesta['ETag'] = etag
+    respuesta['Last-Modified'] = http_date(estado.st_mtime)
+    respuesta['Accept-Ranges'] = 'bytes'
+    return respuesta
@@ -0,0 +1,169 @@
+import io
+import logging
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from api_nuevas_energias.tareas import encolar
+
+from .models import ImagenProcesada
+from .storage import consumir_subida
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONES_IMAGEN = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff'}
+EXTENSION_POR_FORMATO = {'JPEG': '.jpg', 'WEBP': '.webp'}
+
+
+def campos_recomprimibles():
+    """{(app_label.Modelo, campo)} configurados en ARCHIVOS_IMAGENES_CAMPOS."""
+    campos = getattr(settings, 'ARCHIVOS_IMAGENES_CAMPOS', [])
+    return {tuple(campo.rsplit('.', 1)) for campo in campos}
+
+
+def es_imagen(nombre):
+    return bool(nombre) and os.path.splitext(nombre)[1].lower() in EXTENSIONES_IMAGEN
+
+
+def recomprimir(contenido):
+    """
+    Devuelve los bytes de la imagen achicada a ARCHIVOS_IMAGENES_LADO_MAXIMO (lado mayor),
+    sin EXIF y codificada en ARCHIVOS_IMAGENES_FORMATO con ARCHIVOS_IMAGENES_CALIDAD.
+    La orientación del EXIF se aplica antes de descartarlo.
+    """
+    lado_maximo = getattr(settings, 'ARCHIVOS_IMAGENES_LADO_MAXIMO', 2000)
+    formato = getattr(settings, 'ARCHIVOS_IMAGENES_FORMATO', 'JPEG')
+    calidad = getattr(settings, 'ARCHIVOS_IMAGENES_CALIDAD', 82)
+
+    with Image.open(contenido) as imagen:
+        imagen.draft(imagen.mode, (lado_maximo, lado_maximo))  # JPEG: decodifica ya reducida
+        icc = imagen.info.get('icc_profile')
+        imagen = ImageOps.exif_transpose(imagen)
+        imagen.thumbnail((lado_maximo, lado_maximo), Image.Resampling.LANCZOS)
+        if formato == 'JPEG' and imagen.mode != 'RGB':
+            if imagen.mode in ('RGBA', 'LA', 'P'):
+                imagen = imagen.convert('RGBA')
+                fondo = Image.new('RGB', imagen.size, 'white')
+                fondo.paste(imagen, mask=imagen.getchannel('A'))
+                imagen = fondo
+            else:
+                imagen = imagen.convert('RGB')
+        salida = io.BytesIO()
+        opciones = {'quality': calidad, 'icc_profile': icc}
+        if formato == 'JPEG':
+            opciones.update(optimize=True, progressive=True)
+        else:
+            opciones.update(method=4)
+        imagen.save(salida, formato, **opciones)
+    return salida.getvalue()
+
+
+def recomprimir_imagen(modelo_label, objeto_id, campo, nombre):
+    """
+    Tarea en segundo plano: recomprime la imagen `nombre` del campo `campo` de la fila y,
+    si resulta más chica, la reemplaza. Si mientras tanto el campo cambió no se toca la
+    fila. El original se suelta salvo con ARCHIVOS_IMAGENES_CONSERVAR_ORIGINAL.
+    """
+    modelo = apps.get_model(modelo_label)
+    storage = modelo._meta.get_field(campo).storage
+    try:
+        tamano_original = storage.size(nombre)
+        with storage.open(nombre, 'rb') as archivo:
+            procesada = recomprimir(archivo)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+        logger.error(f"No se pudo recomprimir {nombre} ({modelo_label} {objeto_id}): {e}")
+        return False
+
+    registro = {
+        'modelo': modelo_label, 'objeto_id': objeto_id, 'campo': campo,
+        'nombre_original': nombre, 'tamano_original': tamano_original,
+    }
+    if len(procesada) >= tamano_original:
+        ImagenProcesada.objects.create(nombre_procesado=nombre, tamano_procesado=tamano_original, **registro)
+        return False
+
+    formato = getattr(settings, 'ARCHIVOS_IMAGENES_FORMATO', 'JPEG')
+    base = os.path.splitext(os.path.basename(nombre))[0]
+    nuevo = storage.save(f"{base}{EXTENSION_POR_FORMATO[formato]}", ContentFile(procesada))
+    # La referencia nueva pasa directo a la fila; no hay un save() del modelo que la consuma.
+    consumir_subida(nuevo)
+    conservar = getattr(settings, 'ARCHIVOS_IMAGENES_CONSERVAR_ORIGINAL', False)
+    with transaction.atomic():
+        actualizados = modelo._default_manager.filter(pk=objeto_id, **{campo: nombre}).update(**{campo: nuevo})
+        if not actualizados:
+            storage.delete(nuevo)
+            return False
+        # Si se conserva, la referencia al original pasa de la fila a ImagenProcesada.
+        ImagenProcesada.objects.create(
+            nombre_procesado=nuevo, tamano_procesado=len(procesada),
+            original=nombre if conservar else None, **registro,
+        )
+        if not conservar:
+            storage.delete(nombre)
+    logger.info(f"Imagen {nombre} recomprimida: {tamano_original} -> {len(procesada)} bytes ({modelo_label} {objeto_id}).")
+    return True
+
+
+def encolar_recompresion(instancias):
+    """
+    Encola la recompresión de las imágenes recién guardadas en los campos configurados
+    de `instancias` (todas del mismo modelo). La usan la señal post_save y las altas con
+    bulk_create, que no envían señales.
+    """
+    instancias = list(instancias)
+    if not instancias:
+        return
+    modelo_label = instancias[0]._meta.label
+    campos = [campo for etiqueta, campo in campos_recomprimibles() if etiqueta == modelo_label]
+    pendientes = [
+        (instancia.pk, campo, getattr(instancia, campo).name)
+        for instancia in instancias for campo in campos
+        if getattr(instancia, campo) and es_imagen(getattr(instancia, campo).name)
+    ]
+    if not pendientes:
+        return
+    procesadas = set(
+        ImagenProcesada.objects.filter(nombre_procesado__in={nombre for _, _, nombre in pendientes})
+        .values_list('nombre_procesado', flat=True)
+    )
+    for objeto_id, campo, nombre in pendientes:
+        if nombre not in procesadas:
+            encolar(recomprimir_imagen, modelo_label, objeto_id, campo, nombre)
+
+
+def estadisticas_recompresion():
+    """Totales de las imágenes procesadas, en general y por modelo."""
+    def resumir(valores):
+        originales = valores['bytes_originales'] or 0
+        procesados = valores['bytes_procesados'] or 0
+        return {
+            'imagenes': valores['imagenes'],
+            'recomprimidas': valores['recomprimidas'],
+            'bytes_originales': originales,
+            'bytes_procesados': procesados,
+            'bytes_ahorrados': originales - procesados,
+            'porcentaje_ahorro': round(100 * (originales - procesados) / originales, 1) if originales else None,
+        }
+
+    agregados = {
+        'imagenes': Count('id'),
+        'recomprimidas': Count('id', filter=~Q(nombre_procesado=F('nombre_original'))),
+        'bytes_originales': Sum('tamano_original'),
+        'bytes_procesados': Sum('tamano_procesado'),
+    }
+    por_modelo = ImagenProcesada.objects.values('modelo').annotate(**agregados).order_by('modelo')
+    return {
+        'total': resumir(ImagenProcesada.objects.aggregate(**agregados)),
+        'por_modelo': {valores['modelo']: resumir(valores) for valores in por_modelo},
+        'configuracion': {
+            'lado_maximo': getattr(settings, 'ARCHIVOS_IMAGENES_LADO_MAXIMO', 2000),
+            'formato': getattr(settings, 'ARCHIVOS_IMAGENES_FORMATO', 'JPEG'),
+            'calidad': getattr(settings, 'ARCHIVOS_IMAGENES_CALIDAD', 82),
+            'conservar_original': getattr(settings, 'ARCHIVOS_IMAGENES_CONSERVAR_ORIGINAL', False),
+        },
+    }
@@ -0,0 +1,169 @@
+import hashlib
+import os
+import time
+from collections import defaultdict
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from archivos.models import Blob
+from archivos.signals import campos_deduplicados
+from archivos.storage import CARPETA_BLOBS, CARPETA_TEMPORAL, almacenamiento_deduplicado, es_blob, nombre_blob
+
+# Segundos tras los cuales un temporal o un archivo sin Blob se da por abandonado.
+ESPERA_ABANDONADOS = 60 * 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Pasa los archivos ya cargados de los campos con almacenamiento deduplicado (documentos de "
+        "legajo, recibos en PDF y descargos) a blobs por contenido: las copias del mismo archivo "
+        "quedan en uno solo y se borran los originales. Con --recontar recalcula las referencias "
+        "de cada blob, borra los que no usa nadie y los archivos que quedaron sin blob."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--simular', action='store_true', help='Solo informa cuánto se ahorraría, sin mover nada.')
+        parser.add_argument('--recontar', action='store_true', help='Recalcula las referencias y borra los blobs sin uso y los archivos sin blob.')
+
+    def handle(self, *args, **options):
+        referencias = self._referencias_a_archivos_anteriores()
+        if options['simular']:
+            self._simular(referencias)
+        else:
+            self._migrar(referencias)
+        if options['recontar'] and not options['simular']:
+            self._recontar()
+
+    def _referencias_a_archivos_anteriores(self):
+        """{nombre: [(modelo, campo, pk)]} de los archivos que todavía no son blobs."""
+        referencias = defaultdict(list)
+        for modelo, campo in campos_deduplicados():
+            filas = modelo._default_manager.exclude(**{campo.attname: ''}).exclude(**{f'{campo.attname}__isnull': True})
+            for pk, nombre in filas.values_list('pk', campo.attname).iterator():
+                if not es_blob(nombre):
+                    referencias[nombre].append((modelo, campo, pk))
+        return referencias
+
+    def _simular(self, referencias):
+        por_contenido = defaultdict(list)
+        faltantes = 0
+        for nombre in referencias:
+            ruta = almacenamiento_deduplicado.path(nombre)
+            if not os.path.exists(ruta):
+                faltantes += 1
+                continue
+            sha256 = hashlib.sha256()
+            with open(ruta, 'rb') as archivo:
+                for bloque in iter(lambda: archivo.read(1024 * 1024), b''):
+                    sha256.update(bloque)
+            por_contenido[sha256.hexdigest()].append(os.path.getsize(ruta))
+        total = sum(sum(tamanos) for tamanos in por_contenido.values())
+        unicos = sum(tamanos[0] for tamanos in por_contenido.values())
+        self.stdout.write(
+            f"Archivos: {sum(len(t) for t in por_contenido.values())} ({total / 1024 / 1024:.1f} MB). "
+            f"Contenidos distintos: {len(por_contenido)} ({unicos / 1024 / 1024:.1f} MB). "
+            f"Se liberarían {(total - unicos) / 1024 / 1024:.1f} MB. Faltantes en disco: {faltantes}."
+        )
+
+    def _migrar(self, referencias):
+        inicio = time.monotonic()
+        comienzo = timezone.now()
+        migrados = faltantes = 0
+        borrados = 0
+        for nombre, filas in referencias.items():
+            ruta = almacenamiento_deduplicado.path(nombre)
+            if not os.path.exists(ruta):
+                faltantes += 1
+                self.stdout.write(self.style.WARNING(f"No existe en disco: {nombre} ({len(filas)} referencias)."))
+                continue
+            tamano = os.path.getsize(ruta)
+            with transaction.atomic():
+                with open(ruta, 'rb') as archivo:
+                    nuevo = almacenamiento_deduplicado.save(nombre, File(archivo, name=nombre))
+                # save() ya sumó una referencia; se suman las demás filas que usan el archivo.
+                if len(filas) > 1:
+                    Blob.objects.filter(nombre=nuevo).update(referencias=F('referencias') + len(filas) - 1)
+                por_campo = defaultdict(list)
+                for modelo, campo, pk in filas:
+                    por_campo[(modelo, campo.attname)].append(pk)
+                for (modelo, attname), pks in por_campo.items():
+                    modelo._default_manager.filter(pk__in=pks, **{attname: nombre}).update(**{attname: nuevo})
+            almacenamiento_deduplicado.borrar_sin_referencias(nombre)
+            migrados += 1
+            borrados += tamano
+        nuevos = Blob.objects.filter(fecha_creacion__gte=comienzo).aggregate(cantidad=Count('pk'), tamano=Sum('tamano'))
+        blobs_nuevos = nuevos['cantidad']
+        liberados = borrados - (nuevos['tamano'] or 0)
+        self.stdout.write(self.style.SUCCESS(
+            f"Archivos migrados: {migrados}. Blobs nuevos: {blobs_nuevos}. Faltantes en disco: {faltantes}. "
+            f"Espacio liberado: {liberados / 1024 / 1024:.1f} MB en {time.monotonic() - inicio:.1f} s."
+        ))
+
+    def _recontar(self):
+        cuentas = defaultdict(int)
+        for modelo, campo in campos_deduplicados():
+            for nombre in modelo._default_manager.filter(**{f'{campo.attname}__startswith': 'archivos/'}).values_list(campo.attname, flat=True).iterator():
+                cuentas[nombre] += 1
+
+        corregidos = eliminados = 0
+        for blob in Blob.objects.all().iterator():
+            referencias = cuentas.get(blob.nombre, 0)
+            if referencias != blob.referencias:
+                Blob.objects.filter(pk=blob.pk).update(referencias=referencias)
+                corregidos += 1
+            if referencias == 0:
+                almacenamiento_deduplicado.recolectar(blob.nombre)
+                eliminados += 1
+
+        # Temporales que quedaron de subidas interrumpidas.
+        directorio = almacenamiento_deduplicado.path(CARPETA_TEMPORAL)
+        if os.path.isdir(directorio):
+            for nombre in os.listdir(directorio):
+                ruta = os.path.join(directorio, nombre)
+                if os.path.getmtime(ruta) < time.time() - ESPERA_ABANDONADOS:
+                    os.remove(ruta)
+        huerfanos = self._borrar_huerfanos()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Blobs con referencias corregidas: {corregidos}. Blobs eliminados: {eliminados}. "
+            f"Archivos sin blob eliminados: {huerfanos}."
+        ))
+
+    def _borrar_huerfanos(self):
+        """
+        Borra los archivos de archivos/<ab>/<cd>/ que no tienen fila en Blob: los deja una
+        subida cuya transacción se deshizo después de mover el archivo a su lugar.
+        """
+        raiz = almacenamiento_deduplicado.path(CARPETA_BLOBS)
+        if not os.path.isdir(raiz):
+            return 0
+        existentes = set(Blob.objects.values_list('nombre', flat=True))
+        borrados = 0
+        for directorio, subdirectorios, archivos in os.walk(raiz):
+            relativo = os.path.relpath(directorio, almacenamiento_deduplicado.path('')).replace(os.sep, '/')
+            if relativo == CARPETA_BLOBS:
+                subdirectorios[:] = [d for d in subdirectorios if f"{CARPETA_BLOBS}/{d}" != CARPETA_TEMPORAL]
+            for archivo in archivos:
+                sha256, extension = os.path.splitext(archivo)
+                nombre = f"{relativo}/{archivo}"
+                ruta = os.path.join(directorio, archivo)
+                # Solo nombres de blob; los recientes pueden ser de una subida cuya transacción
+                # sigue abierta.
+                if nombre in existentes or nombre != nombre_blob(sha256, extension):
+                    continue
+                if os.path.getmtime(ruta) >= time.time() - ESPERA_ABANDONADOS:
+                    continue
+                # Crear la fila reserva el nombre igual que _save(): una subida simultánea del
+                # mismo contenido espera a que termine el borrado y vuelve a mover su archivo.
+                with transaction.atomic():
+                    _, creado = Blob.objects.get_or_create(
+                        nombre=nombre, defaults={'sha256': sha256, 'tamano': os.path.getsize(ruta)},
+                    )
+                    if creado:
+                        almacenamiento_deduplicado.recolectar(nombre)
+                        borrados += 1
+        return borrados
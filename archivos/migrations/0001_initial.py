@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('nombre', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('tamano', models.BigIntegerField()),
+                ('referencias', models.PositiveIntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
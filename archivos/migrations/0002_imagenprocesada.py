@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:31
+
+import archivos.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('archivos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImagenProcesada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=100)),
+                ('objeto_id', models.BigIntegerField()),
+                ('campo', models.CharField(max_length=100)),
+                ('nombre_original', models.CharField(max_length=255)),
+                ('nombre_procesado', models.CharField(db_index=True, max_length=255)),
+                ('tamano_original', models.BigIntegerField()),
+                ('tamano_procesado', models.BigIntegerField()),
+                ('original', models.FileField(blank=True, max_length=255, null=True, storage=archivos.storage.AlmacenamientoDeduplicado(), upload_to='')),
+                ('fecha_procesado', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
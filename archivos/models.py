@@ -0,0 +1,44 @@
+from django.db import models
+
+from .storage import almacenamiento_deduplicado
+
+
+class Blob(models.Model):
+    """
+    Un archivo guardado por AlmacenamientoDeduplicado: uno por contenido (SHA-256) y
+    extensión, compartido por todas las filas que suben ese mismo contenido.
+
+    `referencias` cuenta cuántos campos de archivo lo usan; el archivo se borra del disco
+    recién cuando llega a cero (ver archivos/storage.py).
+    """
+    nombre = models.CharField(max_length=255, primary_key=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    tamano = models.BigIntegerField()
+    referencias = models.PositiveIntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.nombre} ({self.referencias} referencias)"
+
+
+class ImagenProcesada(models.Model):
+    """
+    Resultado de recomprimir una imagen subida (ver archivos/imagenes.py). Sirve para no
+    procesar dos veces el mismo archivo y para las estadísticas de ahorro.
+
+    `original` guarda el archivo subido solo si ARCHIVOS_IMAGENES_CONSERVAR_ORIGINAL está
+    activo; si la versión recomprimida no resultaba más chica, nombre_procesado es el
+    mismo nombre_original.
+    """
+    modelo = models.CharField(max_length=100)
+    objeto_id = models.BigIntegerField()
+    campo = models.CharField(max_length=100)
+    nombre_original = models.CharField(max_length=255)
+    nombre_procesado = models.CharField(max_length=255, db_index=True)
+    tamano_original = models.BigIntegerField()
+    tamano_procesado = models.BigIntegerField()
+    original = models.FileField(storage=almacenamiento_deduplicado, max_length=255, blank=True, null=True)
+    fecha_procesado = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.modelo} {self.objeto_id}: {self.tamano_original} -> {self.tamano_procesado} bytes"
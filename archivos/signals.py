@@ -0,0 +1,102 @@
+import logging
+
+from django.apps import apps
+from django.db.models import FileField
+from django.core.signals import request_finished
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+
+from .imagenes import campos_recomprimibles, encolar_recompresion
+from .storage import AlmacenamientoDeduplicado, consumir_subida, es_blob, olvidar_subidas
+
+logger = logging.getLogger(__name__)
+
+
+def campos_deduplicados():
+    """[(modelo, campo)] de los FileField que usan AlmacenamientoDeduplicado."""
+    return [
+        (modelo, campo)
+        for modelo in apps.get_models()
+        for campo in modelo._meta.concrete_fields
+        if isinstance(campo, FileField) and isinstance(campo.storage, AlmacenamientoDeduplicado)
+    ]
+
+
+def _campos_del_modelo(modelo):
+    return [campo for campo in modelo._meta.concrete_fields
+            if isinstance(campo, FileField) and isinstance(campo.storage, AlmacenamientoDeduplicado)]
+
+
+def recordar_archivos_anteriores(sender, instance, update_fields=None, raw=False, **kwargs):
+    # Se leen de la base los nombres actuales para soltar, después de guardar, los que
+    # se reemplazaron por otro archivo.
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    campos = [campo for campo in _campos_del_modelo(sender) if update_fields is None or campo.name in update_fields]
+    if not campos:
+        return
+    instance._archivos_anteriores = (
+        sender._default_manager.filter(pk=instance.pk).values(*(campo.attname for campo in campos)).first() or {}
+    )
+
+
+def soltar_archivos_reemplazados(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    anteriores = instance.__dict__.pop('_archivos_anteriores', None) or {}
+    for campo in _campos_del_modelo(sender):
+        if update_fields is not None and campo.name not in update_fields:
+            continue
+        actual = getattr(instance, campo.attname)
+        # Un archivo recién subido suma una referencia aunque tenga el mismo contenido (y
+        # por lo tanto el mismo nombre) que el anterior: hay que soltar la anterior igual.
+        subido = bool(actual) and consumir_subida(actual.name)
+        anterior = anteriores.get(campo.attname)
+        if raw:
+            continue
+        # El nombre de un blob existente asignado a la fila (copiado de otra) no pasó por
+        # save(): la referencia se suma acá.
+        if actual and not subido and es_blob(actual.name) and (created or actual.name != anterior):
+            if not campo.storage.sumar_referencia(actual.name) and anterior:
+                # El blob ya se borró (p. ej. una instancia vieja que todavía tiene la imagen
+                # que recomprimir_imagen reemplazó): la fila se queda con el archivo que tenía.
+                logger.warning(
+                    f"{sender._meta.label} {instance.pk}: {actual.name} ya no existe, se conserva {anterior}."
+                )
+                sender._default_manager.filter(pk=instance.pk).update(**{campo.attname: anterior})
+                setattr(instance, campo.attname, anterior)
+                continue
+        if not anterior:
+            continue
+        if anterior != (actual.name if actual else None) or subido:
+            campo.storage.delete(anterior)
+
+
+def recordar_archivos_a_eliminar(sender, instance, **kwargs):
+    # La instancia puede estar desactualizada (p. ej. si una tarea en segundo plano ya
+    # reemplazó el archivo): se sueltan los nombres que tiene la base.
+    campos = _campos_del_modelo(sender)
+    instance._archivos_a_soltar = (
+        sender._default_manager.filter(pk=instance.pk).values(*(campo.attname for campo in campos)).first() or {}
+    )
+
+
+def soltar_archivos_de_fila_eliminada(sender, instance, **kwargs):
+    nombres = instance.__dict__.pop('_archivos_a_soltar', {})
+    for campo in _campos_del_modelo(sender):
+        nombre = nombres.get(campo.attname)
+        if nombre:
+            campo.storage.delete(nombre)
+
+
+def encolar_imagenes_subidas(sender, instance, raw=False, **kwargs):
+    if not raw:
+        encolar_recompresion([instance])
+
+
+for _modelo in {modelo for modelo, _ in campos_deduplicados()}:
+    pre_save.connect(recordar_archivos_anteriores, sender=_modelo, dispatch_uid=f'archivos_pre_save_{_modelo._meta.label}')
+    post_save.connect(soltar_archivos_reemplazados, sender=_modelo, dispatch_uid=f'archivos_post_save_{_modelo._meta.label}')
+    pre_delete.connect(recordar_archivos_a_eliminar, sender=_modelo, dispatch_uid=f'archivos_pre_delete_{_modelo._meta.label}')
+    post_delete.connect(soltar_archivos_de_fila_eliminada, sender=_modelo, dispatch_uid=f'archivos_post_delete_{_modelo._meta.label}')
+for _etiqueta in {etiqueta for etiqueta, _ in campos_recomprimibles()}:
+    post_save.connect(encolar_imagenes_subidas, sender=apps.get_model(_etiqueta), dispatch_uid=f'archivos_imagenes_{_etiqueta}')
+
+request_finished.connect(olvidar_subidas, dispatch_uid='archivos_olvidar_subidas')
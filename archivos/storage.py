@@ -0,0 +1,163 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import Counter
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+logger = logging.getLogger(__name__)
+
+CARPETA_BLOBS = 'archivos'
+CARPETA_TEMPORAL = 'archivos/tmp'
+
+
+# Blobs guardados por este hilo que todavía no se asociaron a una fila: cuando un archivo
+# se reemplaza por otro con el mismo contenido el nombre no cambia, y esto es lo único
+# que dice que hubo una subida (y una referencia nueva) que compensar.
+_subidas = threading.local()
+
+
+def _pendientes():
+    if not hasattr(_subidas, 'nombres'):
+        _subidas.nombres = Counter()
+    return _subidas.nombres
+
+
+def consumir_subida(nombre):
+    """True (una sola vez por subida) si este hilo guardó `nombre` desde la última consulta."""
+    pendientes = _pendientes()
+    if pendientes[nombre] <= 0:
+        return False
+    pendientes[nombre] -= 1
+    if not pendientes[nombre]:
+        del pendientes[nombre]
+    return True
+
+
+def olvidar_subidas(**kwargs):
+    _pendientes().clear()
+
+
+def nombre_blob(sha256, extension):
+    return f"{CARPETA_BLOBS}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension.lower()}"
+
+
+def es_blob(nombre):
+    return bool(nombre) and nombre.startswith(f"{CARPETA_BLOBS}/") and not nombre.startswith(f"{CARPETA_TEMPORAL}/")
+
+
+@deconstructible
+class AlmacenamientoDeduplicado(FileSystemStorage):
+    """
+    Storage que guarda cada archivo una sola vez por contenido, en
+    archivos/<ab>/<cd>/<sha256><extensión> dentro de MEDIA_ROOT. Subir de nuevo el mismo
+    escaneo no ocupa más disco: devuelve el nombre del archivo que ya existía.
+
+    El hash se calcula mientras el archivo se copia por bloques a un temporal del mismo
+    disco, sin cargarlo entero en memoria; después se mueve a su ruta definitiva.
+
+    Cada save() suma una referencia al Blob (también asignarle a una fila el nombre de un
+    blob existente, ver sumar_referencia) y cada delete() resta una; el archivo se
+    borra del disco cuando ya nadie lo referencia (al confirmarse la transacción). Si la
+    transacción de un save() se deshace, el archivo ya movido queda sin fila en Blob:
+    lo borra deduplicar_media --recontar pasada una hora. Los
+    nombres que no son blobs (archivos anteriores a este storage) nunca se borran desde
+    acá: los migra el comando deduplicar_media.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre final sale del contenido: no hace falta buscar uno libre.
+        return name
+
+    def _save(self, name, content):
+        from .models import Blob
+
+        sha256, tamano, temporal = self._copiar_a_temporal(content)
+        nombre = nombre_blob(sha256, os.path.splitext(name)[1])
+        try:
+            with transaction.atomic():
+                # El bloqueo de la fila ordena esta subida con un borrado simultáneo del
+                # mismo blob (ver recolectar).
+                blob, _ = Blob.objects.select_for_update().get_or_create(
+                    nombre=nombre, defaults={'sha256': sha256, 'tamano': tamano},
+                )
+                if not os.path.exists(self.path(nombre)):
+                    os.makedirs(os.path.dirname(self.path(nombre)), exist_ok=True)
+                    os.replace(temporal, self.path(nombre))
+                    if self.file_permissions_mode is not None:
+                        os.chmod(self.path(nombre), self.file_permissions_mode)
+                Blob.objects.filter(pk=blob.pk).update(referencias=F('referencias') + 1)
+            _pendientes()[nombre] += 1
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        return nombre
+
+    def _copiar_a_temporal(self, content):
+        directorio = self.path(CARPETA_TEMPORAL)
+        os.makedirs(directorio, exist_ok=True)
+        sha256 = hashlib.sha256()
+        tamano = 0
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        descriptor, temporal = tempfile.mkstemp(dir=directorio)
+        try:
+            with os.fdopen(descriptor, 'wb') as destino:
+                for bloque in content.chunks():
+                    if isinstance(bloque, str):
+                        bloque = bloque.encode()
+                    sha256.update(bloque)
+                    destino.write(bloque)
+                    tamano += len(bloque)
+        except BaseException:
+            os.remove(temporal)
+            raise
+        return sha256.hexdigest(), tamano, temporal
+
+    def delete(self, name):
+        from .models import Blob
+
+        if not es_blob(name):
+            logger.info(f"Se conserva {name}: no es un archivo deduplicado.")
+            return
+        Blob.objects.filter(nombre=name, referencias__gt=0).update(referencias=F('referencias') - 1)
+        transaction.on_commit(lambda: self.recolectar(name))
+
+    def sumar_referencia(self, name):
+        """
+        Suma una referencia a un blob que ya existía (un nombre asignado a otra fila sin
+        pasar por save()). Devuelve False si el blob ya no existe.
+        """
+        from .models import Blob
+
+        with transaction.atomic():
+            # Mismo bloqueo que recolectar: o el blob sigue y no se borra, o ya no está.
+            blob = Blob.objects.select_for_update().filter(nombre=name).first()
+            if blob is None:
+                return False
+            Blob.objects.filter(pk=blob.pk).update(referencias=F('referencias') + 1)
+        return True
+
+    def borrar_sin_referencias(self, name):
+        """Borra `name` del disco sin tocar ningún Blob (archivos que no son blobs)."""
+        super().delete(name)
+
+    def recolectar(self, name):
+        """Borra el blob si quedó sin referencias."""
+        from .models import Blob
+
+        with transaction.atomic():
+            blob = Blob.objects.select_for_update().filter(nombre=name, referencias=0).first()
+            if blob is None:
+                return
+            super().delete(name)
+            blob.delete()
+        logger.info(f"Blob {name} eliminado: no quedan referencias.")
+
+
+almacenamiento_deduplicado = AlmacenamientoDeduplicado()
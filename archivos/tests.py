@@ -0,0 +1,311 @@
+import io
+import os
+import shutil
+import tempfile
+import time
+from datetime import date
+from urllib.parse import urlencode
+
+from django.contrib.auth.models import Group, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from empleados.models import Documento, Empleado, Legajo, RequisitoDocumento
+from recibos.models import Recibo_Sueldos
+
+from .descargas import _firma
+from .imagenes import recomprimir_imagen
+from .models import Blob
+from .storage import almacenamiento_deduplicado
+
+
+class MediaTemporalMixin:
+    """MEDIA_ROOT en un directorio temporal que se borra al terminar la clase."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._media = tempfile.mkdtemp()
+        cls._override_media = override_settings(MEDIA_ROOT=cls._media)
+        cls._override_media.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._override_media.disable()
+        shutil.rmtree(cls._media, ignore_errors=True)
+
+
+class DescargasTests(MediaTemporalMixin, TestCase):
+    """
+    Descarga protegida y enlaces firmados: el dueño y administración acceden, el resto
+    no, y las API solo entregan enlaces a quien podría descargar el archivo.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        grupos = {nombre: Group.objects.create(name=nombre) for nombre in ('Administrador', 'Consultor', 'Empleado')}
+        requisito = RequisitoDocumento.objects.create(nombre_doc='DNI')
+
+        def usuario(nombre, grupo):
+            user = User.objects.create_user(username=nombre, password='x')
+            user.groups.add(grupos[grupo])
+            return user
+
+        cls.admin = usuario('admin', 'Administrador')
+        cls.consultor = usuario('consultor', 'Consultor')
+        cls.empleados = []
+        for i in range(2):
+            user = usuario(f'empleado{i}', 'Empleado')
+            empleado = Empleado.objects.create(
+                user=user, nombre=f'Nombre {i}', apellido=f'Apellido {i}', dni=30000000 + i,
+                email=f'empleado{i}@example.com', fecha_nacimiento=date(1990, 1, 1),
+            )
+            legajo = Legajo.objects.create(id_empl=empleado, estado_leg='Pendiente', nro_leg=i + 1)
+            Documento.objects.create(
+                id_leg=legajo, id_requisito=requisito,
+                ruta_archivo=SimpleUploadedFile(f'dni{i}.pdf', f'documento {i}'.encode()),
+            )
+            Recibo_Sueldos.objects.create(
+                id_empl=empleado, fecha_emision=date(2026, 1, 31), periodo='2026-01',
+                ruta_pdf=SimpleUploadedFile(f'recibo{i}.pdf', f'recibo {i}'.encode()),
+            )
+            cls.empleados.append(empleado)
+        cls.dueno = cls.empleados[0]
+        cls.documento = Documento.objects.get(id_leg__id_empl=cls.dueno)
+        cls.recibo = Recibo_Sueldos.objects.get(id_empl=cls.dueno)
+
+    def cliente(self, user=None):
+        cliente = APIClient()
+        if user is not None:
+            cliente.force_authenticate(user)
+        return cliente
+
+    def contenido(self, respuesta):
+        return b''.join(respuesta.streaming_content)
+
+    def test_descarga_directa_segun_rol(self):
+        otro = self.empleados[1].user
+        casos = [
+            ('documento', self.documento, self.dueno.user, 200),
+            ('documento', self.documento, self.admin, 200),
+            ('documento', self.documento, otro, 403),
+            ('documento', self.documento, self.consultor, 403),
+            ('recibo', self.recibo, self.dueno.user, 200),
+            ('recibo', self.recibo, self.consultor, 200),
+            ('recibo', self.recibo, otro, 403),
+        ]
+        for tipo, objeto, user, esperado in casos:
+            with self.subTest(tipo=tipo, usuario=user.username):
+                respuesta = self.cliente(user).get(f'/api/descargas/{tipo}/{objeto.pk}/')
+                self.assertEqual(respuesta.status_code, esperado)
+        self.assertEqual(self.cliente().get(f'/api/descargas/documento/{self.documento.pk}/').status_code, 401)
+
+    def test_enlace_firmado_funciona_sin_autenticacion(self):
+        respuesta = self.cliente(self.dueno.user).get(f'/api/descargas/documento/{self.documento.pk}/enlace/')
+        self.assertEqual(respuesta.status_code, 200)
+
+        descarga = self.cliente().get(respuesta.data['url'])
+        self.assertEqual(descarga.status_code, 200)
+        self.assertEqual(self.contenido(descarga), b'documento 0')
+
+    def test_no_se_emiten_enlaces_a_quien_no_puede_descargar(self):
+        ruta = f'/api/descargas/documento/{self.documento.pk}/enlace/'
+        self.assertEqual(self.cliente(self.empleados[1].user).get(ruta).status_code, 403)
+        self.assertEqual(self.cliente(self.consultor).get(ruta).status_code, 403)
+
+    def test_listados_solo_con_enlaces_permitidos(self):
+        # Otro empleado no ve documentos ni recibos ajenos.
+        otro = self.cliente(self.empleados[1].user)
+        ids = {fila['id'] for fila in otro.get('/api/documentos/').data['results']}
+        self.assertNotIn(self.documento.pk, ids)
+        ids = {fila['id'] for fila in otro.get('/api/recibos/').data['results']}
+        self.assertNotIn(self.recibo.pk, ids)
+
+        # El consultor ve los legajos, pero sin enlace a los documentos (solo administración).
+        respuesta = self.cliente(self.consultor).get(f'/api/empleados/{self.dueno.pk}/')
+        documento = respuesta.data['legajo']['documento_set'][0]
+        self.assertIsNone(documento['url_descarga'])
+        self.assertNotIn('ruta_archivo', documento)
+
+        # El dueño recibe un enlace que funciona y no la ruta bajo /media/.
+        fila = self.cliente(self.dueno.user).get('/api/documentos/').data['results'][0]
+        self.assertNotIn('ruta_archivo', fila)
+        self.assertEqual(self.cliente().get(fila['url_descarga']).status_code, 200)
+        fila = self.cliente(self.consultor).get(f'/api/recibos/{self.recibo.pk}/').data
+        self.assertNotIn('ruta_pdf', fila)
+        self.assertEqual(self.cliente().get(fila['url_descarga']).status_code, 200)
+
+    def test_firma_alterada_o_vencida(self):
+        ruta = f'/api/descargas/documento/{self.documento.pk}/'
+        nombre = self.documento.ruta_archivo.name
+        expira = int(time.time()) + 600
+        firma = _firma('documento', self.documento.pk, expira, nombre)
+        self.assertEqual(self.cliente().get(f"{ruta}?{urlencode({'expira': expira, 'firma': firma})}").status_code, 200)
+
+        casos = {
+            'firma alterada': {'expira': expira, 'firma': firma[:-1] + ('0' if firma[-1] != '0' else '1')},
+            'vencimiento cambiado': {'expira': expira + 1, 'firma': firma},
+            'vencido': {'expira': expira - 1200, 'firma': _firma('documento', self.documento.pk, expira - 1200, nombre)},
+            'otro documento': {'expira': expira, 'firma': _firma('documento', self.documento.pk + 1, expira, nombre)},
+            'sin vencimiento': {'firma': firma},
+        }
+        for caso, parametros in casos.items():
+            with self.subTest(caso):
+                self.assertEqual(self.cliente().get(f'{ruta}?{urlencode(parametros)}').status_code, 403)
+
+
+class AlmacenamientoDeduplicadoTests(MediaTemporalMixin, TestCase):
+    """Referencias de los blobs al subir, reemplazar y borrar archivos, y limpieza de huérfanos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='empleado', password='x')
+        empleado = Empleado.objects.create(
+            user=user, nombre='Ana', apellido='Pérez', dni=30000000, email='ana@example.com',
+            fecha_nacimiento=date(1990, 1, 1),
+        )
+        cls.legajo = Legajo.objects.create(id_empl=empleado, estado_leg='Pendiente', nro_leg=1)
+        cls.requisito = RequisitoDocumento.objects.create(nombre_doc='DNI')
+
+    def documento(self, contenido, nombre='escaneo.pdf'):
+        return Documento.objects.create(
+            id_leg=self.legajo, id_requisito=self.requisito, ruta_archivo=SimpleUploadedFile(nombre, contenido),
+        )
+
+    def en_disco(self, nombre):
+        return os.path.exists(almacenamiento_deduplicado.path(nombre))
+
+    def referencias(self, nombre):
+        return Blob.objects.filter(nombre=nombre).values_list('referencias', flat=True).first()
+
+    def test_mismo_contenido_se_guarda_una_vez(self):
+        primero = self.documento(b'mismo escaneo', 'dni_frente.pdf')
+        segundo = self.documento(b'mismo escaneo', 'dni_copia.PDF')
+
+        nombre = primero.ruta_archivo.name
+        self.assertEqual(segundo.ruta_archivo.name, nombre)
+        self.assertTrue(nombre.startswith('archivos/') and nombre.endswith('.pdf'))
+        self.assertTrue(self.en_disco(nombre))
+        self.assertEqual(self.referencias(nombre), 2)
+
+    def test_reemplazo_suelta_el_archivo_anterior(self):
+        documento = self.documento(b'version 1')
+        anterior = documento.ruta_archivo.name
+
+        documento.ruta_archivo = SimpleUploadedFile('escaneo.pdf', b'version 2')
+        with self.captureOnCommitCallbacks(execute=True):
+            documento.save()
+        nuevo = documento.ruta_archivo.name
+        self.assertNotEqual(nuevo, anterior)
+        self.assertFalse(self.en_disco(anterior))
+        self.assertIsNone(self.referencias(anterior))
+        self.assertEqual(self.referencias(nuevo), 1)
+
+        # Subir otra vez el mismo contenido no cambia el nombre ni suma referencias.
+        documento.ruta_archivo = SimpleUploadedFile('otra_vez.pdf', b'version 2')
+        with self.captureOnCommitCallbacks(execute=True):
+            documento.save()
+        self.assertEqual(documento.ruta_archivo.name, nuevo)
+        self.assertTrue(self.en_disco(nuevo))
+        self.assertEqual(self.referencias(nuevo), 1)
+
+    def test_blob_compartido_se_borra_con_la_ultima_referencia(self):
+        primero = self.documento(b'compartido')
+        segundo = self.documento(b'compartido')
+        nombre = primero.ruta_archivo.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            primero.delete()
+        self.assertTrue(self.en_disco(nombre))
+        self.assertEqual(self.referencias(nombre), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            segundo.delete()
+        self.assertFalse(self.en_disco(nombre))
+        self.assertFalse(Blob.objects.filter(nombre=nombre).exists())
+
+    def test_alta_con_el_nombre_de_un_blob_existente_suma_referencia(self):
+        primero = self.documento(b'escaneo original')
+        nombre = primero.ruta_archivo.name
+        segundo = Documento.objects.create(id_leg=self.legajo, id_requisito=self.requisito, ruta_archivo=nombre)
+        self.assertEqual(self.referencias(nombre), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            primero.delete()
+        self.assertTrue(self.en_disco(nombre))
+        self.assertEqual(self.referencias(nombre), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            segundo.delete()
+        self.assertFalse(self.en_disco(nombre))
+
+    def test_copiar_el_nombre_a_otra_fila_suma_referencia(self):
+        primero = self.documento(b'escaneo a copiar')
+        segundo = self.documento(b'otro escaneo')
+        nombre, reemplazado = primero.ruta_archivo.name, segundo.ruta_archivo.name
+
+        segundo.ruta_archivo = primero.ruta_archivo.name
+        with self.captureOnCommitCallbacks(execute=True):
+            segundo.save()
+        self.assertEqual(self.referencias(nombre), 2)
+        self.assertFalse(self.en_disco(reemplazado))
+
+        # Guardar de nuevo sin cambiar el archivo no suma otra referencia.
+        segundo.save()
+        self.assertEqual(self.referencias(nombre), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            primero.delete()
+        self.assertTrue(self.en_disco(nombre))
+        self.assertEqual(self.referencias(nombre), 1)
+
+    @override_settings(TAREAS_EN_SEGUNDO_PLANO=False)
+    def test_guardar_una_instancia_vieja_despues_de_recomprimir(self):
+        imagen = io.BytesIO()
+        Image.effect_noise((800, 800), 64).convert('RGB').save(imagen, 'PNG')
+        documento = self.documento(imagen.getvalue(), 'dni.png')
+        original = documento.ruta_archivo.name
+        vieja = Documento.objects.get(pk=documento.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(recomprimir_imagen('empleados.Documento', documento.pk, 'ruta_archivo', original))
+        recomprimida = Documento.objects.get(pk=documento.pk).ruta_archivo.name
+        self.assertNotEqual(recomprimida, original)
+        self.assertFalse(self.en_disco(original))
+
+        # La instancia vieja todavía apunta al original, que ya se borró.
+        vieja.descripcion_doc = 'Frente y dorso'
+        with self.captureOnCommitCallbacks(execute=True):
+            vieja.save()
+        vieja.refresh_from_db()
+        self.assertTrue(self.en_disco(vieja.ruta_archivo.name))
+        self.assertEqual(self.referencias(vieja.ruta_archivo.name), 1)
+
+    def test_recontar_borra_archivos_de_transacciones_deshechas(self):
+        vigente = self.documento(b'vigente').ruta_archivo.name
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                huerfano = self.documento(b'alta deshecha').ruta_archivo.name
+                raise RuntimeError('falla el alta')
+        self.assertTrue(self.en_disco(huerfano))
+        self.assertFalse(Blob.objects.filter(nombre=huerfano).exists())
+
+        # Recién creado puede ser de una subida en curso: se conserva.
+        call_command('deduplicar_media', recontar=True, stdout=io.StringIO())
+        self.assertTrue(self.en_disco(huerfano))
+
+        viejo = time.time() - 2 * 60 * 60
+        for nombre in (huerfano, vigente):
+            os.utime(almacenamiento_deduplicado.path(nombre), (viejo, viejo))
+        salida = io.StringIO()
+        call_command('deduplicar_media', recontar=True, stdout=salida)
+        self.assertIn('Archivos sin blob eliminados: 1', salida.getvalue())
+        self.assertFalse(self.en_disco(huerfano))
+        self.assertFalse(Blob.objects.filter(nombre=huerfano).exists())
+        self.assertTrue(self.en_disco(vigente))
+        self.assertEqual(self.referencias(vigente), 1)
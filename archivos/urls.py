@@ -0,0 +1,9 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('archivos/estadisticas-imagenes/', views.estadisticas_imagenes, name='estadisticas-imagenes'),
+    path('descargas/<str:tipo>/<int:pk>/', views.descargar_archivo, name='descargar-archivo'),
+    path('descargas/<str:tipo>/<int:pk>/enlace/', views.enlace_archivo, name='enlace-archivo'),
+]
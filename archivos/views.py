@@ -0,0 +1,64 @@
+from drf_spectacular.utils import extend_schema
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from usuarios.roles import es_admin
+
+from .descargas import enlace_firmado, obtener_descargable, puede_descargar, respuesta_archivo, segundos_vigentes
+from .imagenes import estadisticas_recompresion
+
+
+@extend_schema(tags=['Archivos'])
+@api_view(['GET'])
+def estadisticas_imagenes(request):
+    """
+    Devuelve cuántas imágenes subidas se recomprimieron y cuánto espacio se ahorró, en
+    total y por modelo, junto con la configuración vigente. Solo para administradores.
+    """
+    if not es_admin(request.user):
+        return Response({'error': 'No tiene permiso para realizar esta acción.'}, status=status.HTTP_403_FORBIDDEN)
+    return Response(estadisticas_recompresion(), status=status.HTTP_200_OK)
+
+
+@extend_schema(tags=['Archivos'])
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def descargar_archivo(request, tipo, pk):
+    """
+    Descarga protegida de un recibo ('recibo') o documento de legajo ('documento').
+    Acepta un usuario autenticado con acceso al archivo o un enlace firmado vigente
+    (?expira=&firma=, ver `enlace_archivo`). Los bytes los envía el proxy si
+    DESCARGAS_MODO es 'x-accel' o 'x-sendfile'.
+    """
+    objeto, archivo = obtener_descargable(tipo, pk)
+    if objeto is None:
+        return Response({'error': 'Archivo no encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+
+    if 'firma' in request.query_params:
+        restantes = segundos_vigentes(tipo, objeto, archivo, request.query_params.get('expira'), request.query_params.get('firma'))
+        if restantes is None:
+            return Response({'error': 'El enlace no es válido o ya venció.'}, status=status.HTTP_403_FORBIDDEN)
+        return respuesta_archivo(request, archivo, max_age=restantes)
+
+    if not request.user.is_authenticated:
+        return Response({'error': 'Se requiere autenticación.'}, status=status.HTTP_401_UNAUTHORIZED)
+    if not puede_descargar(request.user, tipo, objeto):
+        return Response({'error': 'No tiene permiso para realizar esta acción.'}, status=status.HTTP_403_FORBIDDEN)
+    return respuesta_archivo(request, archivo)
+
+
+@extend_schema(tags=['Archivos'])
+@api_view(['GET'])
+def enlace_archivo(request, tipo, pk):
+    """
+    Devuelve un enlace firmado y con vencimiento para descargar el archivo sin
+    autenticación (para compartirlo o abrirlo directo en el navegador).
+    """
+    objeto, archivo = obtener_descargable(tipo, pk)
+    if objeto is None:
+        return Response({'error': 'Archivo no encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+    if not puede_descargar(request.user, tipo, objeto):
+        return Response({'error': 'No tiene permiso para realizar esta acción.'}, status=status.HTTP_403_FORBIDDEN)
+    return Response({'url': enlace_firmado(tipo, objeto, request)}, status=status.HTTP_200_OK)
@@ -1,3 +1,52 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-# Register your models here.
+from .models import Asistencia, AsistenciaArchivo, Ausencia
+from .retrasos import recalcular_retrasos
+
+
+@admin.register(Asistencia)
+class AsistenciaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'id_empl', 'fecha_hora', 'minutos_retraso')
+    list_filter = ('fecha_hora',)
+    search_fields = ('id_empl__nombre', 'id_empl__apellido', 'id_empl__dni')
+    list_select_related = ('id_empl',)
+    date_hierarchy = 'fecha_hora'
+    actions = ['recalcular_retrasos', 'simular_recalculo_retrasos']
+
+    def _informar(self, request, resumen, simulacion):
+        prefijo = "[Simulación] " if simulacion else ""
+        self.message_user(
+            request,
+            f"{prefijo}Asistencias revisadas: {resumen['revisadas']}. Modificadas: {resumen['modificadas']}. "
+            f"Sin horario asignado: {resumen['sin_horario']}. "
+            f"Minutos de retraso: {resumen['minutos_antes']} -> {resumen['minutos_despues']}.",
+            messages.SUCCESS,
+        )
+
+    @admin.action(description="Recalcular minutos de retraso")
+    def recalcular_retrasos(self, request, queryset):
+        self._informar(request, recalcular_retrasos(queryset.order_by()), simulacion=False)
+
+    @admin.action(description="Simular recálculo de minutos de retraso (sin guardar)")
+    def simular_recalculo_retrasos(self, request, queryset):
+        self._informar(request, recalcular_retrasos(queryset.order_by(), dry_run=True), simulacion=True)
+
+
+@admin.register(Ausencia)
+class AusenciaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'id_empl', 'fecha', 'id_horario', 'justificada', 'fecha_deteccion')
+    list_filter = ('fecha', 'justificada')
+    search_fields = ('id_empl__nombre', 'id_empl__apellido', 'id_empl__dni')
+    list_select_related = ('id_empl', 'id_horario')
+    date_hierarchy = 'fecha'
+
+
+@admin.register(AsistenciaArchivo)
+class AsistenciaArchivoAdmin(admin.ModelAdmin):
+    list_display = ('periodo', 'cantidad', 'fecha_archivo')
+    exclude = ('datos',)
+    readonly_fields = ('periodo', 'cantidad', 'fecha_archivo')
+
+    def has_add_permission(self, request):
+        # Los archivos solo los genera el comando archivar_asistencias.
+        return False
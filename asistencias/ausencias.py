@@ -0,0 +1,98 @@
+import logging
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Exists, Min, OuterRef, Q
+from django.utils import timezone
+
+from horarios.models import AsignacionHorario
+from notificaciones.models import Notificacion
+from notificaciones.servicios import armar_notificaciones
+from .models import Asistencia, Ausencia
+from .reportes import DIAS_SEMANA
+
+logger = logging.getLogger(__name__)
+
+# Estados de empleado que no deben marcar asistencia.
+ESTADOS_EXCLUIDOS = ['Licencia', 'Suspendido', 'Inactivo']
+
+
+def empleados_ausentes(fecha):
+    """
+    Devuelve, en una sola consulta, los empleados que debían trabajar en `fecha`
+    según sus horarios activos y no registraron asistencia ni tienen ya una ausencia
+    cargada para ese día. Cada fila trae el id del empleado, su usuario y el horario.
+    """
+    inicio = timezone.make_aware(datetime.combine(fecha, time.min))
+    fin = timezone.make_aware(datetime.combine(fecha + timedelta(days=1), time.min))
+
+    asistencias_del_dia = Asistencia.objects.filter(
+        id_empl=OuterRef('id_empl'), fecha_hora__gte=inicio, fecha_hora__lt=fin
+    )
+    ausencias_del_dia = Ausencia.objects.filter(id_empl=OuterRef('id_empl'), fecha=fecha)
+
+    return AsignacionHorario.objects.filter(
+        estado=True,
+        fecha_asignacion__lte=fecha,
+        **{f'id_horario__{DIAS_SEMANA[fecha.weekday()]}': True}
+    ).exclude(
+        Q(id_empl__estado__in=ESTADOS_EXCLUIDOS) | Q(id_empl__fecha_ingreso__gt=fecha)
+    ).filter(
+        ~Exists(asistencias_del_dia), ~Exists(ausencias_del_dia)
+    ).values('id_empl', 'id_empl__user_id').annotate(horario=Min('id_horario')).order_by('id_empl')
+
+
+def _insertar_ausencias(fecha, ausentes):
+    """
+    Inserta las ausencias de `ausentes` (filas de empleados_ausentes) con un único
+    INSERT ... ON CONFLICT DO NOTHING y devuelve los ids de los empleados cuya ausencia
+    se insertó de verdad: las que ya existían (cargadas por otra ejecución) no vuelven.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {Ausencia._meta.db_table} (id_empl_id, id_horario_id, fecha, fecha_deteccion, justificada)"
+            f" SELECT empleado, horario, %s, %s, false FROM unnest(%s::bigint[], %s::bigint[]) AS t(empleado, horario)"
+            f" ON CONFLICT DO NOTHING RETURNING id_empl_id",
+            [fecha, timezone.now(), [fila['id_empl'] for fila in ausentes], [fila['horario'] for fila in ausentes]],
+        )
+        return {id_empl for id_empl, in cursor.fetchall()}
+
+
+def detectar_ausencias(fecha):
+    """
+    Registra las ausencias de `fecha` y notifica a cada empleado ausente y a los
+    administradores. Las inserciones se hacen en bloque y es seguro volver a
+    ejecutarlo para el mismo día, incluso con otra ejecución en curso: solo se agregan
+    (y se notifican) las ausencias nuevas.
+    Devuelve la cantidad de ausencias registradas.
+    """
+    with transaction.atomic():
+        ausentes = list(empleados_ausentes(fecha))
+        if not ausentes:
+            return 0
+
+        # Una ejecución simultánea para el mismo día pudo cargar algunas: se notifica solo
+        # por las que insertó esta.
+        insertadas = _insertar_ausencias(fecha, ausentes)
+        ausentes = [fila for fila in ausentes if fila['id_empl'] in insertadas]
+        if not ausentes:
+            return 0
+
+        fecha_texto = fecha.strftime('%d/%m/%Y')
+        notificaciones = armar_notificaciones(
+            [fila['id_empl__user_id'] for fila in ausentes],
+            "No se registró tu asistencia el día {fecha}.",
+            enlace="/asistencias/mis-asistencias/", fecha=fecha_texto,
+        )
+        administradores = User.objects.filter(
+            Q(is_superuser=True) | Q(groups__name='Administrador'), is_active=True
+        ).distinct().values_list('id', flat=True)
+        notificaciones += armar_notificaciones(
+            administradores, "Se detectaron {cantidad} ausencias el día {fecha}.",
+            enlace="/asistencias/", cantidad=len(ausentes), fecha=fecha_texto,
+        )
+        Notificacion.objects.bulk_create(notificaciones)
+
+    logger.info(f"Se registraron {len(ausentes)} ausencias para el {fecha.isoformat()}.")
+    return len(ausentes)
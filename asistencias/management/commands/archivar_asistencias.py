@@ -0,0 +1,87 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from django.utils import timezone
+
+from asistencias.models import AsistenciaArchivo
+from asistencias.particiones import (
+    ParticionadoNoDisponible, comprimir_particion, desvincular_particion, nombre_particion,
+    particiones_mensuales, restaurar_archivo,
+)
+
+
+def _periodo(valor):
+    try:
+        year, month = valor.split('-')
+        return date(int(year), int(month), 1)
+    except ValueError:
+        raise CommandError(f"Período inválido '{valor}'. Use el formato AAAA-MM.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Saca de la tabla de asistencias las particiones de los meses más antiguos: las desvincula "
+        "(quedan como tablas sueltas) o las comprime en AsistenciaArchivo. También restaura un mes archivado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses-a-conservar',
+            type=int,
+            help='Meses anteriores al actual que se mantienen en línea. Por defecto, ASISTENCIA_MESES_EN_LINEA.',
+        )
+        parser.add_argument(
+            '--modo',
+            choices=['comprimir', 'desvincular'],
+            default='comprimir',
+            help='comprimir: guarda el mes en AsistenciaArchivo y elimina la partición. '
+                 'desvincular: separa la partición y la deja como tabla independiente.',
+        )
+        parser.add_argument('--restaurar', metavar='AAAA-MM', help='Vuelve a cargar un mes archivado con --modo comprimir.')
+        parser.add_argument('--dry-run', action='store_true', help='Muestra qué particiones se archivarían sin modificar nada.')
+
+    def handle(self, *args, **options):
+        try:
+            if options['restaurar']:
+                self._restaurar(_periodo(options['restaurar']))
+            else:
+                self._archivar(options)
+        except ParticionadoNoDisponible as e:
+            raise CommandError(str(e))
+
+    def _restaurar(self, periodo):
+        try:
+            cantidad = restaurar_archivo(periodo)
+        except AsistenciaArchivo.DoesNotExist:
+            raise CommandError(f"No hay un archivo de asistencias para {periodo:%Y-%m}.")
+        self.stdout.write(self.style.SUCCESS(f"Asistencias de {periodo:%Y-%m} restauradas: {cantidad}."))
+
+    def _archivar(self, options):
+        conservar = options['meses_a_conservar']
+        if conservar is None:
+            conservar = getattr(settings, 'ASISTENCIA_MESES_EN_LINEA', 24)
+        if conservar < 1:
+            raise CommandError("Debe conservarse al menos el mes anterior al actual.")
+
+        hoy = timezone.localdate()
+        indice = hoy.year * 12 + hoy.month - 1 - conservar
+        limite = date(indice // 12, indice % 12 + 1, 1)
+        periodos = [periodo for periodo in particiones_mensuales() if periodo < limite]
+        if not periodos:
+            self.stdout.write(self.style.SUCCESS(f"No hay particiones anteriores a {limite:%Y-%m}."))
+            return
+
+        for periodo in periodos:
+            if options['dry_run']:
+                self.stdout.write(f"[Simulación] Se archivaría {nombre_particion(periodo)} ({options['modo']}).")
+                continue
+            try:
+                if options['modo'] == 'comprimir':
+                    cantidad = comprimir_particion(periodo)
+                else:
+                    cantidad = desvincular_particion(periodo)
+            except DatabaseError as e:
+                raise CommandError(f"No se pudo archivar {nombre_particion(periodo)}: {e}")
+            self.stdout.write(self.style.SUCCESS(f"{nombre_particion(periodo)}: {cantidad} asistencias archivadas."))
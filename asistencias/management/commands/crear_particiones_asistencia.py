@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from asistencias.particiones import ParticionadoNoDisponible, crear_particiones
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea por adelantado las particiones mensuales de la tabla de asistencias. "
+        "Pensado para ejecutarse una vez por mes desde cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses',
+            type=int,
+            help='Cantidad de meses posteriores al actual a preparar. Por defecto, ASISTENCIA_PARTICIONES_ADELANTADAS.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            creadas = crear_particiones(options['meses'])
+        except ParticionadoNoDisponible as e:
+            raise CommandError(str(e))
+
+        if creadas:
+            self.stdout.write(self.style.SUCCESS(f"Particiones creadas: {', '.join(creadas)}."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Las particiones ya existían."))
@@ -0,0 +1,31 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from asistencias.ausencias import detectar_ausencias
+
+
+class Command(BaseCommand):
+    help = (
+        "Registra las ausencias de los empleados con horario asignado que no marcaron asistencia "
+        "y les envía una notificación. Pensado para ejecutarse cada noche desde cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fecha',
+            help='Día a procesar (AAAA-MM-DD). Por defecto, el día anterior.',
+        )
+
+    def handle(self, *args, **options):
+        if options['fecha']:
+            try:
+                fecha = date.fromisoformat(options['fecha'])
+            except ValueError:
+                raise CommandError(f"Fecha inválida '{options['fecha']}'. Use el formato AAAA-MM-DD.")
+        else:
+            fecha = timezone.localdate() - timedelta(days=1)
+
+        cantidad = detectar_ausencias(fecha)
+        self.stdout.write(self.style.SUCCESS(f"Ausencias registradas para el {fecha.isoformat()}: {cantidad}."))
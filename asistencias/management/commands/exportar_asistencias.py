@@ -0,0 +1,36 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from asistencias.volcado import exportar_asistencias
+
+
+def _parsear_fecha(valor):
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f"Fecha inválida '{valor}'. Use el formato AAAA-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = "Exporta las asistencias en CSV usando COPY de PostgreSQL (opcionalmente comprimido con gzip)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Fecha inicial inclusiva (AAAA-MM-DD).')
+        parser.add_argument('--hasta', help='Fecha final inclusiva (AAAA-MM-DD).')
+        parser.add_argument('--salida', help='Archivo de salida. Si se omite se escribe en la salida estándar.')
+        parser.add_argument('--gzip', action='store_true', help='Comprime la salida con gzip.')
+
+    def handle(self, *args, **options):
+        desde = _parsear_fecha(options['desde']) if options['desde'] else None
+        hasta = _parsear_fecha(options['hasta']) if options['hasta'] else None
+        comprimir = options['gzip'] or (options['salida'] or '').endswith('.gz')
+
+        if options['salida']:
+            with open(options['salida'], 'wb') as destino:
+                exportar_asistencias(destino, desde, hasta, comprimir)
+            self.stderr.write(self.style.SUCCESS(f"Asistencias exportadas en {options['salida']}."))
+        else:
+            exportar_asistencias(sys.stdout.buffer, desde, hasta, comprimir)
+            sys.stdout.buffer.flush()
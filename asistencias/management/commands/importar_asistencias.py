@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from asistencias.volcado import FormatoInvalido, importar_asistencias
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa asistencias desde un CSV con cabecera (id_empl_id, fecha_hora y opcionalmente tipo y "
+        "minutos_retraso) usando COPY de PostgreSQL. Descarta empleados inexistentes y marcas del mismo "
+        "tipo repetidas en el mismo día."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Archivo CSV a importar (admite .csv.gz).')
+        parser.add_argument('--gzip', action='store_true', help='Indica que el archivo está comprimido con gzip.')
+
+    def handle(self, *args, **options):
+        comprimido = options['gzip'] or options['archivo'].endswith('.gz')
+        try:
+            with open(options['archivo'], 'rb') as origen:
+                resumen = importar_asistencias(origen, comprimido)
+        except OSError as e:
+            raise CommandError(f"No se pudo leer el archivo: {e}")
+        except (DatabaseError, FormatoInvalido) as e:
+            raise CommandError(f"El archivo no tiene un formato válido: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Filas leídas: {resumen['leidas']}. Insertadas: {resumen['insertadas']}. "
+            f"Empleados inexistentes: {resumen['empleados_inexistentes']}. Tipo inválido: {resumen['tipo_invalido']}. "
+            f"Ya registradas: {resumen['ya_registradas']}. Duplicadas en el archivo: {resumen['duplicadas']}."
+        ))
@@ -0,0 +1,58 @@
+from datetime import date, datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from asistencias.models import Asistencia
+from asistencias.retrasos import recalcular_retrasos
+
+
+def _parsear_fecha(valor):
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f"Fecha inválida '{valor}'. Use el formato AAAA-MM-DD.")
+
+
+def _parsear_ids(valor):
+    try:
+        return [int(i) for i in valor.split(',') if i.strip()]
+    except ValueError:
+        raise CommandError(f"Lista de IDs inválida '{valor}'. Use números separados por comas.")
+
+
+class Command(BaseCommand):
+    help = "Recalcula los minutos de retraso de las asistencias de un rango de fechas según los horarios vigentes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', required=True, help='Fecha inicial inclusiva (AAAA-MM-DD).')
+        parser.add_argument('--hasta', required=True, help='Fecha final inclusiva (AAAA-MM-DD).')
+        parser.add_argument('--empleados', help='IDs de empleados separados por comas.')
+        parser.add_argument('--horarios', help='IDs de horarios separados por comas.')
+        parser.add_argument('--lote', type=int, default=2000, help='Cantidad de filas por lote (por defecto 2000).')
+        parser.add_argument('--dry-run', action='store_true', help='Muestra el resumen sin guardar cambios.')
+
+    def handle(self, *args, **options):
+        desde = _parsear_fecha(options['desde'])
+        hasta = _parsear_fecha(options['hasta'])
+        if hasta < desde:
+            raise CommandError("La fecha 'hasta' no puede ser anterior a 'desde'.")
+
+        asistencias = Asistencia.objects.filter(
+            fecha_hora__gte=timezone.make_aware(datetime.combine(desde, time.min)),
+            fecha_hora__lt=timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min)),
+        )
+        if options['empleados']:
+            asistencias = asistencias.filter(id_empl_id__in=_parsear_ids(options['empleados']))
+        horario_ids = _parsear_ids(options['horarios']) if options['horarios'] else None
+
+        resumen = recalcular_retrasos(
+            asistencias, horario_ids=horario_ids, dry_run=options['dry_run'], tamano_lote=options['lote']
+        )
+
+        prefijo = "[Simulación] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefijo}Asistencias revisadas: {resumen['revisadas']}. Modificadas: {resumen['modificadas']}. "
+            f"Sin horario asignado: {resumen['sin_horario']}. "
+            f"Minutos de retraso: {resumen['minutos_antes']} -> {resumen['minutos_despues']}."
+        ))
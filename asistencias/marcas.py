@@ -0,0 +1,59 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from empleados.models import Empleado
+from .models import Asistencia
+
+
+def jornada_maxima():
+    return getattr(settings, 'ASISTENCIA_JORNADA_MAXIMA', timedelta(hours=16))
+
+
+def registrar_marca(empleado, momento=None):
+    """
+    Registra una marca de entrada o salida para el empleado según la regla de emparejamiento:
+
+    - Si la última marca dentro de la jornada máxima es una entrada abierta, la nueva marca
+      es la salida de esa entrada (así los turnos nocturnos cierran al día siguiente).
+      Durante el intervalo mínimo posterior a la entrada no se registra nada, para que el
+      mismo rostro reconocido en frames consecutivos no genere una salida inmediata.
+    - Si no, y el empleado todavía no registró su entrada del día, la marca es una entrada
+      y se calculan los minutos de retraso.
+    - En cualquier otro caso el empleado ya completó su jornada y no se registra nada.
+
+    Devuelve la Asistencia creada o None si no correspondía registrar una marca.
+    """
+    momento = momento or timezone.now()
+    intervalo_minimo = getattr(settings, 'ASISTENCIA_INTERVALO_MINIMO_SALIDA', timedelta(minutes=30))
+
+    with transaction.atomic():
+        # Bloqueamos al empleado para que dos frames simultáneos no registren dos marcas.
+        Empleado.objects.select_for_update().filter(pk=empleado.pk).exists()
+
+        ultima = Asistencia.objects.filter(
+            id_empl=empleado,
+            fecha_hora__gt=momento - jornada_maxima(),
+            fecha_hora__lte=momento,
+        ).order_by('-fecha_hora').first()
+
+        if ultima and ultima.tipo == Asistencia.ENTRADA:
+            if momento - ultima.fecha_hora < intervalo_minimo:
+                return None
+            return Asistencia.objects.create(id_empl=empleado, fecha_hora=momento, tipo=Asistencia.SALIDA)
+
+        inicio_del_dia = timezone.make_aware(datetime.combine(timezone.localtime(momento).date(), time.min))
+        if Asistencia.objects.filter(
+            id_empl=empleado,
+            tipo=Asistencia.ENTRADA,
+            fecha_hora__gte=inicio_del_dia,
+            fecha_hora__lt=inicio_del_dia + timedelta(days=1),
+        ).exists():
+            return None
+
+        asistencia = Asistencia(id_empl=empleado, fecha_hora=momento, tipo=Asistencia.ENTRADA)
+        asistencia.minutos_retraso = asistencia.calcular_retraso()
+        asistencia.save()
+        return asistencia
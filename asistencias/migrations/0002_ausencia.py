@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asistencias', '0001_initial'),
+        ('empleados', '0001_initial'),
+        ('horarios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ausencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('fecha_deteccion', models.DateTimeField(auto_now_add=True)),
+                ('justificada', models.BooleanField(default=False)),
+                ('id_empl', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ausencias', to='empleados.empleado')),
+                ('id_horario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='horarios.horarios')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('id_empl', 'fecha'), name='ausencia_unica_por_dia')],
+            },
+        ),
+    ]
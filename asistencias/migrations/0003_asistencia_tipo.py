@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asistencias', '0002_ausencia'),
+        ('empleados', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asistencia',
+            name='tipo',
+            field=models.CharField(choices=[('ENTRADA', 'Entrada'), ('SALIDA', 'Salida')], default='ENTRADA', max_length=7),
+        ),
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['id_empl', 'fecha_hora'], name='asistencia_empl_fecha_idx'),
+        ),
+    ]
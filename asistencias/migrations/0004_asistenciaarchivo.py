@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asistencias', '0003_asistencia_tipo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AsistenciaArchivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.DateField(help_text='Primer día del mes archivado.', unique=True)),
+                ('cantidad', models.PositiveIntegerField()),
+                ('datos', models.BinaryField()),
+                ('fecha_archivo', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
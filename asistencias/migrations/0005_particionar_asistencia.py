@@ -0,0 +1,108 @@
+from datetime import datetime
+
+from django.db import migrations
+from django.utils import timezone
+
+TABLA = 'asistencias_asistencia'
+# Meses por delante del actual para los que se crean particiones al migrar.
+MESES_ADELANTE = 3
+
+
+def _sumar_meses(year, month, meses):
+    indice = year * 12 + month - 1 + meses
+    return indice // 12, indice % 12 + 1
+
+
+def _estructura(cursor):
+    """Índices y restricciones (salvo la clave primaria) de la tabla, para recrearlos."""
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s"
+        " AND indexname <> %s",
+        [TABLA, f'{TABLA}_pkey'],
+    )
+    # En una tabla particionada la definición dice "ON ONLY": la quitamos para que el
+    # índice se propague a las particiones.
+    indices = [fila[0].replace(' ON ONLY ', ' ON ') for fila in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint"
+        " WHERE conrelid = %s::regclass AND contype IN ('c', 'f', 'u')",
+        [TABLA],
+    )
+    restricciones = cursor.fetchall()
+    return indices, restricciones
+
+
+def _reconstruir(cursor, indices, restricciones, clave_primaria):
+    cursor.execute(f"SELECT COALESCE(max(id), 0) + 1 FROM {TABLA}")
+    siguiente_id = cursor.fetchone()[0]
+    cursor.execute(f"CREATE SEQUENCE {TABLA}_id_seq OWNED BY {TABLA}.id")
+    cursor.execute(f"SELECT setval('{TABLA}_id_seq', %s, false)", [siguiente_id])
+    cursor.execute(f"ALTER TABLE {TABLA} ALTER COLUMN id SET DEFAULT nextval('{TABLA}_id_seq')")
+    cursor.execute(f"ALTER TABLE {TABLA} ADD CONSTRAINT {TABLA}_pkey PRIMARY KEY ({clave_primaria})")
+    for indice in indices:
+        cursor.execute(indice)
+    for nombre, definicion in restricciones:
+        cursor.execute(f"ALTER TABLE {TABLA} ADD CONSTRAINT {nombre} {definicion}")
+
+
+def particionar(apps, schema_editor):
+    """
+    Convierte la tabla de asistencias en una tabla particionada por mes sobre fecha_hora.
+    La clave primaria pasa a ser (id, fecha_hora), porque en PostgreSQL debe incluir la
+    columna de particionado; id sigue siendo único porque lo genera una secuencia.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        indices, restricciones = _estructura(cursor)
+        cursor.execute(f"SELECT min(fecha_hora) FROM {TABLA}")
+        primera = cursor.fetchone()[0]
+
+        cursor.execute(f"ALTER TABLE {TABLA} RENAME TO {TABLA}_sin_particionar")
+        cursor.execute(
+            f"CREATE TABLE {TABLA} (LIKE {TABLA}_sin_particionar INCLUDING DEFAULTS)"
+            f" PARTITION BY RANGE (fecha_hora)"
+        )
+        # El default de id se reemplaza por una secuencia propia al final.
+        cursor.execute(f"ALTER TABLE {TABLA} ALTER COLUMN id DROP DEFAULT")
+        cursor.execute(f"CREATE TABLE {TABLA}_default PARTITION OF {TABLA} DEFAULT")
+
+        hoy = timezone.localdate()
+        year, month = (timezone.localtime(primera).year, timezone.localtime(primera).month) if primera else (hoy.year, hoy.month)
+        limite = _sumar_meses(hoy.year, hoy.month, MESES_ADELANTE)
+        while (year, month) <= limite:
+            siguiente = _sumar_meses(year, month, 1)
+            cursor.execute(
+                f"CREATE TABLE {TABLA}_p{year}{month:02d} PARTITION OF {TABLA} FOR VALUES FROM (%s) TO (%s)",
+                [timezone.make_aware(datetime(year, month, 1)), timezone.make_aware(datetime(*siguiente, 1))],
+            )
+            year, month = siguiente
+
+        cursor.execute(f"INSERT INTO {TABLA} SELECT * FROM {TABLA}_sin_particionar")
+        cursor.execute(f"DROP TABLE {TABLA}_sin_particionar")
+        _reconstruir(cursor, indices, restricciones, 'id, fecha_hora')
+
+
+def desparticionar(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        indices, restricciones = _estructura(cursor)
+        cursor.execute(f"ALTER TABLE {TABLA} RENAME TO {TABLA}_particionada")
+        cursor.execute(f"CREATE TABLE {TABLA} (LIKE {TABLA}_particionada)")
+        cursor.execute(f"INSERT INTO {TABLA} SELECT * FROM {TABLA}_particionada")
+        cursor.execute(f"DROP TABLE {TABLA}_particionada CASCADE")
+        _reconstruir(cursor, indices, restricciones, 'id')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asistencias', '0004_asistenciaarchivo'),
+    ]
+
+    operations = [
+        migrations.RunPython(particionar, desparticionar),
+    ]
@@ -18,10 +18,22 @@ class Rostro(models.Model):
         return f"Rostro de {self.id_empl.nombre} {self.id_empl.apellido}"
 
 class Asistencia(models.Model):
+    ENTRADA = 'ENTRADA'
+    SALIDA = 'SALIDA'
+    TIPO_CHOICES = [
+        (ENTRADA, 'Entrada'),
+        (SALIDA, 'Salida'),
+    ]
+
     id_empl = models.ForeignKey(Empleado, on_delete=models.CASCADE)
     fecha_hora = models.DateTimeField(default=timezone.now)
     minutos_retraso= models.IntegerField(default=0)
-    # Podrías agregar un campo 'tipo' si quieres diferenciar entre 'Entrada' y 'Salida'
+    tipo = models.CharField(max_length=7, choices=TIPO_CHOICES, default=ENTRADA)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id_empl', 'fecha_hora'], name='asistencia_empl_fecha_idx'),
+        ]
     
     def calcular_retraso(self):
         """
@@ -49,4 +61,36 @@ class Asistencia(models.Model):
         return 0
 
     def __str__(self):
-        return f"Asistencia de {self.id_empl.nombre} - {self.fecha_hora.strftime('%Y-%m-%d %H:%M')}"
\ No newline at end of file
+        return f"{self.get_tipo_display()} de {self.id_empl.nombre} - {self.fecha_hora.strftime('%Y-%m-%d %H:%M')}"
+
+class Ausencia(models.Model):
+    """
+    Día en que un empleado con horario asignado no registró asistencia.
+    Lo genera el comando detectar_ausencias; hay a lo sumo una por empleado y día.
+    """
+    id_empl = models.ForeignKey(Empleado, on_delete=models.CASCADE, related_name='ausencias')
+    id_horario = models.ForeignKey('horarios.Horarios', on_delete=models.SET_NULL, null=True, blank=True)
+    fecha = models.DateField()
+    fecha_deteccion = models.DateTimeField(auto_now_add=True)
+    justificada = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['id_empl', 'fecha'], name='ausencia_unica_por_dia'),
+        ]
+
+    def __str__(self):
+        return f"Ausencia de {self.id_empl.nombre} - {self.fecha.strftime('%Y-%m-%d')}"
+
+class AsistenciaArchivo(models.Model):
+    """
+    Asistencias de un mes archivado: la partición del mes se vuelca en un CSV
+    comprimido con gzip y se elimina de la tabla Asistencia.
+    """
+    periodo = models.DateField(unique=True, help_text="Primer día del mes archivado.")
+    cantidad = models.PositiveIntegerField()
+    datos = models.BinaryField()
+    fecha_archivo = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Archivo de asistencias {self.periodo.strftime('%Y-%m')} ({self.cantidad} marcas)"
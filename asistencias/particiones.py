@@ -0,0 +1,182 @@
+import gzip
+import io
+import logging
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Asistencia, AsistenciaArchivo
+from .signals import invalidar_reportes_asistencia
+
+logger = logging.getLogger(__name__)
+
+# La tabla Asistencia está particionada por rango de fecha_hora, una partición por mes
+# (ver la migración 0005_particionar_asistencia). Las filas fuera de toda partición
+# mensual caen en la partición por defecto, así una inserción nunca falla.
+TABLA = Asistencia._meta.db_table
+PARTICION_DEFAULT = f"{TABLA}_default"
+
+
+class ParticionadoNoDisponible(Exception):
+    pass
+
+
+def _verificar_postgresql():
+    if connection.vendor != 'postgresql':
+        raise ParticionadoNoDisponible("El particionado de asistencias solo está disponible en PostgreSQL.")
+
+
+def _sumar_meses(periodo, meses):
+    indice = periodo.year * 12 + periodo.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def nombre_particion(periodo):
+    return f"{TABLA}_p{periodo.year}{periodo.month:02d}"
+
+
+def _limites(periodo):
+    inicio = timezone.make_aware(datetime(periodo.year, periodo.month, 1))
+    siguiente = _sumar_meses(periodo, 1)
+    fin = timezone.make_aware(datetime(siguiente.year, siguiente.month, 1))
+    return inicio, fin
+
+
+def particiones_mensuales():
+    """
+    Devuelve los períodos (primer día del mes) que tienen una partición adjunta a la tabla.
+    """
+    _verificar_postgresql()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid"
+            " WHERE i.inhparent = %s::regclass",
+            [TABLA],
+        )
+        nombres = [fila[0] for fila in cursor.fetchall()]
+    prefijo = f"{TABLA}_p"
+    return sorted(
+        date(int(nombre[-6:-2]), int(nombre[-2:]), 1)
+        for nombre in nombres if nombre.startswith(prefijo)
+    )
+
+
+def crear_particion(periodo):
+    """
+    Crea la partición del mes de `periodo` si no existe. Devuelve True si la creó.
+
+    La partición se arma como tabla independiente, se le mueven las filas de ese mes
+    que hubieran caído en la partición por defecto y recién después se adjunta:
+    PostgreSQL no permite crear una partición cuyo rango tenga filas en la de defecto.
+    """
+    _verificar_postgresql()
+    periodo = periodo.replace(day=1)
+    nombre = nombre_particion(periodo)
+    inicio, fin = _limites(periodo)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Serializamos la creación para que dos procesos no intenten crear la misma partición.
+        cursor.execute(f"LOCK TABLE {TABLA} IN SHARE ROW EXCLUSIVE MODE")
+        cursor.execute("SELECT to_regclass(%s)", [nombre])
+        if cursor.fetchone()[0] is not None:
+            return False
+
+        cursor.execute(f"CREATE TABLE {nombre} (LIKE {TABLA})")
+        cursor.execute(
+            f"WITH movidas AS ("
+            f" DELETE FROM {PARTICION_DEFAULT} WHERE fecha_hora >= %s AND fecha_hora < %s RETURNING *"
+            f") INSERT INTO {nombre} SELECT * FROM movidas",
+            [inicio, fin],
+        )
+        movidas = cursor.rowcount
+        cursor.execute(
+            f"ALTER TABLE {TABLA} ATTACH PARTITION {nombre} FOR VALUES FROM (%s) TO (%s)",
+            [inicio, fin],
+        )
+
+    logger.info(f"Partición {nombre} creada ({movidas} filas movidas desde la partición por defecto).")
+    return True
+
+
+def crear_particiones(meses_adelante=None):
+    """
+    Asegura que existan las particiones del mes actual y de los `meses_adelante` siguientes.
+    Devuelve los nombres de las particiones creadas.
+    """
+    if meses_adelante is None:
+        meses_adelante = getattr(settings, 'ASISTENCIA_PARTICIONES_ADELANTADAS', 3)
+    actual = timezone.localdate().replace(day=1)
+    creadas = []
+    for meses in range(meses_adelante + 1):
+        periodo = _sumar_meses(actual, meses)
+        if crear_particion(periodo):
+            creadas.append(nombre_particion(periodo))
+    return creadas
+
+
+def desvincular_particion(periodo):
+    """
+    Separa la partición del mes de la tabla de asistencias. La tabla sigue existiendo con
+    el mismo nombre (para consultarla o respaldarla) pero deja de verse desde el ORM.
+    """
+    _verificar_postgresql()
+    nombre = nombre_particion(periodo)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {TABLA} DETACH PARTITION {nombre}")
+        cursor.execute(f"SELECT count(*) FROM {nombre}")
+        cantidad = cursor.fetchone()[0]
+        transaction.on_commit(lambda: invalidar_reportes_asistencia([periodo]))
+    logger.info(f"Partición {nombre} desvinculada ({cantidad} filas).")
+    return cantidad
+
+
+def comprimir_particion(periodo):
+    """
+    Vuelca la partición del mes en un CSV comprimido guardado en AsistenciaArchivo y
+    luego la elimina. El volcado lo genera PostgreSQL con COPY, sin pasar por el ORM.
+    """
+    _verificar_postgresql()
+    nombre = nombre_particion(periodo)
+    columnas = [campo.column for campo in Asistencia._meta.concrete_fields]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {TABLA} DETACH PARTITION {nombre}")
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode='wb') as archivo_gzip:
+            cursor.copy_expert(
+                f"COPY (SELECT {', '.join(columnas)} FROM {nombre} ORDER BY fecha_hora, id)"
+                f" TO STDOUT WITH (FORMAT csv, HEADER true)",
+                archivo_gzip,
+            )
+        cursor.execute(f"SELECT count(*) FROM {nombre}")
+        cantidad = cursor.fetchone()[0]
+
+        AsistenciaArchivo.objects.create(periodo=periodo, cantidad=cantidad, datos=buffer.getvalue())
+        cursor.execute(f"DROP TABLE {nombre}")
+        transaction.on_commit(lambda: invalidar_reportes_asistencia([periodo]))
+
+    logger.info(f"Partición {nombre} archivada ({cantidad} filas, {len(buffer.getvalue())} bytes comprimidos).")
+    return cantidad
+
+
+def restaurar_archivo(periodo):
+    """
+    Vuelve a cargar en la tabla de asistencias un mes archivado con comprimir_particion
+    y elimina el archivo.
+    """
+    _verificar_postgresql()
+    archivo = AsistenciaArchivo.objects.get(periodo=periodo)
+    crear_particion(periodo)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        origen = gzip.GzipFile(fileobj=io.BytesIO(bytes(archivo.datos)), mode='rb')
+        columnas = origen.readline().decode().strip()
+        cursor.copy_expert(f"COPY {TABLA} ({columnas}) FROM STDIN WITH (FORMAT csv)", origen)
+        cantidad = archivo.cantidad
+        archivo.delete()
+        transaction.on_commit(lambda: invalidar_reportes_asistencia([periodo]))
+
+    logger.info(f"Asistencias de {periodo:%Y-%m} restauradas ({cantidad} filas).")
+    return cantidad
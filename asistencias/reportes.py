@@ -0,0 +1,335 @@
+from calendar import monthrange
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Avg, Case, Count, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate, TruncTime
+from django.utils import timezone
+
+from api_nuevas_energias.cache import obtener_version
+from empleados.models import Empleado
+from horarios.models import AsignacionHorario, Horarios
+from .marcas import jornada_maxima
+from .models import Asistencia
+
+# Orden de los flags de Horarios, alineado con date.weekday() (0 = lunes).
+DIAS_SEMANA = ['lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo']
+
+
+def clave_periodo(year, month):
+    return f"reporte_asistencia_mensual:{year}-{month:02d}"
+
+
+def contar_dias_semana(desde, hasta):
+    """
+    Devuelve una lista con la cantidad de lunes, martes, ..., domingos
+    que hay entre `desde` y `hasta` (ambas fechas inclusive).
+    """
+    total = (hasta - desde).days + 1
+    if total <= 0:
+        return [0] * 7
+    semanas, resto = divmod(total, 7)
+    conteo = [semanas] * 7
+    for i in range(resto):
+        conteo[(desde.weekday() + i) % 7] += 1
+    return conteo
+
+
+def _subconsulta_dias_programados(desde, hasta):
+    """
+    Subconsulta que calcula, por empleado, los días laborables del período según
+    los flags de día de sus horarios activos. Si el empleado tiene varios horarios,
+    un día cuenta una sola vez aunque lo cubran varios turnos.
+    """
+    conteo = contar_dias_semana(desde, hasta)
+    total = Value(0)
+    for dia, cantidad in zip(DIAS_SEMANA, conteo):
+        if cantidad:
+            total = total + Max(Case(
+                When(**{f'id_horario__{dia}': True}, then=Value(cantidad)),
+                default=Value(0),
+            ))
+
+    asignaciones = AsignacionHorario.objects.filter(
+        id_empl=OuterRef('pk'),
+        estado=True,
+        fecha_asignacion__lte=hasta,
+    ).values('id_empl').annotate(total=total).values('total')
+    return Coalesce(Subquery(asignaciones, output_field=IntegerField()), 0)
+
+
+def _calcular_reporte(desde, hasta):
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+    en_periodo = Q(
+        asistencia__fecha_hora__gte=inicio,
+        asistencia__fecha_hora__lt=fin,
+        asistencia__tipo=Asistencia.ENTRADA,
+    )
+
+    filas = Empleado.objects.annotate(
+        dias_presentes=Count(TruncDate('asistencia__fecha_hora'), filter=en_periodo, distinct=True),
+        dias_tarde=Count(
+            TruncDate('asistencia__fecha_hora'),
+            filter=en_periodo & Q(asistencia__minutos_retraso__gt=0),
+            distinct=True,
+        ),
+        total_minutos_retraso=Coalesce(Sum('asistencia__minutos_retraso', filter=en_periodo), 0),
+        promedio_minutos_retraso=Avg('asistencia__minutos_retraso', filter=en_periodo),
+        ultima_llegada=Max(TruncTime('asistencia__fecha_hora'), filter=en_periodo),
+        dias_programados=_subconsulta_dias_programados(desde, hasta),
+    ).filter(
+        # Se listan los empleados activos y también quienes marcaron en el período
+        # aunque hoy ya no estén activos.
+        Q(estado='Activo') | Q(dias_presentes__gt=0)
+    ).values(
+        'id', 'nombre', 'apellido', 'dni',
+        'dias_programados', 'dias_presentes', 'dias_tarde',
+        'total_minutos_retraso', 'promedio_minutos_retraso', 'ultima_llegada',
+    ).order_by('apellido', 'nombre')
+
+    reporte = []
+    for fila in filas:
+        fila['dias_ausentes'] = max(fila['dias_programados'] - fila['dias_presentes'], 0)
+        if fila['promedio_minutos_retraso'] is not None:
+            fila['promedio_minutos_retraso'] = round(float(fila['promedio_minutos_retraso']), 2)
+        reporte.append(fila)
+    return reporte
+
+
+def reporte_mensual(year, month):
+    """
+    Devuelve los totales de asistencia y puntualidad por empleado para un mes.
+
+    El cálculo es una única consulta agregada sobre Asistencia. El resultado se cachea
+    por período y se invalida cuando cambian las asistencias de ese mes o los horarios.
+    Para el mes en curso los días programados se cuentan hasta la fecha actual.
+    """
+    desde = date(year, month, 1)
+    hasta = min(date(year, month, monthrange(year, month)[1]), timezone.localdate())
+
+    clave = clave_periodo(year, month)
+    clave_cache = (
+        f"{clave}:{hasta.isoformat()}"
+        f":v{obtener_version(clave)}:h{obtener_version('horarios')}"
+    )
+    reporte = cache.get(clave_cache)
+    if reporte is None:
+        reporte = _calcular_reporte(desde, hasta) if hasta >= desde else []
+        cache.set(clave_cache, reporte, getattr(settings, 'REPORTES_CACHE_TIMEOUT', 60 * 60 * 24))
+    return reporte
+
+
+def horas_trabajadas(desde, hasta):
+    """
+    Devuelve por empleado los minutos trabajados, las horas extra y las salidas faltantes
+    de las entradas registradas entre `desde` y `hasta` (fechas inclusivas).
+
+    Todo se resuelve en una única consulta: LEAD() empareja cada entrada con la marca
+    siguiente del mismo empleado, que cuenta como su salida si es una salida dentro de la
+    jornada máxima. Las horas extra se miden contra la hora_salida del horario vigente el
+    día de la entrada (si la salida es anterior a la entrada el turno termina al día
+    siguiente). Una entrada sin salida solo cuenta como faltante cuando ya pasó la jornada
+    máxima, para no marcar como faltantes los turnos que todavía están en curso.
+    """
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+    params = {
+        'inicio': inicio,
+        'fin': fin,
+        'jornada': jornada_maxima(),
+        'zona': timezone.get_current_timezone_name(),
+        'ahora': timezone.now(),
+        'entrada': Asistencia.ENTRADA,
+        'salida': Asistencia.SALIDA,
+    }
+    sql = f"""
+        WITH marcas AS (
+            SELECT a.id_empl_id, a.fecha_hora, a.tipo,
+                   LEAD(a.tipo) OVER siguiente AS tipo_siguiente,
+                   LEAD(a.fecha_hora) OVER siguiente AS fecha_siguiente
+            FROM {Asistencia._meta.db_table} a
+            -- Se leen las marcas hasta una jornada después del período para cerrar los turnos nocturnos.
+            WHERE a.fecha_hora >= %(inicio)s AND a.fecha_hora < %(fin)s + %(jornada)s
+            WINDOW siguiente AS (PARTITION BY a.id_empl_id ORDER BY a.fecha_hora, a.id)
+        ),
+        turnos AS (
+            SELECT m.id_empl_id,
+                   m.fecha_hora AS entrada,
+                   CASE WHEN m.tipo_siguiente = %(salida)s AND m.fecha_siguiente - m.fecha_hora <= %(jornada)s
+                        THEN m.fecha_siguiente END AS salida,
+                   (m.fecha_hora AT TIME ZONE %(zona)s)::date AS dia
+            FROM marcas m
+            WHERE m.tipo = %(entrada)s AND m.fecha_hora >= %(inicio)s AND m.fecha_hora < %(fin)s
+        ),
+        turnos_con_horario AS (
+            SELECT t.*,
+                   ((t.dia + h.hora_salida)
+                    + CASE WHEN h.hora_salida <= h.hora_entrada THEN interval '1 day' ELSE interval '0' END
+                   ) AT TIME ZONE %(zona)s AS salida_programada
+            FROM turnos t
+            LEFT JOIN LATERAL (
+                SELECT hr.hora_entrada, hr.hora_salida
+                FROM {AsignacionHorario._meta.db_table} ah
+                JOIN {Horarios._meta.db_table} hr ON hr.id = ah.id_horario_id
+                WHERE ah.id_empl_id = t.id_empl_id AND ah.estado AND ah.fecha_asignacion <= t.dia
+                ORDER BY ah.fecha_asignacion DESC, ah.id DESC
+                LIMIT 1
+            ) h ON true
+        )
+        SELECT e.id, e.nombre, e.apellido, e.dni,
+               count(*) AS entradas,
+               count(t.salida) AS turnos_completos,
+               COALESCE(sum(floor(extract(epoch FROM t.salida - t.entrada) / 60)), 0)::integer AS minutos_trabajados,
+               COALESCE(sum(GREATEST(floor(extract(epoch FROM t.salida - t.salida_programada) / 60), 0)), 0)::integer
+                   AS minutos_extra,
+               count(*) FILTER (WHERE t.salida IS NULL AND t.entrada + %(jornada)s < %(ahora)s) AS salidas_faltantes
+        FROM turnos_con_horario t
+        JOIN {Empleado._meta.db_table} e ON e.id = t.id_empl_id
+        GROUP BY e.id, e.nombre, e.apellido, e.dni
+        ORDER BY e.apellido, e.nombre
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columnas = [col[0] for col in cursor.description]
+        return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+
+
+def _semanas(desde, hasta):
+    """Devuelve los lunes de las semanas que abarcan el rango de fechas."""
+    lunes = desde - timedelta(days=desde.weekday())
+    semanas = []
+    while lunes <= hasta:
+        semanas.append(lunes)
+        lunes += timedelta(days=7)
+    return semanas
+
+
+def _clave_semana(lunes, ancho, rango):
+    # Una semana puede abarcar dos meses: la clave depende de la versión de ambos.
+    domingo = lunes + timedelta(days=6)
+    versiones = sorted({clave_periodo(lunes.year, lunes.month), clave_periodo(domingo.year, domingo.month)})
+    return (
+        f"distribucion_llegadas:{lunes.isoformat()}:{ancho}:{rango}"
+        f":{':'.join(f'v{obtener_version(v)}' for v in versiones)}:h{obtener_version('horarios')}"
+    )
+
+
+def _calcular_distribucion(semanas, ancho, rango):
+    """
+    Cuenta las entradas de las semanas indicadas por horario y por intervalo de
+    minutos respecto de hora_entrada. El agrupamiento lo hace width_bucket() en
+    PostgreSQL, así solo viajan los conteos y nunca se instancian asistencias.
+    """
+    inicio = timezone.make_aware(datetime.combine(semanas[0], time.min))
+    fin = timezone.make_aware(datetime.combine(semanas[-1] + timedelta(days=7), time.min))
+    params = {
+        'inicio': inicio,
+        'fin': fin,
+        'zona': timezone.get_current_timezone_name(),
+        'entrada': Asistencia.ENTRADA,
+        'rango': rango,
+        'cantidad': 2 * rango // ancho,
+        'semanas': semanas,
+    }
+    sql = f"""
+        WITH llegadas AS (
+            SELECT a.fecha_hora AT TIME ZONE %(zona)s AS local,
+                   (a.fecha_hora AT TIME ZONE %(zona)s)::date AS dia,
+                   a.id_empl_id
+            FROM {Asistencia._meta.db_table} a
+            WHERE a.tipo = %(entrada)s AND a.fecha_hora >= %(inicio)s AND a.fecha_hora < %(fin)s
+        ),
+        desvios AS (
+            SELECT date_trunc('week', l.dia)::date AS semana,
+                   h.id AS id_horario,
+                   extract(epoch FROM l.local - (l.dia + h.hora_entrada)) / 60 AS minutos
+            FROM llegadas l
+            JOIN LATERAL (
+                SELECT hr.id, hr.hora_entrada
+                FROM {AsignacionHorario._meta.db_table} ah
+                JOIN {Horarios._meta.db_table} hr ON hr.id = ah.id_horario_id
+                WHERE ah.id_empl_id = l.id_empl_id AND ah.estado AND ah.fecha_asignacion <= l.dia
+                ORDER BY ah.fecha_asignacion DESC, ah.id DESC
+                LIMIT 1
+            ) h ON true
+        )
+        SELECT semana, id_horario,
+               width_bucket(minutos, -%(rango)s, %(rango)s, %(cantidad)s) AS intervalo,
+               count(*) AS cantidad
+        FROM desvios
+        WHERE semana = ANY(%(semanas)s)
+        GROUP BY semana, id_horario, intervalo
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        filas = cursor.fetchall()
+
+    conteos = {semana: {} for semana in semanas}
+    for semana, id_horario, intervalo, cantidad in filas:
+        conteos[semana].setdefault(id_horario, {})[intervalo] = cantidad
+    return conteos
+
+
+def _armar_histograma(conteo, ancho, rango):
+    # width_bucket devuelve 0 para los valores anteriores a -rango y cantidad + 1
+    # para los posteriores: esos extremos se informan como intervalos abiertos.
+    cantidad = 2 * rango // ancho
+    intervalos = []
+    for intervalo in range(cantidad + 2):
+        desde = None if intervalo == 0 else -rango + (intervalo - 1) * ancho
+        hasta = None if intervalo == cantidad + 1 else -rango + intervalo * ancho
+        intervalos.append({'desde': desde, 'hasta': hasta, 'cantidad': conteo.get(intervalo, 0)})
+    return intervalos
+
+
+def distribucion_llegadas(desde, hasta, ancho=5, rango=60):
+    """
+    Devuelve, por semana y por horario, el histograma de llegadas según los minutos de
+    diferencia con hora_entrada, en intervalos de `ancho` minutos entre -`rango` y
+    +`rango` (más dos intervalos abiertos para los extremos).
+
+    Cada llegada se asigna al horario vigente del empleado ese día. Las semanas ya
+    cerradas se cachean individualmente y se invalidan junto con los reportes del mes
+    o cuando cambian los horarios; la semana en curso se calcula siempre.
+    """
+    semanas = _semanas(desde, hasta)
+    hoy = timezone.localdate()
+    timeout = getattr(settings, 'REPORTES_CACHE_TIMEOUT', 60 * 60 * 24)
+
+    claves = {lunes: _clave_semana(lunes, ancho, rango) for lunes in semanas if lunes + timedelta(days=7) <= hoy}
+    cacheadas = cache.get_many(claves.values())
+    resultados = {lunes: cacheadas[clave] for lunes, clave in claves.items() if clave in cacheadas}
+
+    faltantes = [lunes for lunes in semanas if lunes not in resultados]
+    if faltantes:
+        calculadas = _calcular_distribucion(faltantes, ancho, rango)
+        resultados.update(calculadas)
+        cache.set_many(
+            {claves[lunes]: calculadas[lunes] for lunes in faltantes if lunes in claves},
+            timeout,
+        )
+
+    horarios = {h.id: h for h in Horarios.objects.filter(
+        id__in={id_horario for conteo in resultados.values() for id_horario in conteo}
+    )}
+    reporte = []
+    for lunes in semanas:
+        reporte.append({
+            'semana': lunes,
+            'cerrada': lunes in claves,
+            'horarios': [
+                {
+                    'id_horario': id_horario,
+                    'nombre': horarios[id_horario].nombre,
+                    'hora_entrada': horarios[id_horario].hora_entrada,
+                    'total': sum(conteo.values()),
+                    'intervalos': _armar_histograma(conteo, ancho, rango),
+                }
+                for id_horario, conteo in sorted(resultados[lunes].items())
+                if id_horario in horarios
+            ],
+        })
+    return reporte
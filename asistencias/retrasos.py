@@ -0,0 +1,133 @@
+import logging
+from datetime import date, timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models.functions import Extract
+
+from horarios.models import AsignacionHorario
+from .models import Asistencia
+from .signals import invalidar_reportes_asistencia
+
+logger = logging.getLogger(__name__)
+
+SEGUNDOS_POR_DIA = 86400
+# Desplazamiento usado para combinar empleado y día en una única clave ordenable.
+_FACTOR_EMPLEADO = 1 << 24
+
+
+def _horarios_por_empleado(empleado_ids):
+    """
+    Devuelve las asignaciones activas de los empleados como arrays ordenados por
+    (empleado, fecha de asignación, id), listos para resolverse con searchsorted.
+    """
+    asignaciones = AsignacionHorario.objects.filter(estado=True)
+    if empleado_ids is not None:
+        asignaciones = asignaciones.filter(id_empl_id__in=empleado_ids)
+    filas = list(asignaciones.order_by('id_empl_id', 'fecha_asignacion', 'id').values_list(
+        'id_empl_id', 'fecha_asignacion', 'id_horario_id', 'id_horario__hora_entrada'
+    ))
+    epoca = date(1970, 1, 1)
+    claves = np.array(
+        [empl * _FACTOR_EMPLEADO + (fecha - epoca).days for empl, fecha, _, _ in filas], dtype=np.int64
+    )
+    horarios = np.array([horario for _, _, horario, _ in filas], dtype=np.int64)
+    entradas = np.array(
+        [h.hour * 3600 + h.minute * 60 + h.second for _, _, _, h in filas], dtype=np.int64
+    )
+    return claves, horarios, entradas
+
+
+def _calcular_lote(filas, claves, horarios, entradas, horario_ids):
+    """
+    Calcula de forma vectorizada los minutos de retraso de un lote de asistencias.
+    Replica la regla de Asistencia.calcular_retraso: se usa la asignación activa más
+    reciente con fecha de asignación menor o igual al día de la marca.
+    """
+    ids = np.array([f[0] for f in filas], dtype=np.int64)
+    empleados = np.array([f[1] for f in filas], dtype=np.int64)
+    actuales = np.array([f[2] for f in filas], dtype=np.int64)
+    # Segundos desde la época en hora local (la misma zona en que se interpreta hora_entrada).
+    locales = np.array([f[3] for f in filas], dtype=np.float64).astype(np.int64)
+
+    dias = locales // SEGUNDOS_POR_DIA
+    nuevos = np.zeros(len(ids), dtype=np.int64)
+    con_horario = np.zeros(len(ids), dtype=bool)
+    horario_resuelto = np.full(len(ids), -1, dtype=np.int64)
+
+    if len(claves):
+        posiciones = np.searchsorted(claves, empleados * _FACTOR_EMPLEADO + dias, side='right') - 1
+        validas = np.clip(posiciones, 0, None)
+        con_horario = (posiciones >= 0) & (claves[validas] // _FACTOR_EMPLEADO == empleados)
+        diferencia = locales - (dias * SEGUNDOS_POR_DIA + entradas[validas])
+        nuevos = np.where(con_horario & (diferencia > 0), diferencia // 60, 0)
+        horario_resuelto = np.where(con_horario, horarios[validas], -1)
+
+    if horario_ids:
+        incluidas = np.isin(horario_resuelto, list(horario_ids))
+    else:
+        incluidas = np.ones(len(ids), dtype=bool)
+
+    return ids, actuales, nuevos, dias, incluidas, con_horario
+
+
+def recalcular_retrasos(asistencias, horario_ids=None, dry_run=False, tamano_lote=2000):
+    """
+    Recalcula `minutos_retraso` de las asistencias del queryset recibido según los
+    horarios vigentes y guarda con bulk_update, por lotes, solo las filas que cambian.
+
+    Si se indican `horario_ids` solo se recalculan las asistencias cuyo horario
+    resuelto pertenece a ese conjunto. Con `dry_run` no se escribe nada pero se
+    devuelve el mismo resumen.
+    """
+    # Solo las entradas tienen minutos de retraso.
+    asistencias = asistencias.filter(tipo=Asistencia.ENTRADA)
+    if horario_ids:
+        asistencias = asistencias.filter(
+            id_empl_id__in=AsignacionHorario.objects.filter(id_horario__in=horario_ids).values('id_empl_id')
+        )
+    empleado_ids = asistencias.values('id_empl_id').distinct()
+    claves, horarios, entradas = _horarios_por_empleado(empleado_ids)
+
+    filas = asistencias.annotate(
+        local=Extract('fecha_hora', 'epoch')
+    ).order_by('id').values_list('id', 'id_empl_id', 'minutos_retraso', 'local')
+
+    resumen = {'revisadas': 0, 'modificadas': 0, 'sin_horario': 0, 'minutos_antes': 0, 'minutos_despues': 0}
+    dias_modificados = set()
+
+    def procesar(lote):
+        ids, actuales, nuevos, dias, incluidas, con_horario = _calcular_lote(
+            lote, claves, horarios, entradas, horario_ids
+        )
+        cambiadas = incluidas & (actuales != nuevos)
+        resumen['revisadas'] += int(incluidas.sum())
+        resumen['sin_horario'] += int((incluidas & ~con_horario).sum())
+        resumen['modificadas'] += int(cambiadas.sum())
+        resumen['minutos_antes'] += int(actuales[incluidas].sum())
+        resumen['minutos_despues'] += int(nuevos[incluidas].sum())
+        dias_modificados.update(int(d) for d in np.unique(dias[cambiadas]))
+
+        if not dry_run and cambiadas.any():
+            objetos = [
+                Asistencia(id=int(pk), minutos_retraso=int(minutos))
+                for pk, minutos in zip(ids[cambiadas], nuevos[cambiadas])
+            ]
+            with transaction.atomic():
+                Asistencia.objects.bulk_update(objetos, ['minutos_retraso'], batch_size=tamano_lote)
+
+    lote = []
+    for fila in filas.iterator(chunk_size=tamano_lote):
+        lote.append(fila)
+        if len(lote) >= tamano_lote:
+            procesar(lote)
+            lote = []
+    if lote:
+        procesar(lote)
+
+    if not dry_run and dias_modificados:
+        epoca = date(1970, 1, 1)
+        invalidar_reportes_asistencia([epoca + timedelta(days=d) for d in dias_modificados])
+
+    logger.info(f"Recálculo de retrasos {'(simulación) ' if dry_run else ''}finalizado: {resumen}")
+    return resumen
@@ -19,5 +19,59 @@ class AsistenciaSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Asistencia
-        fields = ['id', 'id_empl', 'fecha_hora', 'minutos_retraso']
-        read_only_fields = ('fecha_hora', 'minutos_retraso')
\ No newline at end of file
+        fields = ['id', 'id_empl', 'fecha_hora', 'tipo', 'minutos_retraso']
+        read_only_fields = ('fecha_hora', 'tipo', 'minutos_retraso')
+
+class ReporteMensualAsistenciaSerializer(serializers.Serializer):
+    """
+    Serializer de solo lectura para las filas del reporte mensual de asistencia.
+    """
+    id = serializers.IntegerField()
+    nombre = serializers.CharField()
+    apellido = serializers.CharField()
+    dni = serializers.IntegerField()
+    dias_programados = serializers.IntegerField()
+    dias_presentes = serializers.IntegerField()
+    dias_ausentes = serializers.IntegerField()
+    dias_tarde = serializers.IntegerField()
+    total_minutos_retraso = serializers.IntegerField()
+    promedio_minutos_retraso = serializers.FloatField(allow_null=True)
+    ultima_llegada = serializers.TimeField(allow_null=True)
+
+class HorasTrabajadasSerializer(serializers.Serializer):
+    """
+    Serializer de solo lectura para las filas del reporte de horas trabajadas.
+    """
+    id = serializers.IntegerField()
+    nombre = serializers.CharField()
+    apellido = serializers.CharField()
+    dni = serializers.IntegerField()
+    entradas = serializers.IntegerField()
+    turnos_completos = serializers.IntegerField()
+    minutos_trabajados = serializers.IntegerField()
+    minutos_extra = serializers.IntegerField()
+    salidas_faltantes = serializers.IntegerField()
+
+class IntervaloLlegadasSerializer(serializers.Serializer):
+    """
+    Intervalo de un histograma de llegadas, en minutos respecto de la hora de entrada.
+    `desde` o `hasta` nulos indican un intervalo abierto en ese extremo.
+    """
+    desde = serializers.IntegerField(allow_null=True)
+    hasta = serializers.IntegerField(allow_null=True)
+    cantidad = serializers.IntegerField()
+
+class HistogramaHorarioSerializer(serializers.Serializer):
+    id_horario = serializers.IntegerField()
+    nombre = serializers.CharField()
+    hora_entrada = serializers.TimeField()
+    total = serializers.IntegerField()
+    intervalos = IntervaloLlegadasSerializer(many=True)
+
+class DistribucionLlegadasSerializer(serializers.Serializer):
+    """
+    Serializer de solo lectura para los histogramas de llegadas de una semana.
+    """
+    semana = serializers.DateField()
+    cerrada = serializers.BooleanField()
+    horarios = HistogramaHorarioSerializer(many=True)
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from api_nuevas_energias.cache import incrementar_version
+from horarios.models import AsignacionHorario, Horarios
+from .models import Asistencia
+from .reportes import clave_periodo
+
+
+def invalidar_reportes_asistencia(fechas):
+    """
+    Invalida los reportes cacheados de los meses a los que pertenecen `fechas`.
+    Debe llamarse explícitamente cuando se modifican asistencias sin pasar por
+    save()/delete() (por ejemplo con bulk_update o update()).
+    """
+    periodos = set()
+    for fecha in fechas:
+        if isinstance(fecha, datetime) and timezone.is_aware(fecha):
+            fecha = timezone.localtime(fecha)
+        periodos.add((fecha.year, fecha.month))
+    for year, month in periodos:
+        incrementar_version(clave_periodo(year, month))
+
+
+@receiver([post_save, post_delete], sender=Asistencia)
+def asistencia_modificada(sender, instance, **kwargs):
+    invalidar_reportes_asistencia([instance.fecha_hora])
+
+
+@receiver([post_save, post_delete], sender=Horarios)
+@receiver([post_save, post_delete], sender=AsignacionHorario)
+def horarios_modificados(sender, instance, **kwargs):
+    # Los días programados dependen de los horarios: afecta a todos los períodos.
+    incrementar_version('horarios')
@@ -1,3 +1,62 @@
+from datetime import date, time
+from unittest import mock
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
+
+from empleados.models import Empleado
+from horarios.models import AsignacionHorario, Horarios
+from notificaciones.models import Notificacion
+
+from . import ausencias
+from .models import Ausencia
+
+
+class DetectarAusenciasTests(TestCase):
+    """Ausencias del día: se registran una vez y se notifican solo las que se insertaron."""
+
+    @classmethod
+    def setUpTestData(cls):
+        horario = Horarios.objects.create(
+            nombre='Mañana', hora_entrada=time(8), hora_salida=time(16), sabado=True, domingo=True,
+        )
+        cls.empleados = []
+        for i in range(3):
+            empleado = Empleado.objects.create(
+                user=User.objects.create_user(username=f'empleado{i}', password='x'),
+                nombre=f'Nombre {i}', apellido=f'Apellido {i}', dni=30000000 + i,
+                email=f'empleado{i}@example.com', fecha_nacimiento=date(1990, 1, 1),
+            )
+            AsignacionHorario.objects.create(id_empl=empleado, id_horario=horario)
+            cls.empleados.append(empleado)
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        cls.fecha = timezone.localdate()
+
+    def notificaciones(self, user):
+        return Notificacion.objects.filter(id_user=user).count()
+
+    def test_volver_a_ejecutar_no_duplica(self):
+        self.assertEqual(ausencias.detectar_ausencias(self.fecha), 3)
+        self.assertEqual(ausencias.detectar_ausencias(self.fecha), 0)
+        self.assertEqual(Ausencia.objects.filter(fecha=self.fecha).count(), 3)
+        self.assertEqual(self.notificaciones(self.empleados[0].user), 1)
+        self.assertEqual(self.notificaciones(self.admin), 1)
+
+    def test_ejecucion_simultanea_no_notifica_dos_veces(self):
+        original = ausencias.empleados_ausentes
+        adelantado = self.empleados[0]
+
+        def otra_ejecucion_carga_una(fecha):
+            # Entre la consulta y el INSERT, otra ejecución registra la ausencia de un empleado.
+            filas = list(original(fecha))
+            Ausencia.objects.create(id_empl=adelantado, fecha=fecha)
+            return filas
 
-# Create your tests here.
+        with mock.patch.object(ausencias, 'empleados_ausentes', otra_ejecucion_carga_una):
+            self.assertEqual(ausencias.detectar_ausencias(self.fecha), 2)
+        self.assertEqual(self.notificaciones(adelantado.user), 0)
+        self.assertEqual(self.notificaciones(self.empleados[1].user), 1)
+        self.assertEqual(
+            Notificacion.objects.get(id_user=self.admin).mensaje, f"Se detectaron 2 ausencias el día {self.fecha:%d/%m/%Y}.",
+        )
@@ -5,7 +5,12 @@ from .views import (
     RegistrarRostroAPIView,
     ReconocerRostroAPIView,
     AsistenciaEmpleadoAPIView,
-    EmpleadosSinRostroAPIView
+    EmpleadosSinRostroAPIView,
+    ReporteMensualAsistenciaAPIView,
+    HorasTrabajadasAPIView,
+    DistribucionLlegadasAPIView,
+    ExportarAsistenciasAPIView,
+    ImportarAsistenciasAPIView
 )
 
 urlpatterns = [
@@ -29,4 +34,22 @@ urlpatterns = [
     # Endpoint para que un empleado vea sus propias asistencias (más seguro)
     # GET: /api/asistencias/mis-asistencias/
     path('mis-asistencias/', AsistenciaEmpleadoAPIView.as_view(), name='api_mis_asistencias'),
+
+    # Endpoint para el reporte mensual de asistencia y puntualidad (admin/consultor)
+    # GET: /api/asistencias/reporte-mensual/?month=5&year=2025
+    path('reporte-mensual/', ReporteMensualAsistenciaAPIView.as_view(), name='api_reporte_mensual_asistencia'),
+
+    # Endpoint para las horas trabajadas, horas extra y salidas faltantes por empleado (admin/consultor)
+    # GET: /api/asistencias/horas-trabajadas/?desde=2025-05-01&hasta=2025-05-31
+    path('horas-trabajadas/', HorasTrabajadasAPIView.as_view(), name='api_horas_trabajadas'),
+
+    # Endpoint para los histogramas semanales de llegadas por horario (admin/consultor)
+    # GET: /api/asistencias/distribucion-llegadas/?desde=2025-05-05&hasta=2025-06-01&ancho=5&rango=60
+    path('distribucion-llegadas/', DistribucionLlegadasAPIView.as_view(), name='api_distribucion_llegadas'),
+
+    # Endpoints de volcado masivo de asistencias (solo admin)
+    # GET: /api/asistencias/exportar/?desde=2025-01-01&hasta=2025-01-31&gzip=true
+    # POST: /api/asistencias/importar/ (multipart con el campo 'archivo')
+    path('exportar/', ExportarAsistenciasAPIView.as_view(), name='api_exportar_asistencias'),
+    path('importar/', ImportarAsistenciasAPIView.as_view(), name='api_importar_asistencias'),
 ]
@@ -1,8 +1,12 @@
 import base64
+import tempfile
 import numpy as np
 import cv2
 import face_recognition
-from datetime import date
+from datetime import date, timedelta
+from django.utils import timezone
+from django.db import DatabaseError
+from django.http import FileResponse
 
 from rest_framework.generics import ListAPIView
 from rest_framework.views import APIView
@@ -11,11 +15,18 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 
 from empleados.models import Empleado
-from empleados.serializer import EmpleadoSerializer
+from empleados.serializer import EmpleadoSerializer, optimizar_consulta_empleados
 from .models import Rostro, Asistencia
 from empleados.mixins import AdminWriteAccessMixin
+from usuarios.roles import es_admin_o_consultor
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiTypes
-from .serializers import AsistenciaSerializer, RostroSerializer
+from .serializers import (
+    AsistenciaSerializer, RostroSerializer, ReporteMensualAsistenciaSerializer, HorasTrabajadasSerializer,
+    DistribucionLlegadasSerializer,
+)
+from .reportes import reporte_mensual, horas_trabajadas, distribucion_llegadas
+from .volcado import FormatoInvalido, exportar_asistencias, importar_asistencias
+from .marcas import registrar_marca
 
 
 @extend_schema(tags=['Asistencias'])
@@ -32,7 +43,7 @@ class EmpleadosSinRostroAPIView(AdminWriteAccessMixin, ListAPIView):
         Devuelve todos los empleados que no están en la tabla de Rostros.
         """
         empleados_con_rostro_ids = Rostro.objects.values_list('id_empl_id', flat=True)
-        return Empleado.objects.exclude(id__in=empleados_con_rostro_ids)
+        return optimizar_consulta_empleados(Empleado.objects.exclude(id__in=empleados_con_rostro_ids))
 
 
 @extend_schema(tags=['Asistencias'])
@@ -163,21 +174,19 @@ class ReconocerRostroAPIView(APIView):
                 empleado_id = empleados_ids[first_match_index]
                 empleado = Empleado.objects.get(id=empleado_id)
 
-                if not Asistencia.objects.filter(id_empl=empleado, fecha_hora__date=date.today()).exists():
-                    asistencia = Asistencia.objects.create(id_empl=empleado)
-                    asistencia.minutos_retraso = asistencia.calcular_retraso()
-                    asistencia.save()
+                asistencia = registrar_marca(empleado)
+                if asistencia:
                     serializer = AsistenciaSerializer(asistencia)
                     return Response({
                         'status': 'success',
-                        'message': 'Asistencia registrada correctamente.',
+                        'message': f'{asistencia.get_tipo_display()} registrada correctamente.',
                         'asistencia': serializer.data,
                         'empleado': f'{empleado.nombre} {empleado.apellido}'
                     }, status=status.HTTP_201_CREATED)
                 else:
                     return Response({
                         'status': 'already_marked',
-                        'message': 'Este empleado ya marcó su asistencia hoy.',
+                        'message': 'Este empleado ya marcó su asistencia.',
                         'empleado': f'{empleado.nombre} {empleado.apellido}'
                     }, status=status.HTTP_200_OK)
 
@@ -199,6 +208,7 @@ class AsistenciaEmpleadoAPIView(ListAPIView):
     """
     serializer_class = AsistenciaSerializer
     permission_classes = [IsAuthenticated]
+    orden_cursor = ('-fecha_hora', '-id')
 
     def get_queryset(self):
         empleado_id = self.kwargs.get('empleado_id')
@@ -206,7 +216,7 @@ class AsistenciaEmpleadoAPIView(ListAPIView):
         # Seguridad: Un empleado solo puede ver sus propias asistencias.
         # Un admin o consultor puede ver las de cualquiera.
         user = self.request.user
-        if not (user.is_superuser or user.groups.filter(name__in=['Administrador', 'Consultor']).exists()):
+        if not es_admin_o_consultor(user):
             empleado_id = user.empleado.id
 
         queryset = Asistencia.objects.filter(id_empl_id=empleado_id).order_by('-fecha_hora')
@@ -218,3 +228,203 @@ class AsistenciaEmpleadoAPIView(ListAPIView):
         if year: queryset = queryset.filter(fecha_hora__year=year)
         
         return queryset
+
+
+
+@extend_schema(
+    tags=['Asistencias'],
+    parameters=[
+        OpenApiParameter(name='month', description='Mes del reporte (1-12). Por defecto, el mes actual.', required=False, type=OpenApiTypes.INT),
+        OpenApiParameter(name='year', description='Año del reporte (ej. 2024). Por defecto, el año actual.', required=False, type=OpenApiTypes.INT),
+    ],
+    responses=ReporteMensualAsistenciaSerializer(many=True),
+)
+class ReporteMensualAsistenciaAPIView(APIView):
+    """
+    API para obtener el reporte mensual de asistencia y puntualidad de todos los empleados.
+    Por cada empleado devuelve días programados, presentes, ausentes y con retraso,
+    el total y promedio de minutos de retraso y la llegada más tardía del período.
+    Solo Administradores y Consultores pueden acceder.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        if not es_admin_o_consultor(user):
+            return Response({'error': 'No tiene permiso para ver este reporte.'}, status=status.HTTP_403_FORBIDDEN)
+
+        hoy = timezone.localdate()
+        try:
+            month = int(request.query_params.get('month', hoy.month))
+            year = int(request.query_params.get('year', hoy.year))
+        except ValueError:
+            return Response({'error': 'El mes y el año deben ser números enteros.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not 1 <= month <= 12 or not 1 <= year <= 9999:
+            return Response({'error': 'Período inválido.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = ReporteMensualAsistenciaSerializer(reporte_mensual(year, month), many=True)
+        return Response({
+            'periodo': f"{year}-{month:02d}",
+            'empleados': serializer.data,
+        })
+
+
+
+@extend_schema(
+    tags=['Asistencias'],
+    parameters=[
+        OpenApiParameter(name='desde', description='Fecha inicial inclusiva (AAAA-MM-DD). Por defecto, el primer día del mes actual.', required=False, type=OpenApiTypes.DATE),
+        OpenApiParameter(name='hasta', description='Fecha final inclusiva (AAAA-MM-DD). Por defecto, hoy.', required=False, type=OpenApiTypes.DATE),
+    ],
+    responses=HorasTrabajadasSerializer(many=True),
+)
+class HorasTrabajadasAPIView(APIView):
+    """
+    API para obtener, por empleado, los minutos trabajados, las horas extra respecto de la
+    hora de salida de su horario y las salidas sin marcar en un período.
+    Solo Administradores y Consultores pueden acceder.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        if not es_admin_o_consultor(user):
+            return Response({'error': 'No tiene permiso para ver este reporte.'}, status=status.HTTP_403_FORBIDDEN)
+
+        hoy = timezone.localdate()
+        try:
+            desde = date.fromisoformat(request.query_params.get('desde', hoy.replace(day=1).isoformat()))
+            hasta = date.fromisoformat(request.query_params.get('hasta', hoy.isoformat()))
+        except ValueError:
+            return Response({'error': 'Las fechas deben tener el formato AAAA-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if hasta < desde:
+            return Response({'error': 'La fecha final no puede ser anterior a la inicial.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = HorasTrabajadasSerializer(horas_trabajadas(desde, hasta), many=True)
+        return Response({
+            'desde': desde,
+            'hasta': hasta,
+            'empleados': serializer.data,
+        })
+
+
+@extend_schema(
+    tags=['Asistencias'],
+    parameters=[
+        OpenApiParameter(name='desde', description='Fecha inicial inclusiva (AAAA-MM-DD). Por defecto, cuatro semanas atrás.', required=False, type=OpenApiTypes.DATE),
+        OpenApiParameter(name='hasta', description='Fecha final inclusiva (AAAA-MM-DD). Por defecto, hoy.', required=False, type=OpenApiTypes.DATE),
+        OpenApiParameter(name='ancho', description='Ancho de cada intervalo en minutos (1-60). Por defecto, 5.', required=False, type=OpenApiTypes.INT),
+        OpenApiParameter(name='rango', description='Minutos antes y después de la hora de entrada que abarca el histograma (1-240). Por defecto, 60.', required=False, type=OpenApiTypes.INT),
+    ],
+    responses=DistribucionLlegadasSerializer(many=True),
+)
+class DistribucionLlegadasAPIView(APIView):
+    """
+    API para obtener, por semana y por horario, el histograma de llegadas según los
+    minutos de diferencia con la hora de entrada del turno.
+    Solo Administradores y Consultores pueden acceder.
+    """
+    permission_classes = [IsAuthenticated]
+
+    # Límite de semanas por consulta, para acotar el tamaño de la respuesta.
+    MAXIMO_SEMANAS = 53
+
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        if not es_admin_o_consultor(user):
+            return Response({'error': 'No tiene permiso para ver este reporte.'}, status=status.HTTP_403_FORBIDDEN)
+
+        hoy = timezone.localdate()
+        try:
+            desde = date.fromisoformat(request.query_params.get('desde', (hoy - timedelta(weeks=4)).isoformat()))
+            hasta = date.fromisoformat(request.query_params.get('hasta', hoy.isoformat()))
+        except ValueError:
+            return Response({'error': 'Las fechas deben tener el formato AAAA-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ancho = int(request.query_params.get('ancho', 5))
+            rango = int(request.query_params.get('rango', 60))
+        except ValueError:
+            return Response({'error': 'El ancho y el rango deben ser números enteros.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if hasta < desde:
+            return Response({'error': 'La fecha final no puede ser anterior a la inicial.'}, status=status.HTTP_400_BAD_REQUEST)
+        if (hasta - desde).days > self.MAXIMO_SEMANAS * 7:
+            return Response({'error': f'El período no puede superar las {self.MAXIMO_SEMANAS} semanas.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= ancho <= 60 or not 1 <= rango <= 240 or rango % ancho:
+            return Response({'error': 'El rango debe ser múltiplo del ancho (ancho 1-60, rango 1-240).'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = DistribucionLlegadasSerializer(distribucion_llegadas(desde, hasta, ancho, rango), many=True)
+        return Response(serializer.data)
+
+
+@extend_schema(
+    tags=['Asistencias'],
+    parameters=[
+        OpenApiParameter(name='desde', description='Fecha inicial inclusiva (AAAA-MM-DD)', required=False, type=OpenApiTypes.DATE),
+        OpenApiParameter(name='hasta', description='Fecha final inclusiva (AAAA-MM-DD)', required=False, type=OpenApiTypes.DATE),
+        OpenApiParameter(name='gzip', description='Si es "true", el archivo se devuelve comprimido', required=False, type=OpenApiTypes.BOOL),
+    ],
+    responses={(200, 'text/csv'): OpenApiTypes.BINARY},
+)
+class ExportarAsistenciasAPIView(AdminWriteAccessMixin, APIView):
+    """
+    API para descargar el volcado completo de asistencias en CSV.
+    El archivo lo genera PostgreSQL con COPY, sin instanciar modelos.
+    Solo los administradores pueden acceder.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        self._check_admin_privileges(request)
+
+        try:
+            desde = date.fromisoformat(request.query_params['desde']) if request.query_params.get('desde') else None
+            hasta = date.fromisoformat(request.query_params['hasta']) if request.query_params.get('hasta') else None
+        except ValueError:
+            return Response({'error': 'Las fechas deben tener el formato AAAA-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+        comprimir = request.query_params.get('gzip', '').lower() in ('1', 'true')
+
+        # El volcado se escribe en memoria hasta cierto tamaño y luego en disco,
+        # así el consumo de memoria queda acotado aunque el archivo sea grande.
+        archivo = tempfile.SpooledTemporaryFile(max_size=10 * 1024 * 1024)
+        exportar_asistencias(archivo, desde, hasta, comprimir)
+        archivo.seek(0)
+
+        nombre = 'asistencias.csv.gz' if comprimir else 'asistencias.csv'
+        return FileResponse(
+            archivo,
+            as_attachment=True,
+            filename=nombre,
+            content_type='application/gzip' if comprimir else 'text/csv',
+        )
+
+
+@extend_schema(
+    tags=['Asistencias'],
+    request={'multipart/form-data': {'type': 'object', 'properties': {'archivo': {'type': 'string', 'format': 'binary'}}}},
+)
+class ImportarAsistenciasAPIView(AdminWriteAccessMixin, APIView):
+    """
+    API para cargar asistencias históricas desde un CSV con cabecera
+    (id_empl_id, fecha_hora y opcionalmente tipo y minutos_retraso).
+    Acepta archivos .csv o .csv.gz. Se descartan las filas de empleados inexistentes
+    y las que violan la regla de una entrada y una salida por día.
+    Solo los administradores pueden acceder.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        self._check_admin_privileges(request)
+
+        archivo = request.FILES.get('archivo')
+        if not archivo:
+            return Response({'error': 'Se requiere el archivo a importar.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            resumen = importar_asistencias(archivo, comprimido=archivo.name.endswith('.gz'))
+        except (DatabaseError, OSError, FormatoInvalido) as e:
+            return Response({'error': f'El archivo no tiene un formato válido: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(resumen, status=status.HTTP_201_CREATED)
@@ -0,0 +1,162 @@
+import gzip
+import logging
+from datetime import datetime, time, timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from empleados.models import Empleado
+from .models import Asistencia
+from .signals import invalidar_reportes_asistencia
+
+logger = logging.getLogger(__name__)
+
+# Columnas que se exportan, en este orden. Al importar, 'minutos_retraso' y 'tipo' son opcionales.
+COLUMNAS = ('id_empl_id', 'fecha_hora', 'tipo', 'minutos_retraso')
+COLUMNAS_OBLIGATORIAS = {'id_empl_id', 'fecha_hora'}
+
+
+class FormatoInvalido(ValueError):
+    pass
+
+
+def _leer_cabecera(origen):
+    """
+    Lee la línea de cabecera del CSV y devuelve las columnas en el orden del archivo.
+    El archivo queda posicionado en la primera fila de datos.
+    """
+    linea = origen.readline()
+    if isinstance(linea, bytes):
+        linea = linea.decode('utf-8-sig')
+    columnas = [columna.strip() for columna in linea.strip().split(',')]
+    desconocidas = set(columnas) - set(COLUMNAS)
+    if desconocidas:
+        raise FormatoInvalido(f"Columnas desconocidas: {', '.join(sorted(desconocidas))}.")
+    faltantes = COLUMNAS_OBLIGATORIAS - set(columnas)
+    if faltantes:
+        raise FormatoInvalido(f"Faltan las columnas: {', '.join(sorted(faltantes))}.")
+    return columnas
+
+
+def _inicio_del_dia(fecha):
+    return timezone.make_aware(datetime.combine(fecha, time.min))
+
+
+def exportar_asistencias(destino, desde=None, hasta=None, comprimir=False):
+    """
+    Escribe en `destino` (un archivo binario) las asistencias en formato CSV con cabecera,
+    usando COPY ... TO STDOUT para que PostgreSQL genere el volcado sin pasar por el ORM.
+    `desde` y `hasta` son fechas inclusivas; `comprimir` genera la salida en gzip.
+    """
+    condiciones, params = [], []
+    if desde:
+        condiciones.append('fecha_hora >= %s')
+        params.append(_inicio_del_dia(desde))
+    if hasta:
+        condiciones.append('fecha_hora < %s')
+        params.append(_inicio_del_dia(hasta + timedelta(days=1)))
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+
+    with connection.cursor() as cursor:
+        consulta = cursor.mogrify(
+            f"SELECT {', '.join(COLUMNAS)} FROM {Asistencia._meta.db_table} {where} ORDER BY fecha_hora, id",
+            params,
+        ).decode()
+        sql = f"COPY ({consulta}) TO STDOUT WITH (FORMAT csv, HEADER true)"
+        if comprimir:
+            with gzip.GzipFile(fileobj=destino, mode='wb') as archivo_gzip:
+                cursor.copy_expert(sql, archivo_gzip)
+        else:
+            cursor.copy_expert(sql, destino)
+
+
+def importar_asistencias(origen, comprimido=False):
+    """
+    Carga asistencias desde un CSV con cabecera y las columnas que genera la exportación
+    (si falta 'tipo' las marcas se consideran entradas).
+
+    Las filas se copian con COPY ... FROM STDIN a una tabla temporal de staging y desde
+    ahí se valida antes de insertar en bloque:
+    - se descartan las filas de empleados que no existen o con un tipo inválido,
+    - se descartan las marcas de días en que el empleado ya tiene una marca del mismo tipo,
+    - dentro del archivo se conserva solo la primera entrada y la primera salida de cada
+      empleado por día.
+
+    Devuelve un diccionario con la cantidad de filas en cada caso.
+    """
+    if comprimido:
+        origen = gzip.GzipFile(fileobj=origen, mode='rb')
+    columnas = _leer_cabecera(origen)
+
+    tabla = Asistencia._meta.db_table
+    tabla_empleados = Empleado._meta.db_table
+    zona = timezone.get_current_timezone_name()
+    dia = "(fecha_hora AT TIME ZONE %(zona)s)::date"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMPORARY TABLE asistencia_staging ("
+            " id_empl_id bigint, fecha_hora timestamptz NOT NULL,"
+            f" tipo varchar(7) NOT NULL DEFAULT '{Asistencia.ENTRADA}', minutos_retraso integer"
+            ") ON COMMIT DROP"
+        )
+        # La cabecera ya fue leída: COPY recibe solo las filas de datos.
+        cursor.copy_expert(
+            f"COPY asistencia_staging ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)",
+            origen,
+        )
+        cursor.execute("ANALYZE asistencia_staging")
+        cursor.execute("SELECT count(*) FROM asistencia_staging")
+        leidas = cursor.fetchone()[0]
+
+        cursor.execute(
+            f"DELETE FROM asistencia_staging s WHERE NOT EXISTS ("
+            f" SELECT 1 FROM {tabla_empleados} e WHERE e.id = s.id_empl_id)"
+        )
+        empleados_inexistentes = cursor.rowcount
+
+        cursor.execute(
+            "DELETE FROM asistencia_staging WHERE tipo NOT IN (%s, %s)",
+            [Asistencia.ENTRADA, Asistencia.SALIDA],
+        )
+        tipo_invalido = cursor.rowcount
+
+        cursor.execute(
+            f"DELETE FROM asistencia_staging s WHERE EXISTS ("
+            f" SELECT 1 FROM {tabla} a"
+            f" WHERE a.id_empl_id = s.id_empl_id AND a.tipo = s.tipo"
+            f" AND a.fecha_hora >= ((s.fecha_hora AT TIME ZONE %(zona)s)::date::timestamp AT TIME ZONE %(zona)s)"
+            f" AND a.fecha_hora < (((s.fecha_hora AT TIME ZONE %(zona)s)::date + 1)::timestamp AT TIME ZONE %(zona)s))",
+            {'zona': zona},
+        )
+        ya_registradas = cursor.rowcount
+
+        cursor.execute(
+            "SELECT DISTINCT date_trunc('month', fecha_hora AT TIME ZONE %(zona)s)::date FROM asistencia_staging",
+            {'zona': zona},
+        )
+        periodos = [fila[0] for fila in cursor.fetchall()]
+
+        # Una marca de cada tipo por empleado y día: nos quedamos con la más temprana.
+        cursor.execute(
+            f"INSERT INTO {tabla} ({', '.join(COLUMNAS)})"
+            f" SELECT DISTINCT ON (id_empl_id, {dia}, tipo) id_empl_id, fecha_hora, tipo, COALESCE(minutos_retraso, 0)"
+            f" FROM asistencia_staging ORDER BY id_empl_id, {dia}, tipo, fecha_hora",
+            {'zona': zona},
+        )
+        insertadas = cursor.rowcount
+        # ON COMMIT DROP no alcanza si la importación corre dentro de una transacción mayor.
+        cursor.execute("DROP TABLE asistencia_staging")
+
+        transaction.on_commit(lambda: invalidar_reportes_asistencia(periodos))
+
+    resumen = {
+        'leidas': leidas,
+        'insertadas': insertadas,
+        'empleados_inexistentes': empleados_inexistentes,
+        'tipo_invalido': tipo_invalido,
+        'ya_registradas': ya_registradas,
+        'duplicadas': leidas - empleados_inexistentes - tipo_invalido - ya_registradas - insertadas,
+    }
+    logger.info(f"Importación de asistencias finalizada: {resumen}")
+    return resumen
@@ -0,0 +1,182 @@
+import re
+import unicodedata
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordDistance
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import CharField, F, FloatField, Func, Q, TextField, Value
+from django.db.models.functions import Cast, Collate, Concat, Upper
+
+# Puntaje de cada forma de coincidir; la similitud de trigramas va de 0 a 1.
+PUNTAJE_PREFIJO = {'apellido': 3.0, 'nombre': 3.0, 'dni': 3.0, 'email': 2.0}
+# Similitud mínima (por palabra) para mostrar una coincidencia aproximada.
+SIMILITUD_MINIMA = 0.4
+MAXIMO_TERMINOS = 4
+# Las palabras más cortas no tienen trigramas con los que el índice GIN pueda acotarlas.
+LARGO_MINIMO_TRIGRAMA = 3
+# Candidatos de la búsqueda aproximada que se ordenan por similitud.
+CANDIDATOS_APROXIMADOS = 200
+
+
+class SinAcentos(Func):
+    """
+    unaccent() envuelta en una función IMMUTABLE (creada en la migración
+    0005_indices_busqueda_empleado) para poder usarla en índices.
+    """
+    function = 'inmutable_unaccent'
+    output_field = TextField()
+
+
+def expresion_busqueda(campo):
+    """`campo` en mayúsculas y sin acentos, con orden binario ("C") para que LIKE 'X%' use un btree."""
+    return Collate(Upper(SinAcentos(F(campo))), 'C')
+
+
+def expresion_dni():
+    return Collate(Cast('dni', CharField()), 'C')
+
+
+def expresion_texto():
+    """Nombre y apellido juntos, sin acentos y en mayúsculas: el campo generado Empleado.texto_busqueda."""
+    return Upper(SinAcentos(Concat('nombre', Value(' '), 'apellido', output_field=TextField())))
+
+
+def normalizar(texto):
+    descompuesto = unicodedata.normalize('NFKD', texto)
+    return ''.join(letra for letra in descompuesto if not unicodedata.combining(letra)).upper()
+
+
+def _palabra_que_empieza_con(termino):
+    return r'(^|[^A-Z0-9])' + re.escape(termino)
+
+
+def consultas_busqueda(queryset, texto, limite):
+    """
+    Las consultas de buscar_empleados, sin ejecutar: (prefijos, aproximada). `prefijos`
+    es None si el texto no tiene términos; `aproximada`, si la búsqueda es por DNI.
+    Sirve también para ver sus planes (benchmark_busqueda_empleados --explain).
+    """
+    terminos = [termino for termino in (normalizar(t) for t in texto.split()[:MAXIMO_TERMINOS]) if termino]
+    if not terminos:
+        return None, None
+
+    principal = max(terminos, key=len)
+    if len(terminos) > 1 and not principal.isdigit() and min(map(len, terminos)) >= LARGO_MINIMO_TRIGRAMA:
+        prefijos = _nombre_y_apellido(queryset, terminos, limite)
+        return prefijos, _aproximada(queryset, terminos, limite)
+
+    resto = list(terminos)
+    resto.remove(principal)
+    filtro = Q()
+    for termino in resto:
+        filtro &= Q(texto_busqueda__regex=_palabra_que_empieza_con(termino))
+    base = queryset.filter(filtro)
+
+    if principal.isdigit():
+        rangos = {'dni': expresion_dni()}
+    else:
+        rangos = {campo: expresion_busqueda(campo) for campo in ('apellido', 'nombre', 'email')}
+    ramas = [
+        base.annotate(clave=expresion, puntaje=Value(PUNTAJE_PREFIJO[campo], output_field=FloatField()))
+        .filter(clave__startswith=principal).order_by('clave', 'id')[:limite]
+        for campo, expresion in rangos.items()
+    ]
+    prefijos = ramas[0].union(*ramas[1:], all=True) if len(ramas) > 1 else ramas[0]
+    if principal.isdigit():
+        return prefijos, None
+    return prefijos, _aproximada(queryset, terminos, limite)
+
+
+def _nombre_y_apellido(queryset, terminos, limite):
+    # Todas las palabras, de tres letras o más, como comienzo de alguna palabra del nombre
+    # o del apellido: el GIN de trigramas cruza las palabras y deja pocas filas, que se
+    # ordenan. La clave de orden no es la de ningún btree a propósito: si lo fuera, el
+    # planificador recorrería en orden el índice del apellido filtrando fila por fila y,
+    # si la combinación no existe, lo leería entero.
+    filtro = Q()
+    for termino in terminos:
+        filtro &= Q(texto_busqueda__regex=_palabra_que_empieza_con(termino))
+    clave = Collate(Upper(SinAcentos(Concat('apellido', Value(' '), 'nombre', output_field=TextField()))), 'C')
+    return (
+        queryset.filter(filtro)
+        .annotate(puntaje=Value(PUNTAJE_PREFIJO['apellido'], output_field=FloatField()))
+        .order_by(clave, 'id')[:limite]
+    )
+
+
+def _aproximada(queryset, terminos, limite):
+    # Candidatos: cada término se parece a alguna palabra (operador <% con el umbral
+    # pg_trgm.word_similarity_threshold, resuelto por el índice GIN). Se ordenan solo los
+    # primeros CANDIDATOS_APROXIMADOS y no todos los que pasan el umbral: con apellidos
+    # comunes serían miles. Se ejecuta dentro de sin_recorrido_secuencial().
+    candidatos = queryset
+    for termino in terminos:
+        candidatos = candidatos.filter(texto_busqueda__trigram_word_similar=termino)
+    candidatos = candidatos.order_by().values('pk')[:max(CANDIDATOS_APROXIMADOS, limite)]
+    distancia = TrigramWordDistance(Value(' '.join(terminos)), 'texto_busqueda')
+    return queryset.filter(pk__in=candidatos).annotate(puntaje=1 - distancia).order_by(distancia, 'id')[:limite]
+
+
+@contextmanager
+def sin_recorrido_secuencial(alias=DEFAULT_DB_ALIAS):
+    """
+    Desaconseja al planificador leer la tabla entera mientras dure el bloque (enable_seqscan).
+
+    Para la búsqueda aproximada estima barato comparar trigramas fila por fila y, como hay
+    LIMIT, prefiere recorrer la tabla hasta juntar los candidatos: con 100.000 empleados
+    eso tarda varias veces lo que el índice GIN. El valor anterior se restaura al salir;
+    si el bloque falla, lo deshace el rollback del savepoint.
+    """
+    with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+        cursor.execute("SELECT current_setting('enable_seqscan'), set_config('enable_seqscan', 'off', true)")
+        anterior = cursor.fetchone()[0]
+        yield
+        cursor.execute("SELECT set_config('enable_seqscan', %s, true)", [anterior])
+
+
+def buscar_empleados(queryset, texto, limite=None):
+    """
+    Búsqueda para autocompletar sobre nombre, apellido, email y DNI, sin distinguir
+    mayúsculas ni acentos. Devuelve una lista de a lo sumo `limite` empleados, cada uno
+    con su `puntaje`, los mejores primero.
+
+    Cada rama está acotada con LIMIT y servida por un índice de Empleado.Meta, así el
+    costo no depende de cuántos empleados coincidan:
+    - prefijo del apellido, del nombre, del email o del DNI: un rango de un btree que
+      ya devuelve las filas en orden y se corta a las `limite` primeras (todas las
+      ramas de prefijo van en una sola consulta, UNION ALL). Con varias palabras, la
+      más larga elige el rango y las demás se exigen como comienzo de alguna palabra
+      del nombre o del apellido,
+    - nombre y apellido, si son varias palabras de al menos LARGO_MINIMO_TRIGRAMA
+      letras: todas como comienzo de alguna palabra, cruzadas en el índice GIN de
+      trigramas de texto_busqueda,
+    - aproximada, sólo si lo anterior no llena el límite: hasta
+      CANDIDATOS_APROXIMADOS empleados en los que cada palabra buscada se parece a
+      alguna palabra del nombre o del apellido (mismo índice GIN), ordenados por
+      similitud; tolera errores de tipeo en cualquiera de las palabras buscadas.
+    """
+    if limite is None:
+        limite = getattr(settings, 'EMPLEADOS_BUSQUEDA_LIMITE', 10)
+    prefijos, aproximada = consultas_busqueda(queryset, texto, limite)
+    if prefijos is None:
+        return []
+
+    mejores = {}
+    _quedarse_con_los_mejores(mejores, prefijos)
+    # Una coincidencia aproximada (puntaje <= 1) nunca supera a una por prefijo, así que
+    # si los prefijos ya llenan el límite la búsqueda por trigramas no cambia el resultado.
+    if len(mejores) < limite and aproximada is not None:
+        with sin_recorrido_secuencial(aproximada.db):
+            _quedarse_con_los_mejores(mejores, aproximada)
+
+    ordenados = sorted(mejores.values(), key=lambda e: (-e.puntaje, normalizar(e.apellido), normalizar(e.nombre), e.id))
+    return ordenados[:limite]
+
+
+def _quedarse_con_los_mejores(mejores, empleados):
+    for empleado in empleados:
+        if empleado.puntaje < SIMILITUD_MINIMA:
+            continue
+        if empleado.id not in mejores or empleado.puntaje > mejores[empleado.id].puntaje:
+            mejores[empleado.id] = empleado
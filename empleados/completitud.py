@@ -0,0 +1,88 @@
+from django.db import models
+from django.db.models import Avg, Case, Count, Exists, ExpressionWrapper, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Documento, Legajo, RequisitoDocumento
+
+# Escala de la clave de orden: completitud en centésimos de punto (0-10000) por delante
+# del id del legajo, que la desempata.
+ESCALA_ORDEN = 10_000_000_000
+
+
+def legajos_con_completitud():
+    """
+    Legajos con la completitud anotada (ver LegajoQuerySet.con_completitud) y los datos del
+    empleado, más `orden_completitud`: una clave única que ordena por completitud y luego
+    por id, para que la paginación por cursor no repita ni saltee legajos empatados.
+    """
+    centesimos = Case(
+        When(documentos_requeridos=0, then=Value(10000)),
+        default=F('documentos_cargados') * 10000 / F('documentos_requeridos'),
+    )
+    return Legajo.objects.con_completitud().select_related('id_empl').annotate(
+        # bigint explícito: con el tipo del id el filtro del cursor se tomaría como fuera de rango.
+        orden_completitud=ExpressionWrapper(centesimos * ESCALA_ORDEN + F('id'), output_field=models.BigIntegerField()),
+    )
+
+
+def filtrar_completitud(queryset, estado=None, minimo=None, maximo=None, falta=None, estado_empleado=None):
+    """
+    - estado: 'completo' o 'incompleto'.
+    - minimo / maximo: porcentaje de completitud, inclusivos.
+    - falta: id de un requisito; solo los legajos que no tienen ese documento cargado.
+    - estado_empleado: estado del empleado ('Activo', 'Licencia', ...).
+    """
+    if estado == 'completo':
+        queryset = queryset.filter(documentos_cargados__gte=F('documentos_requeridos'))
+    elif estado == 'incompleto':
+        queryset = queryset.filter(documentos_cargados__lt=F('documentos_requeridos'))
+    if minimo is not None:
+        queryset = queryset.filter(completitud__gte=minimo)
+    if maximo is not None:
+        queryset = queryset.filter(completitud__lte=maximo)
+    if falta is not None:
+        queryset = queryset.filter(~Exists(Documento.objects.filter(
+            id_leg=OuterRef('pk'), id_requisito=falta, estado_carga=Documento.CARGADO, estado_doc=True,
+        )))
+    if estado_empleado:
+        queryset = queryset.filter(id_empl__estado=estado_empleado)
+    return queryset
+
+
+def totales_por_requisito():
+    """
+    Por cada requisito obligatorio y activo, cuántos legajos de la empresa lo tienen
+    cargado y cuántos no, en una sola consulta.
+    """
+    total_legajos = Subquery(
+        Legajo.objects.order_by().annotate(total=models.Func(F('id'), function='COUNT')).values('total')[:1],
+        output_field=models.IntegerField(),
+    )
+    cargado = Q(documento__estado_carga=Documento.CARGADO, documento__estado_doc=True)
+    requisitos = RequisitoDocumento.objects.filter(obligatorio=True, estado_doc=True).annotate(
+        legajos=Coalesce(total_legajos, 0),
+        cargados=Count('documento__id_leg', filter=cargado, distinct=True),
+    ).order_by('id')
+    return [
+        {
+            'id': requisito.id,
+            'nombre_doc': requisito.nombre_doc,
+            'legajos': requisito.legajos,
+            'cargados': requisito.cargados,
+            'faltantes': requisito.legajos - requisito.cargados,
+            'porcentaje': round(100 * requisito.cargados / requisito.legajos, 1) if requisito.legajos else 100.0,
+        }
+        for requisito in requisitos
+    ]
+
+
+def resumen_completitud():
+    """Totales de la empresa: legajos completos e incompletos y completitud promedio."""
+    resumen = Legajo.objects.con_completitud().aggregate(
+        legajos=Count('id'),
+        completos=Count('id', filter=Q(documentos_cargados__gte=F('documentos_requeridos'))),
+        promedio=Avg('completitud'),
+    )
+    resumen['incompletos'] = resumen['legajos'] - resumen['completos']
+    resumen['promedio'] = round(resumen['promedio'], 1) if resumen['promedio'] is not None else None
+    return resumen
@@ -0,0 +1,249 @@
+import csv
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+
+from notificaciones.correos import encolar_correos
+from notificaciones.servicios import notificar
+from .models import Documento, Empleado, Legajo, RequisitoDocumento
+from .numeracion import reservar_nros_legajo
+from .serializer import FilaImportacionEmpleadoSerializer
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS = ('nombre', 'apellido', 'dni', 'email', 'telefono', 'genero', 'estado_civil', 'fecha_nacimiento', 'grupo')
+COLUMNAS_OBLIGATORIAS = {'nombre', 'apellido', 'dni', 'email', 'fecha_nacimiento'}
+# Por debajo de esta cantidad de filas no conviene levantar procesos para el hash.
+MINIMO_FILAS_PROCESOS = 8
+
+
+class FormatoInvalido(ValueError):
+    pass
+
+
+def _valor_celda(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, float) and valor.is_integer():
+        # Excel guarda los números como float: 30123456.0 -> '30123456'.
+        return str(int(valor))
+    return str(valor).strip()
+
+
+def _leer_csv(archivo):
+    contenido = archivo.read()
+    if isinstance(contenido, bytes):
+        contenido = contenido.decode('utf-8-sig')
+    lector = csv.reader(io.StringIO(contenido))
+    return [[celda.strip() for celda in fila] for fila in lector]
+
+
+def _leer_xlsx(archivo):
+    try:
+        # openpyxl solo hace falta para importar planillas, se carga recién acá.
+        from openpyxl import load_workbook
+    except ImportError:
+        raise FormatoInvalido("Para importar archivos .xlsx hay que instalar openpyxl.")
+    try:
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+    except Exception as e:
+        raise FormatoInvalido(f"No se pudo leer la planilla: {e}")
+    try:
+        return [[_valor_celda(valor) for valor in fila] for fila in libro.worksheets[0].iter_rows(values_only=True)]
+    finally:
+        libro.close()
+
+
+def leer_filas(archivo, nombre_archivo):
+    """
+    Lee un CSV o XLSX (primera hoja) con cabecera y devuelve una lista de
+    (número de fila, dict columna -> valor). Las filas vacías se ignoran.
+    """
+    extension = os.path.splitext(nombre_archivo)[1].lower()
+    if extension == '.csv':
+        filas = _leer_csv(archivo)
+    elif extension == '.xlsx':
+        filas = _leer_xlsx(archivo)
+    else:
+        raise FormatoInvalido("El archivo debe ser .csv o .xlsx.")
+    if not filas:
+        raise FormatoInvalido("El archivo está vacío.")
+
+    cabecera = [columna.strip().lower() for columna in filas[0]]
+    desconocidas = set(cabecera) - set(COLUMNAS) - {''}
+    if desconocidas:
+        raise FormatoInvalido(f"Columnas desconocidas: {', '.join(sorted(desconocidas))}.")
+    faltantes = COLUMNAS_OBLIGATORIAS - set(cabecera)
+    if faltantes:
+        raise FormatoInvalido(f"Faltan las columnas: {', '.join(sorted(faltantes))}.")
+
+    resultado = []
+    for numero, fila in enumerate(filas[1:], start=2):
+        if not any(fila):
+            continue
+        datos = {columna: valor for columna, valor in zip(cabecera, fila) if columna and valor != ''}
+        resultado.append((numero, datos))
+    return resultado
+
+
+def validar_filas(filas):
+    """
+    Valida todas las filas antes de crear nada. Devuelve (válidas, errores): las válidas
+    como (número, datos validados) y los errores como una lista con el número de fila,
+    el DNI leído y los errores por campo.
+    """
+    grupos = {grupo.name: grupo for grupo in Group.objects.all()}
+    validas, errores = [], []
+    for numero, datos in filas:
+        serializer = FilaImportacionEmpleadoSerializer(data=datos)
+        if not serializer.is_valid():
+            errores.append({'fila': numero, 'dni': datos.get('dni'), 'errores': serializer.errors})
+            continue
+        validado = serializer.validated_data
+        if validado['grupo'] not in grupos:
+            errores.append({'fila': numero, 'dni': datos.get('dni'), 'errores': {'grupo': [f"El grupo '{validado['grupo']}' no existe."]}})
+            continue
+        validado['grupo'] = grupos[validado['grupo']]
+        validas.append((numero, validado))
+
+    # Unicidad del DNI: contra la base (una consulta por tabla) y dentro del archivo.
+    dnis = [validado['dni'] for _, validado in validas]
+    existentes = set(Empleado.objects.filter(dni__in=dnis).values_list('dni', flat=True))
+    existentes |= {int(username) for username in User.objects.filter(username__in=[str(dni) for dni in dnis]).values_list('username', flat=True)}
+    vistos = set()
+    unicas = []
+    for numero, validado in validas:
+        dni = validado['dni']
+        if dni in existentes:
+            errores.append({'fila': numero, 'dni': str(dni), 'errores': {'dni': ['Ya existe un usuario con este DNI.']}})
+        elif dni in vistos:
+            errores.append({'fila': numero, 'dni': str(dni), 'errores': {'dni': ['El DNI está repetido en el archivo.']}})
+        else:
+            vistos.add(dni)
+            unicas.append((numero, validado))
+
+    errores.sort(key=lambda error: error['fila'])
+    return unicas, errores
+
+
+def _inicializar_proceso():
+    # Con el método de arranque 'spawn' el proceso hijo no hereda Django configurado.
+    if not apps.ready:
+        django.setup()
+
+
+def _hashear(password):
+    return make_password(password)
+
+
+def hashear_passwords(passwords):
+    """
+    Calcula los hashes en un pool de procesos: PBKDF2 es CPU puro y con hilos el GIL
+    lo serializaría. Con pocas contraseñas se calcula en el proceso actual.
+    """
+    procesos = getattr(settings, 'EMPLEADOS_IMPORTACION_PROCESOS', None) or os.cpu_count() or 1
+    if procesos <= 1 or len(passwords) < MINIMO_FILAS_PROCESOS:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (procesos * 4))
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_proceso) as pool:
+        return list(pool.map(_hashear, passwords, chunksize=chunksize))
+
+
+def _crear_lote(lote, requisitos):
+    """Crea usuarios, grupos, empleados, legajos, documentos y notificaciones de un lote."""
+    with transaction.atomic():
+        usuarios = User.objects.bulk_create([
+            User(username=str(validado['dni']), email=validado['email'], password=password)
+            for validado, password in lote
+        ])
+        User.groups.through.objects.bulk_create([
+            User.groups.through(user_id=user.pk, group_id=validado['grupo'].pk)
+            for user, (validado, _) in zip(usuarios, lote)
+        ])
+        empleados = Empleado.objects.bulk_create([
+            Empleado(user=user, **{campo: valor for campo, valor in validado.items() if campo != 'grupo'})
+            for user, (validado, _) in zip(usuarios, lote)
+        ])
+
+        nros_legajo = reservar_nros_legajo(len(empleados))
+        legajos = Legajo.objects.bulk_create([
+            Legajo(id_empl=empleado, estado_leg='Pendiente', nro_leg=nro_leg)
+            for empleado, nro_leg in zip(empleados, nros_legajo)
+        ])
+        # Un documento por requisito activo, pendiente de carga.
+        Documento.objects.bulk_create([
+            Documento(id_leg=legajo, id_requisito=requisito, estado_carga=Documento.PENDIENTE)
+            for legajo in legajos for requisito in requisitos
+        ])
+        notificar(
+            empleados, "¡Bienvenido/a, {destinatario.nombre}! Tu perfil ha sido creado exitosamente.",
+            enlace="/empleados/perfil/",
+        )
+    return empleados
+
+
+def enviar_correos_bienvenida(empleados, login_url):
+    """Encola los correos de bienvenida en la bandeja de salida, con un solo INSERT."""
+    return encolar_correos([
+        {
+            'destinatario': empleado.email,
+            'asunto': "¡Bienvenido/a a Nuevas Energías! - Tu cuenta ha sido creada",
+            'plantilla': 'email/bienvenida_empleado.html',
+            'contexto': {
+                'empleado_nombre': empleado.nombre,
+                'username': empleado.dni,
+                'password': empleado.dni,  # La contraseña es el DNI
+                'login_url': login_url,
+            },
+            'tipo': 'bienvenida',
+        }
+        for empleado in empleados
+    ])
+
+
+def importar_empleados(archivo, nombre_archivo, parcial=False, simular=False, login_url=None):
+    """
+    Da de alta empleados desde un CSV o XLSX con las columnas de COLUMNAS (el grupo es
+    opcional, por defecto 'Empleado'). La contraseña inicial es el DNI, igual que en el
+    alta individual.
+
+    Primero se validan todas las filas. Si hay errores no se crea nada, salvo con
+    `parcial`, que importa las filas válidas. `simular` solo valida. Las filas se crean
+    en lotes de EMPLEADOS_IMPORTACION_LOTE, cada uno en su transacción, y al final se
+    encolan los correos de bienvenida si se indicó `login_url`.
+
+    Devuelve un resumen con las filas leídas, creadas y los errores por fila.
+    """
+    filas = leer_filas(archivo, nombre_archivo)
+    validas, errores = validar_filas(filas)
+    resumen = {'leidas': len(filas), 'validas': len(validas), 'creados': 0, 'correos_encolados': 0, 'errores': errores}
+    if simular or not validas or (errores and not parcial):
+        return resumen
+
+    passwords = hashear_passwords([str(validado['dni']) for _, validado in validas])
+    requisitos = list(RequisitoDocumento.objects.filter(estado_doc=True))
+    tamano_lote = getattr(settings, 'EMPLEADOS_IMPORTACION_LOTE', 100)
+    pendientes = [(validado, password) for (_, validado), password in zip(validas, passwords)]
+
+    creados = []
+    for inicio in range(0, len(pendientes), tamano_lote):
+        creados.extend(_crear_lote(pendientes[inicio:inicio + tamano_lote], requisitos))
+    resumen['creados'] = len(creados)
+    logger.info(f"Importación de empleados: {len(creados)} creados, {len(errores)} filas con errores.")
+
+    if login_url:
+        resumen['correos_encolados'] = enviar_correos_bienvenida(creados, login_url)
+    return resumen
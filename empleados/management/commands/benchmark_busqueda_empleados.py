@@ -0,0 +1,130 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from empleados.busqueda import buscar_empleados, consultas_busqueda, sin_recorrido_secuencial
+from empleados.models import Empleado
+
+NOMBRES = [
+    'María', 'Juan', 'José', 'Ana', 'Carlos', 'Lucía', 'Jorge', 'Laura', 'Luis', 'Marta', 'Miguel', 'Sofía',
+    'Mariano', 'Marina', 'Martín', 'Paula', 'Pedro', 'Valeria', 'Diego', 'Camila', 'Gabriel', 'Florencia',
+    'Roberto', 'Julieta', 'Ricardo', 'Agustina', 'Fernando', 'Carolina', 'Sergio', 'Daniela',
+]
+APELLIDOS = [
+    'González', 'Rodríguez', 'Gómez', 'Fernández', 'López', 'Díaz', 'Martínez', 'Pérez', 'García', 'Sánchez',
+    'Romero', 'Sosa', 'Torres', 'Álvarez', 'Ruiz', 'Ramírez', 'Flores', 'Benítez', 'Acosta', 'Medina',
+    'Herrera', 'Suárez', 'Aguirre', 'Giménez', 'Gutiérrez', 'Pereyra', 'Rojas', 'Molina', 'Castro', 'Ortiz',
+    'Guaymás', 'Cruz', 'Mamaní', 'Quispe', 'Chocobar', 'Vilte', 'Tolaba', 'Cardozo', 'Luna', 'Arias',
+]
+# Prefijos, errores de tipeo, nombre y apellido juntos y prefijos de DNI.
+CONSULTAS = ['mar', 'gonz', 'rodrigez', 'fernandes', 'juan per', 'guayma', 'maria lopez', 'sosa.', '301', '3015']
+
+
+class _Deshacer(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la búsqueda de empleados para autocompletar. Si hay menos empleados que --empleados "
+        "genera datos de prueba dentro de una transacción que se deshace al terminar. Falla si el "
+        "percentil 95 de alguna consulta supera --objetivo-ms."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empleados', type=int, default=100_000, help='Cantidad de empleados a alcanzar (por defecto 100000).')
+        parser.add_argument('--repeticiones', type=int, default=50, help='Ejecuciones medidas de cada consulta.')
+        parser.add_argument('--objetivo-ms', type=float, default=20.0, help='Percentil 95 máximo aceptado en milisegundos.')
+        parser.add_argument('--explain', action='store_true', help='Muestra el plan de ejecución de cada consulta.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("La búsqueda de empleados requiere PostgreSQL.")
+        try:
+            with transaction.atomic():
+                faltantes = options['empleados'] - Empleado.objects.count()
+                if faltantes > 0:
+                    self.stdout.write(f"Generando {faltantes} empleados de prueba (se descartan al terminar)...")
+                    self._generar(faltantes)
+                resultados = self._medir(options['repeticiones'], options['explain'])
+                raise _Deshacer
+        except _Deshacer:
+            pass
+        if faltantes > 0 and not connection.in_atomic_block:
+            # Lo generado queda como filas muertas, también en el índice GIN: sin VACUUM la
+            # próxima medición recorrería cientos de miles de filas que ya no existen.
+            with connection.cursor() as cursor:
+                cursor.execute(f"VACUUM ANALYZE {Empleado._meta.db_table}, {User._meta.db_table}")
+
+        excedidas = []
+        for consulta, tiempos, filas in resultados:
+            p50 = statistics.median(tiempos)
+            p95 = statistics.quantiles(tiempos, n=20, method='inclusive')[-1] if len(tiempos) > 1 else tiempos[0]
+            estilo = self.style.SUCCESS if p95 <= options['objetivo_ms'] else self.style.ERROR
+            self.stdout.write(estilo(f"{consulta!r:16} p50 {p50:6.2f} ms  p95 {p95:6.2f} ms  máx {max(tiempos):6.2f} ms  ({filas} resultados)"))
+            if p95 > options['objetivo_ms']:
+                excedidas.append(consulta)
+
+        if excedidas:
+            raise CommandError(f"Superan el objetivo de {options['objetivo_ms']} ms: {', '.join(excedidas)}.")
+        self.stdout.write(self.style.SUCCESS(f"Todas las consultas quedan bajo {options['objetivo_ms']} ms (p95)."))
+
+    def _generar(self, cantidad):
+        tabla_usuarios = User._meta.db_table
+        tabla_empleados = Empleado._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COALESCE(max(dni), 30000000) FROM {tabla_empleados}")
+            dni_inicial = cursor.fetchone()[0] + 1
+            cursor.execute(
+                f"INSERT INTO {tabla_usuarios}"
+                f" (password, is_superuser, username, first_name, last_name, email, is_staff, is_active, date_joined)"
+                f" SELECT '!', false, 'benchmark_' || g, '', '', '', false, true, now() FROM generate_series(1, %s) g",
+                [cantidad],
+            )
+            cursor.execute(
+                f"INSERT INTO {tabla_empleados}"
+                f" (user_id, nombre, apellido, dni, email, genero, estado_civil, fecha_nacimiento, estado, fecha_ingreso)"
+                f" SELECT u.id, n.nombre, a.apellido, %s + u.fila,"
+                f"  lower(translate(n.nombre || '.' || a.apellido, 'áéíóúÁÉÍÓÚ', 'aeiouAEIOU')) || u.fila || '@example.com',"
+                f"  'O', 'Soltero', DATE '1990-01-01', 'Activo', current_date"
+                f" FROM (SELECT id, row_number() OVER (ORDER BY id) AS fila FROM {tabla_usuarios}"
+                f"       WHERE username LIKE 'benchmark\\_%%') u"
+                f" CROSS JOIN LATERAL (SELECT (%s::text[])[1 + (u.fila * 7919) %% %s] AS nombre) n"
+                f" CROSS JOIN LATERAL (SELECT (%s::text[])[1 + (u.fila / %s * 104729) %% %s] AS apellido) a",
+                [dni_inicial, NOMBRES, len(NOMBRES), APELLIDOS, len(NOMBRES), len(APELLIDOS)],
+            )
+            # Estadísticas al día para que el planificador elija los índices de búsqueda, y
+            # la lista pendiente del GIN volcada al índice, como la deja autovacuum: si no,
+            # cada búsqueda recorre entera la lista con las filas recién insertadas.
+            cursor.execute(f"ANALYZE {tabla_empleados}")
+            cursor.execute("SELECT gin_clean_pending_list('empleado_texto_gin_idx'::regclass)")
+
+    def _medir(self, repeticiones, explain):
+        queryset = Empleado.objects.filter(estado='Activo').only('id', 'nombre', 'apellido', 'dni', 'email', 'telefono', 'estado')
+        resultados = []
+        for consulta in CONSULTAS:
+            if explain:
+                self._explicar(queryset, consulta)
+            filas = len(buscar_empleados(queryset, consulta))  # Calentamiento.
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                list(buscar_empleados(queryset, consulta))
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            resultados.append((consulta, tiempos, filas))
+        return resultados
+
+    def _explicar(self, queryset, consulta):
+        # buscar_empleados devuelve una lista: se explican las consultas que ejecuta.
+        prefijos, aproximada = consultas_busqueda(queryset, consulta, settings.EMPLEADOS_BUSQUEDA_LIMITE)
+        if prefijos is None:
+            return
+        self.stdout.write(f"--- {consulta!r} (prefijos)\n{prefijos.explain(analyze=True)}")
+        if aproximada is not None:
+            with sin_recorrido_secuencial(aproximada.db):
+                plan = aproximada.explain(analyze=True)
+            self.stdout.write(f"--- {consulta!r} (aproximada)\n{plan}")
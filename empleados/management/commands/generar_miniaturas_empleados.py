@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from empleados.miniaturas import actualizar_miniaturas_empleado
+from empleados.models import Empleado
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las miniaturas WebP de las fotos de empleados que todavía no las tienen "
+        "(por ejemplo, las fotos cargadas antes de existir las miniaturas)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true', help='Regenera también las miniaturas ya existentes.')
+        parser.add_argument('--hilos', type=int, default=2, help='Fotos que se procesan en paralelo (por defecto 2).')
+
+    def handle(self, *args, **options):
+        pendientes = []
+        for empleado_id, foto, miniaturas in (
+            Empleado.objects.exclude(ruta_foto='').exclude(ruta_foto__isnull=True)
+            .values_list('id', 'ruta_foto', 'miniaturas').order_by('id')
+        ):
+            if options['todas'] or (miniaturas or {}).get('origen') != foto:
+                pendientes.append((empleado_id, foto))
+
+        def procesar(pendiente):
+            try:
+                return actualizar_miniaturas_empleado(*pendiente)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=max(1, options['hilos'])) as executor:
+            resultados = list(executor.map(procesar, pendientes))
+
+        generadas = sum(resultados)
+        self.stdout.write(self.style.SUCCESS(
+            f"Fotos procesadas: {len(pendientes)}. Con miniaturas nuevas: {generadas}. Con errores: {len(pendientes) - generadas}."
+        ))
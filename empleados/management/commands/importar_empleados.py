@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from empleados.importacion import FormatoInvalido, importar_empleados
+
+
+class Command(BaseCommand):
+    help = (
+        "Da de alta empleados desde un CSV o XLSX con cabecera (nombre, apellido, dni, email, "
+        "fecha_nacimiento y opcionalmente telefono, genero, estado_civil y grupo). Valida todas las "
+        "filas antes de crear nada y muestra los errores por fila."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Archivo .csv o .xlsx a importar.')
+        parser.add_argument('--parcial', action='store_true', help='Importa las filas válidas aunque otras tengan errores.')
+        parser.add_argument('--simular', action='store_true', help='Solo valida el archivo, sin crear nada.')
+        parser.add_argument('--url-login', help='URL de login del frontend; si se indica se envían los correos de bienvenida.')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resumen = importar_empleados(
+                    archivo, options['archivo'], parcial=options['parcial'],
+                    simular=options['simular'], login_url=options['url_login'],
+                )
+        except OSError as e:
+            raise CommandError(f"No se pudo leer el archivo: {e}")
+        except FormatoInvalido as e:
+            raise CommandError(f"El archivo no tiene un formato válido: {e}")
+
+        for error in resumen['errores']:
+            detalle = '; '.join(f"{campo}: {' '.join(str(m) for m in mensajes)}" for campo, mensajes in error['errores'].items())
+            self.stdout.write(self.style.WARNING(f"Fila {error['fila']} (DNI {error['dni']}): {detalle}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Filas leídas: {resumen['leidas']}. Válidas: {resumen['validas']}. Creados: {resumen['creados']}. "
+            f"Con errores: {len(resumen['errores'])}. Correos encolados: {resumen['correos_encolados']}."
+        ))
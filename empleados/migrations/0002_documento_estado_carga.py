@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empleados', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documento',
+            name='estado_carga',
+            field=models.CharField(choices=[('Pendiente', 'Pendiente'), ('Cargado', 'Cargado')], default='Pendiente', max_length=9),
+        ),
+        migrations.AlterField(
+            model_name='documento',
+            name='ruta_archivo',
+            field=models.FileField(blank=True, null=True, upload_to='legajos/documentos/'),
+        ),
+    ]
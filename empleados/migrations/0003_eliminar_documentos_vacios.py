@@ -0,0 +1,51 @@
+from django.core.files.storage import default_storage
+from django.db import migrations, transaction
+
+# Archivos vacíos que el alta de empleados guardaba por cada documento faltante. El
+# sufijo opcional es el que agrega el storage cuando el nombre ya existía.
+PATRON_VACIO = r'(^|/)vacio_[0-9]+(_[A-Za-z0-9]{7})?\.txt$'
+LOTE = 500
+
+
+def eliminar_documentos_vacios(apps, schema_editor):
+    """
+    Marca como cargados los documentos con archivo real y deja pendientes (sin archivo)
+    los que tenían un archivo vacío de relleno, borrando esos archivos de a lotes.
+    """
+    Documento = apps.get_model('empleados', 'Documento')
+    alias = schema_editor.connection.alias
+
+    Documento.objects.using(alias).exclude(ruta_archivo__isnull=True).exclude(ruta_archivo='').exclude(
+        ruta_archivo__regex=PATRON_VACIO
+    ).update(estado_carga='Cargado')
+
+    while True:
+        with transaction.atomic(using=alias):
+            lote = list(
+                Documento.objects.using(alias).select_for_update()
+                .filter(ruta_archivo__regex=PATRON_VACIO).values_list('id', 'ruta_archivo')[:LOTE]
+            )
+            if not lote:
+                break
+            Documento.objects.using(alias).filter(id__in=[id_doc for id_doc, _ in lote]).update(
+                ruta_archivo=None, estado_carga='Pendiente'
+            )
+        # Los archivos se borran recién con el lote confirmado.
+        for _, nombre in lote:
+            try:
+                default_storage.delete(nombre)
+            except OSError:
+                pass
+
+
+class Migration(migrations.Migration):
+    # Cada lote se confirma por separado para no mantener bloqueada toda la tabla.
+    atomic = False
+
+    dependencies = [
+        ('empleados', '0002_documento_estado_carga'),
+    ]
+
+    operations = [
+        migrations.RunPython(eliminar_documentos_vacios, migrations.RunPython.noop),
+    ]
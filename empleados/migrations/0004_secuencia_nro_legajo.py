@@ -0,0 +1,21 @@
+from django.db import migrations
+
+SECUENCIA = 'empleados_legajo_nro_leg_seq'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empleados', '0003_eliminar_documentos_vacios'),
+    ]
+
+    operations = [
+        # La secuencia arranca después del mayor número de legajo ya asignado.
+        migrations.RunSQL(
+            [
+                f"CREATE SEQUENCE IF NOT EXISTS {SECUENCIA}",
+                f"SELECT setval('{SECUENCIA}', COALESCE((SELECT max(nro_leg) FROM empleados_legajo), 0) + 1, false)",
+            ],
+            f"DROP SEQUENCE IF EXISTS {SECUENCIA}",
+        ),
+    ]
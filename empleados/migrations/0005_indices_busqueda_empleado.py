@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:18
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+import empleados.busqueda
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension, UnaccentExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empleados', '0004_secuencia_nro_legajo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        UnaccentExtension(),
+        # unaccent() es STABLE y no puede usarse en un índice: se la envuelve en una
+        # función IMMUTABLE con el diccionario explícito.
+        migrations.RunSQL(
+            "CREATE OR REPLACE FUNCTION inmutable_unaccent(text) RETURNS text AS"
+            " $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+            " LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT",
+            "DROP FUNCTION IF EXISTS inmutable_unaccent(text)",
+        ),
+        migrations.AddIndex(
+            model_name='empleado',
+            index=models.Index(django.db.models.functions.comparison.Collate(django.db.models.functions.text.Upper(empleados.busqueda.SinAcentos(models.F('apellido'))), 'C'), models.F('id'), name='empleado_apellido_busq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='empleado',
+            index=models.Index(django.db.models.functions.comparison.Collate(django.db.models.functions.text.Upper(empleados.busqueda.SinAcentos(models.F('nombre'))), 'C'), models.F('id'), name='empleado_nombre_busq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='empleado',
+            index=models.Index(django.db.models.functions.comparison.Collate(django.db.models.functions.text.Upper(empleados.busqueda.SinAcentos(models.F('email'))), 'C'), models.F('id'), name='empleado_email_busq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='empleado',
+            index=models.Index(django.db.models.functions.comparison.Collate(django.db.models.functions.comparison.Cast('dni', models.CharField()), 'C'), models.F('id'), name='empleado_dni_prefijo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='empleado',
+            index=django.contrib.postgres.indexes.GistIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(empleados.busqueda.SinAcentos(django.db.models.functions.text.Concat('nombre', models.Value(' '), 'apellido', output_field=models.TextField()))), name='gist_trgm_ops'), name='empleado_texto_trgm_idx'),
+        ),
+    ]
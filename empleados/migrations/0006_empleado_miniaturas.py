@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empleados', '0005_indices_busqueda_empleado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empleado',
+            name='miniaturas',
+            field=models.JSONField(blank=True, db_default={}, default=dict, editable=False),
+        ),
+    ]
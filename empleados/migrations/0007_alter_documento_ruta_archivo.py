@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:28
+
+import archivos.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empleados', '0006_empleado_miniaturas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='documento',
+            name='ruta_archivo',
+            field=models.FileField(blank=True, null=True, storage=archivos.storage.AlmacenamientoDeduplicado(), upload_to='legajos/documentos/'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:10
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+import empleados.busqueda
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empleados', '0007_alter_documento_ruta_archivo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='empleado',
+            name='empleado_texto_trgm_idx',
+        ),
+        migrations.AddField(
+            model_name='empleado',
+            name='texto_busqueda',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Upper(empleados.busqueda.SinAcentos(django.db.models.functions.text.Concat('nombre', models.Value(' '), 'apellido', output_field=models.TextField()))), output_field=models.TextField()),
+        ),
+        migrations.AddIndex(
+            model_name='empleado',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['texto_busqueda'], name='empleado_texto_gin_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,102 @@
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from api_nuevas_energias.cache import incrementar_version
+
+logger = logging.getLogger(__name__)
+
+CARPETA_MINIATURAS = 'empleados/fotos/miniaturas'
+
+
+def tamanos_miniatura():
+    return getattr(settings, 'EMPLEADOS_MINIATURAS_TAMANOS', (64, 256))
+
+
+def ruta_miniatura(nombre_foto, tamano):
+    base = os.path.splitext(os.path.basename(nombre_foto))[0]
+    return f"{CARPETA_MINIATURAS}/{base}_{tamano}.webp"
+
+
+def _recortar_cuadrado(imagen, tamano):
+    imagen = ImageOps.exif_transpose(imagen)
+    if imagen.mode not in ('RGB', 'RGBA'):
+        imagen = imagen.convert('RGBA' if 'transparency' in imagen.info or imagen.mode in ('LA', 'PA') else 'RGB')
+    return ImageOps.fit(imagen, (tamano, tamano), method=Image.Resampling.LANCZOS)
+
+
+def generar_miniaturas(nombre_foto):
+    """
+    Genera las miniaturas WebP cuadradas (EMPLEADOS_MINIATURAS_TAMANOS) de la foto
+    guardada en `nombre_foto` y devuelve {tamaño: ruta} con las rutas en el storage.
+    """
+    calidad = getattr(settings, 'EMPLEADOS_MINIATURAS_CALIDAD', 80)
+    rutas = {}
+    with default_storage.open(nombre_foto, 'rb') as archivo:
+        with Image.open(archivo) as imagen:
+            imagen.draft(imagen.mode, (max(tamanos_miniatura()),) * 2)  # JPEG: decodifica ya reducida
+            for tamano in sorted(tamanos_miniatura(), reverse=True):
+                miniatura = _recortar_cuadrado(imagen, tamano)
+                contenido = io.BytesIO()
+                miniatura.save(contenido, 'WEBP', quality=calidad, method=4)
+                ruta = ruta_miniatura(nombre_foto, tamano)
+                if default_storage.exists(ruta):
+                    default_storage.delete(ruta)
+                rutas[str(tamano)] = default_storage.save(ruta, ContentFile(contenido.getvalue()))
+    return rutas
+
+
+def borrar_miniaturas(miniaturas):
+    for tamano, ruta in miniaturas.items():
+        if tamano != 'origen' and ruta and default_storage.exists(ruta):
+            default_storage.delete(ruta)
+
+
+def actualizar_miniaturas_empleado(empleado_id, nombre_foto):
+    """
+    Tarea en segundo plano: genera las miniaturas de la foto del empleado y las registra
+    en Empleado.miniaturas. Si mientras tanto la foto cambió no se registra nada (la
+    foto nueva ya encoló su propia tarea) y se borran los archivos generados.
+    """
+    from .models import Empleado
+
+    try:
+        rutas = generar_miniaturas(nombre_foto)
+    except Exception as e:
+        logger.error(f"No se pudieron generar las miniaturas de {nombre_foto} (empleado {empleado_id}): {e}")
+        return False
+
+    anteriores = Empleado.objects.filter(pk=empleado_id).values_list('miniaturas', flat=True).first() or {}
+    actualizados = Empleado.objects.filter(pk=empleado_id, ruta_foto=nombre_foto).update(
+        miniaturas={'origen': nombre_foto, **rutas}
+    )
+    if not actualizados:
+        borrar_miniaturas(rutas)
+        return False
+    # update() no dispara señales: las URLs de las miniaturas aparecen en los catálogos.
+    incrementar_version('empleados')
+    if anteriores.get('origen') != nombre_foto:
+        borrar_miniaturas({tamano: ruta for tamano, ruta in anteriores.items() if ruta not in rutas.values()})
+    logger.info(f"Miniaturas generadas para el empleado {empleado_id}: {', '.join(rutas.values())}")
+    return True
+
+
+def urls_miniaturas(empleado, request=None):
+    """
+    {tamaño: url} de las miniaturas del empleado; None en cada tamaño mientras no estén
+    generadas (o si no tiene foto), para que el cliente use la foto original o un avatar.
+    """
+    miniaturas = empleado.miniaturas or {}
+    if not empleado.ruta_foto or miniaturas.get('origen') != empleado.ruta_foto.name:
+        return {str(tamano): None for tamano in tamanos_miniatura()}
+    urls = {}
+    for tamano in tamanos_miniatura():
+        ruta = miniaturas.get(str(tamano))
+        url = default_storage.url(ruta) if ruta else None
+        urls[str(tamano)] = request.build_absolute_uri(url) if url and request is not None else url
+    return urls
@@ -1,5 +1,7 @@
 from rest_framework.exceptions import PermissionDenied
 
+from usuarios.roles import es_admin
+
 class AdminWriteAccessMixin:
     """
     Mixin para restringir las operaciones de escritura (create, update, destroy)
@@ -7,11 +9,7 @@ class AdminWriteAccessMixin:
     """
     def _check_admin_privileges(self, request):
         """Comprueba si el usuario tiene privilegios de administrador."""
-        is_admin = request.user and (
-            request.user.is_superuser or
-            request.user.groups.filter(name='Administrador').exists()
-        )
-        if not is_admin:
+        if not es_admin(request.user):
             raise PermissionDenied("No tiene permiso para realizar esta acción.")
 
     def create(self, request, *args, **kwargs):
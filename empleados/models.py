@@ -1,9 +1,16 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db.models import Case, Count, F, Func, Q, Subquery, Value, When
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.urls import reverse
 
+from archivos.storage import almacenamiento_deduplicado
+
+from .busqueda import expresion_busqueda, expresion_dni, expresion_texto
+
 # Create your models here.
 def validar_mayor_18(value):
     hoy = timezone.now().date()
@@ -26,8 +33,27 @@ class Empleado(models.Model):
     ruta_foto = models.ImageField(upload_to='empleados/fotos/', blank=True, null=True)
     fecha_ingreso = models.DateField(auto_now_add=True)
     fecha_egreso = models.DateField(blank=True, null=True)
-    
+    # Miniaturas WebP de ruta_foto, generadas en segundo plano (empleados/miniaturas.py):
+    # {'origen': foto de la que salieron, '64': ruta, '256': ruta}.
+    # db_default: también tiene valor lo que se inserta por SQL (p. ej. benchmark_busqueda_empleados).
+    miniaturas = models.JSONField(default=dict, db_default={}, blank=True, editable=False)
+    # Nombre y apellido en mayúsculas y sin acentos, calculado y guardado por la base: la
+    # búsqueda (empleados/busqueda.py) lo compara fila por fila sin recalcular unaccent().
+    texto_busqueda = models.GeneratedField(expression=expresion_texto(), output_field=models.TextField(), db_persist=True)
 
+    class Meta:
+        indexes = [
+            # Índices de la búsqueda para autocompletar (empleados/busqueda.py). Los btree
+            # sobre el texto en mayúsculas, sin acentos y con orden "C" resuelven
+            # LIKE 'TEXTO%' devolviendo las filas ya ordenadas; el GIN de trigramas sobre
+            # texto_busqueda resuelve las demás palabras buscadas (~) y acota los
+            # candidatos de la búsqueda aproximada (<%).
+            models.Index(expresion_busqueda('apellido'), F('id'), name='empleado_apellido_busq_idx'),
+            models.Index(expresion_busqueda('nombre'), F('id'), name='empleado_nombre_busq_idx'),
+            models.Index(expresion_busqueda('email'), F('id'), name='empleado_email_busq_idx'),
+            models.Index(expresion_dni(), F('id'), name='empleado_dni_prefijo_idx'),
+            GinIndex(fields=['texto_busqueda'], opclasses=['gin_trgm_ops'], name='empleado_texto_gin_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nombre} {self.apellido} - {self.dni}"
@@ -52,6 +78,37 @@ class RequisitoDocumento(models.Model):
     def __str__(self):
         return self.nombre_doc
 
+class LegajoQuerySet(models.QuerySet):
+    def con_completitud(self):
+        """
+        Anota en cada legajo, calculado por la base en la misma consulta:
+        - documentos_requeridos: requisitos obligatorios y activos (los mismos para todos
+          los legajos, aunque alguno no tenga la fila de Documento de un requisito nuevo),
+        - documentos_cargados: de esos, los que tienen algún documento activo con archivo,
+        - requisitos_cargados: los ids de esos requisitos,
+        - completitud: porcentaje cargado (100 si no hay requisitos obligatorios).
+        """
+        obligatorios = RequisitoDocumento.objects.filter(obligatorio=True, estado_doc=True)
+        cargado = Q(
+            documento__id_requisito__obligatorio=True, documento__id_requisito__estado_doc=True,
+            documento__estado_carga=Documento.CARGADO, documento__estado_doc=True,
+        )
+        return self.annotate(
+            documentos_requeridos=Subquery(
+                obligatorios.order_by().annotate(total=Func(F('id'), function='COUNT')).values('total')[:1],
+                output_field=models.IntegerField(),
+            ),
+            documentos_cargados=Count('documento__id_requisito', filter=cargado, distinct=True),
+            requisitos_cargados=ArrayAgg('documento__id_requisito', filter=cargado, distinct=True, default=Value([])),
+        ).annotate(
+            completitud=Case(
+                When(documentos_requeridos=0, then=Value(100.0)),
+                default=F('documentos_cargados') * 100.0 / F('documentos_requeridos'),
+                output_field=models.FloatField(),
+            ),
+        )
+
+
 class Legajo(models.Model):
     id_empl = models.OneToOneField('Empleado', on_delete=models.CASCADE, related_name='legajo')
     estado_leg = models.CharField(max_length=50)
@@ -59,10 +116,26 @@ class Legajo(models.Model):
     nro_leg = models.IntegerField(unique=True)
     fecha_modificacion_leg = models.DateField(auto_now=True)
 
+    objects = LegajoQuerySet.as_manager()
+
 class Documento(models.Model):
+    # Cada legajo tiene un documento por requisito desde el alta; mientras no se suba el
+    # archivo queda 'Pendiente' y sin archivo.
+    PENDIENTE = 'Pendiente'
+    CARGADO = 'Cargado'
+    ESTADOS_CARGA = [(PENDIENTE, 'Pendiente'), (CARGADO, 'Cargado')]
+
     id_leg = models.ForeignKey(Legajo, on_delete=models.CASCADE)
     id_requisito = models.ForeignKey(RequisitoDocumento, on_delete=models.CASCADE)
-    ruta_archivo = models.FileField(upload_to='legajos/documentos/')
+    ruta_archivo = models.FileField(upload_to='legajos/documentos/', storage=almacenamiento_deduplicado, blank=True, null=True)
+    estado_carga = models.CharField(max_length=9, choices=ESTADOS_CARGA, default=PENDIENTE)
     fecha_hora_subida = models.DateTimeField(auto_now_add=True)
     descripcion_doc = models.CharField(max_length=255, blank=True, null=True)
-    estado_doc = models.BooleanField(default=True)
\ No newline at end of file
+    estado_doc = models.BooleanField(default=True)
+
+    def save(self, *args, **kwargs):
+        self.estado_carga = self.CARGADO if self.ruta_archivo else self.PENDIENTE
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'ruta_archivo' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'estado_carga'}
+        super().save(*args, **kwargs)
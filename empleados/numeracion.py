@@ -0,0 +1,23 @@
+from django.db import connection
+
+# Secuencia de PostgreSQL que numera los legajos (creada en la migración
+# 0004_secuencia_nro_legajo). nextval es atómico y no bloquea: dos altas simultáneas
+# nunca reciben el mismo número. Un número reservado en una transacción que se
+# revierte no se reutiliza, así que puede haber huecos en la numeración.
+SECUENCIA_NRO_LEGAJO = 'empleados_legajo_nro_leg_seq'
+
+
+def reservar_nros_legajo(cantidad):
+    """Reserva `cantidad` números de legajo con una sola consulta y los devuelve en orden."""
+    if cantidad <= 0:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(%s) FROM generate_series(1, %s)",
+            [SECUENCIA_NRO_LEGAJO, cantidad],
+        )
+        return sorted(fila[0] for fila in cursor.fetchall())
+
+
+def siguiente_nro_legajo():
+    return reservar_nros_legajo(1)[0]
@@ -1,13 +1,15 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User, Group
 from django.db import transaction
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
 from django.urls import reverse
-from django.conf import settings
 import logging
 from .models import Empleado, Legajo, Documento, RequisitoDocumento
-from notificaciones.models import Notificacion
+from .miniaturas import urls_miniaturas
+from .numeracion import siguiente_nro_legajo
+from notificaciones.correos import encolar_correo
+from notificaciones.servicios import notificar
+from archivos.descargas import enlace_si_puede
+from archivos.imagenes import encolar_recompresion
 logger = logging.getLogger(__name__)
 
 # SERIALIZERS EMPLEADOS
@@ -17,14 +19,31 @@ class EmpleadoBasicoSerializer(serializers.ModelSerializer):
     Serializador simplificado para Empleado.
     Muestra solo los campos principales, sin relaciones anidadas.
     """
+    miniaturas = serializers.SerializerMethodField()
+
     class Meta:
         model = Empleado
-        fields = ['id', 'nombre', 'apellido', 'dni', 'email', 'telefono', 'estado']
+        fields = ['id', 'nombre', 'apellido', 'dni', 'email', 'telefono', 'estado', 'miniaturas']
+
+    def get_miniaturas(self, obj):
+        return urls_miniaturas(obj, self.context.get('request'))
 
 class DocumentoSerializer(serializers.ModelSerializer):
+    url_descarga = serializers.SerializerMethodField()
+
     class Meta:
         model = Documento
         exclude = ('id_leg',)
+        read_only_fields = ('estado_carga',)
+        # El archivo se lee solo por url_descarga: la ruta bajo /media/ no pasa por el control de acceso.
+        extra_kwargs = {'ruta_archivo': {'write_only': True}}
+
+    def get_url_descarga(self, obj):
+        """
+        Enlace firmado y con vencimiento al archivo (ver archivos/descargas.py), o None si
+        el usuario no puede descargarlo.
+        """
+        return enlace_si_puede('documento', obj, self.context.get('request'))
 
 class RequisitoDocumentoSerializer(serializers.ModelSerializer):
     class Meta:
@@ -38,17 +57,69 @@ class LegajoSerializer(serializers.ModelSerializer):
         model = Legajo
         fields = ['id', 'estado_leg', 'fecha_creacion_leg', 'nro_leg', 'fecha_modificacion_leg', 'documento_set']
 
+class CompletitudLegajoSerializer(serializers.Serializer):
+    """
+    Serializer de solo lectura para las filas del tablero de completitud de legajos
+    (ver empleados/completitud.py). `requisitos_obligatorios` va en el contexto.
+    """
+    id = serializers.IntegerField()
+    nro_leg = serializers.IntegerField()
+    estado_leg = serializers.CharField()
+    empleado = EmpleadoBasicoSerializer(source='id_empl')
+    documentos_requeridos = serializers.IntegerField()
+    documentos_cargados = serializers.IntegerField()
+    completitud = serializers.SerializerMethodField()
+    requisitos_faltantes = serializers.SerializerMethodField()
+
+    def get_completitud(self, obj) -> float:
+        return round(obj.completitud, 1)
+
+    def get_requisitos_faltantes(self, obj) -> list[int]:
+        cargados = set(obj.requisitos_cargados)
+        return [requisito for requisito in self.context.get('requisitos_obligatorios', []) if requisito not in cargados]
+
+def optimizar_consulta_empleados(queryset, prefijo=''):
+    """
+    Agrega al queryset los select_related y prefetch_related que necesita EmpleadoSerializer
+    (usuario y sus grupos, legajo y sus documentos), así serializar una lista de empleados
+    cuesta una cantidad fija de consultas sin importar cuántas filas tenga.
+
+    `prefijo` es el camino hasta el empleado cuando el queryset es de otro modelo, por
+    ejemplo 'id_empl' para SancionEmpleado. Si el camino pasa por una relación múltiple
+    se usa dentro de un Prefetch: Prefetch('descargos', queryset=optimizar_consulta_empleados(
+    Descargo.objects.all(), 'autor')).
+    """
+    camino = f'{prefijo}__' if prefijo else ''
+    return queryset.select_related(f'{camino}user', f'{camino}legajo').prefetch_related(
+        f'{camino}user__groups',
+        f'{camino}legajo__documento_set',
+    )
+
+class FilaImportacionEmpleadoSerializer(serializers.ModelSerializer):
+    """
+    Valida una fila de la importación masiva de empleados (ver empleados/importacion.py).
+    La unicidad del DNI y la existencia del grupo se comprueban para todo el archivo de
+    una vez, por eso acá se quita el validador de unicidad.
+    """
+    grupo = serializers.CharField(required=False, default='Empleado')
+
+    class Meta:
+        model = Empleado
+        fields = ['nombre', 'apellido', 'dni', 'email', 'telefono', 'genero', 'estado_civil', 'fecha_nacimiento', 'grupo']
+        extra_kwargs = {'dni': {'validators': []}}
+
 class EmpleadoSerializer(serializers.ModelSerializer):
     grupo = serializers.SerializerMethodField()
     grupo_input = serializers.CharField(write_only=True, required=True, source='grupo')
     ruta_foto = serializers.ImageField(required=False, allow_null=True)
+    miniaturas = serializers.SerializerMethodField()
     legajo = LegajoSerializer(read_only=True)
 
     class Meta:
         model = Empleado
         fields = [
             'id', 'nombre', 'apellido', 'dni', 'telefono', 'email', 'genero', 'estado_civil', 
-            'fecha_nacimiento', 'estado', 'ruta_foto', 'fecha_ingreso', 'fecha_egreso', 
+            'fecha_nacimiento', 'estado', 'ruta_foto', 'miniaturas', 'fecha_ingreso', 'fecha_egreso', 
             'legajo', 'grupo', 'grupo_input'
         ]
         read_only_fields = ('legajo',)
@@ -57,9 +128,19 @@ class EmpleadoSerializer(serializers.ModelSerializer):
         """
         Devuelve el nombre del primer grupo al que pertenece el usuario asociado al empleado.
         """
-        if hasattr(obj, 'user') and obj.user.groups.exists():
-            return obj.user.groups.first().name
-        return None
+        if not hasattr(obj, 'user'):
+            return None
+        # Se ordena en Python para aprovechar los grupos precargados con optimizar_consulta_empleados;
+        # el resultado es el mismo que groups.first() (el de menor id).
+        grupos = sorted(obj.user.groups.all(), key=lambda grupo: grupo.id)
+        return grupos[0].name if grupos else None
+
+    def get_miniaturas(self, obj):
+        """
+        URLs de las miniaturas WebP de la foto ({'64': url, '256': url}) para mostrar
+        avatares sin descargar la foto original. Valen None mientras se generan.
+        """
+        return urls_miniaturas(obj, self.context.get('request'))
 
     def validate(self, data):
         """
@@ -83,7 +164,7 @@ class EmpleadoSerializer(serializers.ModelSerializer):
         2. Asignar el usuario al grupo especificado.
         3. Crear el Empleado y asociarlo al nuevo usuario.
         4. Crear el Legajo asociado al nuevo empleado.
-        5. Guardar los documentos adjuntos y crear los faltantes.
+        5. Guardar los documentos adjuntos y dejar pendientes los faltantes.
         Todo dentro de una transacción para asegurar la integridad de los datos.
         """
         request = self.context.get('request')
@@ -112,18 +193,15 @@ class EmpleadoSerializer(serializers.ModelSerializer):
                 empleado = Empleado.objects.create(user=user, **validated_data)
 
                 # Crear la notificación de bienvenida para el nuevo usuario.
-                Notificacion.objects.create(
-                    id_user=user,
-                    mensaje=f"¡Bienvenido/a, {empleado.nombre}! Tu perfil ha sido creado exitosamente.",
-                    enlace="/empleados/perfil/"
+                notificar(
+                    [user], "¡Bienvenido/a, {nombre}! Tu perfil ha sido creado exitosamente.",
+                    enlace="/empleados/perfil/", nombre=empleado.nombre,
                 )
-                # 4. Crear el Legajo asociado y generar nro_leg secuencial.
-                last_legajo = Legajo.objects.order_by('-nro_leg').first()
-                new_nro_leg = (last_legajo.nro_leg + 1) if last_legajo else 1
-                legajo = Legajo.objects.create(id_empl=empleado, estado_leg='Pendiente', nro_leg=new_nro_leg)
+                # 4. Crear el Legajo asociado con el siguiente nro_leg de la secuencia.
+                legajo = Legajo.objects.create(id_empl=empleado, estado_leg='Pendiente', nro_leg=siguiente_nro_legajo())
 
-                # 5. Guardar los documentos adjuntos y crear los faltantes
-                from django.core.files.base import ContentFile
+                # 5. Crear un documento por requisito: con el archivo adjunto si vino,
+                #    si no queda pendiente y sin archivo. Un solo INSERT para todos.
                 requisitos = RequisitoDocumento.objects.filter(estado_doc=True)
                 uploaded_docs = {}
                 if request and hasattr(request, 'FILES'):
@@ -135,21 +213,17 @@ class EmpleadoSerializer(serializers.ModelSerializer):
                             except (ValueError, IndexError):
                                 continue
 
-                for requisito in requisitos:
-                    file = uploaded_docs.get(requisito.id)
-                    if file:
-                        Documento.objects.create(
-                            id_leg=legajo,
-                            id_requisito=requisito,
-                            ruta_archivo=file
-                        )
-                    else:
-                        empty_file = ContentFile(b"", name=f'vacio_{requisito.id}.txt')
-                        Documento.objects.create(
-                            id_leg=legajo,
-                            id_requisito=requisito,
-                            ruta_archivo=empty_file
-                        )
+                documentos = Documento.objects.bulk_create([
+                    Documento(
+                        id_leg=legajo,
+                        id_requisito=requisito,
+                        ruta_archivo=uploaded_docs.get(requisito.id),
+                        estado_carga=Documento.CARGADO if requisito.id in uploaded_docs else Documento.PENDIENTE,
+                    )
+                    for requisito in requisitos
+                ])
+                # bulk_create no envía post_save: las imágenes subidas se encolan acá.
+                encolar_recompresion(documentos)
 
                 # 6. Enviar correo de bienvenida
                 if empleado.email:
@@ -166,18 +240,18 @@ class EmpleadoSerializer(serializers.ModelSerializer):
 
                         asunto = "¡Bienvenido/a a Nuevas Energías! - Tu cuenta ha sido creada"
                         
-                        # Renderizar el template HTML
-                        cuerpo_mensaje_html = render_to_string('email/bienvenida_empleado.html', {
-                            'empleado_nombre': empleado.nombre,
-                            'username': dni,
-                            'password': dni, # La contraseña es el DNI
-                            'login_url': login_url,
-                        })
-                        
-                        send_mail(asunto, '', settings.DEFAULT_FROM_EMAIL, [empleado.email], html_message=cuerpo_mensaje_html)
-                        logger.info(f"Correo de bienvenida enviado exitosamente a {empleado.email}")
+                        # El correo se guarda en la bandeja de salida y sale al confirmarse la transacción.
+                        # En su propio savepoint: si falla, no deja abortada la transacción del alta.
+                        with transaction.atomic():
+                            encolar_correo(empleado.email, asunto, plantilla='email/bienvenida_empleado.html', contexto={
+                                'empleado_nombre': empleado.nombre,
+                                'username': dni,
+                                'password': dni, # La contraseña es el DNI
+                                'login_url': login_url,
+                            }, tipo='bienvenida')
+                        logger.info(f"Correo de bienvenida encolado para {empleado.email}")
                     except Exception as e:
-                        logger.error(f"ERROR al enviar correo de bienvenida a {empleado.email}: {e}")
+                        logger.error(f"ERROR al encolar correo de bienvenida a {empleado.email}: {e}")
 
                 return empleado
         except Exception as e:
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api_nuevas_energias.cache import incrementar_version
+from api_nuevas_energias.tareas import encolar
+
+from .miniaturas import actualizar_miniaturas_empleado, borrar_miniaturas
+from .models import Empleado, RequisitoDocumento
+
+
+@receiver(post_save, sender=Empleado)
+def encolar_miniaturas_de_foto(sender, instance, **kwargs):
+    """
+    Al guardar un empleado con una foto nueva encola la generación de sus miniaturas; si
+    se le quitó la foto, descarta las miniaturas que tenía.
+    """
+    miniaturas = instance.miniaturas or {}
+    if instance.ruta_foto:
+        if miniaturas.get('origen') != instance.ruta_foto.name:
+            encolar(actualizar_miniaturas_empleado, instance.pk, instance.ruta_foto.name)
+    elif miniaturas:
+        Empleado.objects.filter(pk=instance.pk).update(miniaturas={})
+        instance.miniaturas = {}
+        encolar(borrar_miniaturas, miniaturas)
+
+
+@receiver(post_delete, sender=Empleado)
+def borrar_miniaturas_de_empleado_eliminado(sender, instance, **kwargs):
+    if instance.miniaturas:
+        encolar(borrar_miniaturas, instance.miniaturas)
+
+
+@receiver([post_save, post_delete], sender=Empleado)
+def empleado_modificado(sender, instance, **kwargs):
+    # Los catálogos que muestran empleados (los horarios con sus asignados) quedan obsoletos.
+    incrementar_version('empleados')
+
+
+@receiver([post_save, post_delete], sender=RequisitoDocumento)
+def requisitos_modificados(sender, instance, **kwargs):
+    incrementar_version('requisitos_documento')
@@ -1,3 +1,196 @@
-from django.test import TestCase
+import io
+import threading
+from datetime import date
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from .busqueda import buscar_empleados, normalizar
+from .importacion import importar_empleados
+from .models import Documento, Empleado, Legajo, RequisitoDocumento
+from .numeracion import reservar_nros_legajo
+
+
+class EmpleadoListadoConsultasTests(TestCase):
+    """
+    El listado de empleados debe costar la misma cantidad de consultas sin importar
+    cuántos empleados haya: usuario, grupos, legajo y documentos van precargados.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.grupo = Group.objects.create(name='Empleado')
+        cls.requisitos = [
+            RequisitoDocumento.objects.create(nombre_doc=f'Requisito {i}') for i in range(2)
+        ]
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def crear_empleados(self, cantidad):
+        inicio = Empleado.objects.count()
+        for i in range(inicio, inicio + cantidad):
+            user = User.objects.create_user(username=f'empleado{i}', password='x')
+            user.groups.add(self.grupo)
+            empleado = Empleado.objects.create(
+                user=user, nombre=f'Nombre {i}', apellido=f'Apellido {i}', dni=30000000 + i,
+                email=f'empleado{i}@example.com', fecha_nacimiento=date(1990, 1, 1),
+            )
+            legajo = Legajo.objects.create(id_empl=empleado, estado_leg='Pendiente', nro_leg=i + 1)
+            for requisito in self.requisitos:
+                Documento.objects.create(
+                    id_leg=legajo, id_requisito=requisito, ruta_archivo=f'legajos/documentos/{i}_{requisito.id}.pdf'
+                )
+
+    def test_cantidad_de_consultas_no_depende_de_las_filas(self):
+        # Empleados (con user y legajo por JOIN) + grupos + documentos.
+        consultas_esperadas = 3
+
+        self.crear_empleados(3)
+        with self.assertNumQueries(consultas_esperadas):
+            respuesta = self.client.get('/api/empleados/')
+        self.assertEqual(len(respuesta.data['results']), 3)
+
+        self.crear_empleados(12)
+        with self.assertNumQueries(consultas_esperadas):
+            respuesta = self.client.get('/api/empleados/')
+        self.assertEqual(len(respuesta.data['results']), 15)
+
+        empleado = respuesta.data['results'][0]
+        self.assertEqual(empleado['grupo'], 'Empleado')
+        self.assertEqual(len(empleado['legajo']['documento_set']), 2)
+
+
+class BusquedaEmpleadosTests(TestCase):
+    """Búsqueda para autocompletar: prefijos, acentos, DNI, email, errores de tipeo y límites."""
+
+    @classmethod
+    def setUpTestData(cls):
+        personas = [
+            ('María', 'López', 30111222), ('Mariano', 'Gómez', 30222333), ('José', 'Rodríguez', 30333444),
+            ('Ana', 'Fernández', 30444555), ('Juan', 'Pérez', 30555666), ('Juan', 'Pereyra', 30666777),
+            ('Marta', 'Sosa', 30777888),
+        ]
+        for nombre, apellido, dni in personas:
+            Empleado.objects.create(
+                user=User.objects.create_user(username=str(dni), password='x'),
+                nombre=nombre, apellido=apellido, dni=dni, email=f'{normalizar(nombre).lower()}.{dni}@example.com',
+                fecha_nacimiento=date(1990, 1, 1), estado='Inactivo' if apellido == 'Sosa' else 'Activo',
+            )
+        cls.usuario = User.objects.get(username='30111222')
+
+    def buscar(self, texto, limite=10):
+        return [f'{e.nombre} {e.apellido}' for e in buscar_empleados(Empleado.objects.filter(estado='Activo'), texto, limite)]
+
+    def test_prefijo_sin_mayusculas_ni_acentos(self):
+        self.assertEqual(self.buscar('lop'), ['María López'])
+        self.assertEqual(self.buscar('LÓPEZ'), ['María López'])
+        # Entre coincidencias por prefijo, el orden es por apellido: Gómez antes que López.
+        self.assertEqual(self.buscar('mari')[:2], ['Mariano Gómez', 'María López'])
+        self.assertEqual(self.buscar('jose'), ['José Rodríguez'])
+
+    def test_dni_y_email(self):
+        self.assertEqual(self.buscar('3011'), ['María López'])
+        self.assertEqual(len(self.buscar('30')), 6)
+        self.assertEqual(self.buscar('ana.3044'), ['Ana Fernández'])
+
+    def test_errores_de_tipeo(self):
+        self.assertEqual(self.buscar('rodrigez'), ['José Rodríguez'])
+        self.assertEqual(self.buscar('fernandes')[0], 'Ana Fernández')
+        self.assertEqual(self.buscar('jose rodrigez'), ['José Rodríguez'])
+        empleado = buscar_empleados(Empleado.objects.all(), 'rodrigez')[0]
+        self.assertLess(empleado.puntaje, 1)
+
+    def test_varias_palabras(self):
+        self.assertEqual(self.buscar('juan per'), ['Juan Pereyra', 'Juan Pérez'])
+        self.assertEqual(self.buscar('lopez maria'), ['María López'])
+        # Palabras cortas: las resuelve el rango del btree de la más larga.
+        self.assertEqual(self.buscar('j pe'), ['Juan Pereyra', 'Juan Pérez'])
+
+    def test_solo_activos_y_texto_vacio(self):
+        self.assertEqual(self.buscar('sosa'), [])
+        self.assertEqual(self.buscar('   '), [])
+
+    @override_settings(EMPLEADOS_BUSQUEDA_LIMITE=2, EMPLEADOS_BUSQUEDA_LIMITE_MAXIMO=3)
+    def test_endpoint(self):
+        cliente = APIClient()
+        cliente.force_authenticate(self.usuario)
+        ruta = '/api/empleados-basico/buscar/'
+
+        self.assertEqual(cliente.get(ruta).status_code, 400)
+        self.assertEqual(cliente.get(ruta, {'q': '  '}).status_code, 400)
+        self.assertEqual(cliente.get(ruta, {'q': 'juan', 'limite': 'diez'}).status_code, 400)
+
+        respuesta = cliente.get(ruta, {'q': 'lopez'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([fila['dni'] for fila in respuesta.data], [30111222])
+
+        # El límite por defecto, el máximo y el mínimo.
+        self.assertEqual(len(cliente.get(ruta, {'q': '30'}).data), 2)
+        self.assertEqual(len(cliente.get(ruta, {'q': '30', 'limite': 100}).data), 3)
+        self.assertEqual(len(cliente.get(ruta, {'q': '30', 'limite': 0}).data), 1)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], EMPLEADOS_IMPORTACION_LOTE=3)
+class NumeracionLegajosConcurrenteTests(TransactionTestCase):
+    """
+    Altas en paralelo (cada hilo con su propia conexión y transacción) no deben repetir
+    ni chocar en el nro_leg.
+    """
+    HILOS = 6
+
+    def setUp(self):
+        Group.objects.create(name='Empleado')
+        RequisitoDocumento.objects.create(nombre_doc='DNI')
+
+    def en_paralelo(self, funcion):
+        barrera = threading.Barrier(self.HILOS)
+        errores = []
+
+        def ejecutar(indice):
+            try:
+                barrera.wait()
+                funcion(indice)
+            except Exception as e:
+                errores.append(e)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=ejecutar, args=(indice,)) for indice in range(self.HILOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(errores, [])
+
+    def test_reservas_de_rangos_no_se_superponen(self):
+        reservas = []
+        self.en_paralelo(lambda indice: reservas.append(reservar_nros_legajo(25)))
+
+        numeros = [numero for reserva in reservas for numero in reserva]
+        self.assertEqual(len(numeros), self.HILOS * 25)
+        self.assertEqual(len(set(numeros)), len(numeros))
+
+    def test_importaciones_en_paralelo(self):
+        por_hilo = 7
+
+        def importar(indice):
+            filas = ['nombre,apellido,dni,email,fecha_nacimiento']
+            filas += [
+                f'Nombre,Apellido {indice}-{i},{40000000 + indice * 100 + i},e{indice}_{i}@example.com,1990-01-01'
+                for i in range(por_hilo)
+            ]
+            resumen = importar_empleados(io.BytesIO('\n'.join(filas).encode()), 'empleados.csv')
+            self.assertEqual(resumen['errores'], [])
+
+        self.en_paralelo(importar)
+
+        numeros = list(Legajo.objects.values_list('nro_leg', flat=True))
+        self.assertEqual(Empleado.objects.count(), self.HILOS * por_hilo)
+        self.assertEqual(len(numeros), self.HILOS * por_hilo)
+        self.assertEqual(len(set(numeros)), len(numeros))
+        self.assertEqual(Documento.objects.filter(estado_carga=Documento.PENDIENTE).count(), len(numeros))
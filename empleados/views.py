@@ -4,13 +4,22 @@ from rest_framework.response import Response
 from rest_framework import status
 import logging
 from .models import Empleado, Legajo, Documento, RequisitoDocumento
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from drf_spectacular.types import OpenApiTypes
 # from notificaciones.models import Notificacion
 from .serializer import EmpleadoSerializer, LegajoSerializer, DocumentoSerializer, RequisitoDocumentoSerializer, EmpleadoBasicoSerializer
+from .serializer import CompletitudLegajoSerializer
+from .serializer import optimizar_consulta_empleados
 from rest_framework.permissions import IsAuthenticated
 from .mixins import AdminWriteAccessMixin
+from api_nuevas_energias.condicional import CatalogoCondicionalMixin
 from .utils import get_client_ip
+from .importacion import FormatoInvalido, importar_empleados
+from .busqueda import buscar_empleados
+from .completitud import filtrar_completitud, legajos_con_completitud, resumen_completitud, totales_por_requisito
+from usuarios.roles import es_admin, es_admin_o_consultor, es_empleado
 from django.utils import timezone
+from django.conf import settings
 
 ##08329a51c848547c612642a5808e919f1513cd55031118e6685790909e946a57
 
@@ -25,11 +34,11 @@ class EmpleadoViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if user.is_superuser or user.groups.filter(name__in=['Administrador', 'Consultor']).exists():
-            return Empleado.objects.all()
-        if user.groups.filter(name='Empleado').exists():
+        if es_admin_o_consultor(user):
+            return optimizar_consulta_empleados(Empleado.objects.all())
+        if es_empleado(user):
             # Filtra para devolver solo el objeto Empleado asociado a este usuario.
-            return Empleado.objects.filter(user=user)
+            return optimizar_consulta_empleados(Empleado.objects.filter(user=user))
         return Empleado.objects.none() # No devuelve nada si no pertenece a un grupo válido
 
     def create(self, request, *args, **kwargs):
@@ -45,6 +54,36 @@ class EmpleadoViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
         empleado.save()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=['post'], url_path='importar')
+    def importar(self, request):
+        """
+        Alta masiva de empleados desde un CSV o XLSX (campo 'archivo'). Con parcial=true
+        se importan las filas válidas aunque otras tengan errores; con simular=true solo
+        se valida. Devuelve el resumen con los errores por fila.
+        """
+        self._check_admin_privileges(request)
+        archivo = request.FILES.get('archivo')
+        if not archivo:
+            return Response({'error': 'Se requiere el archivo a importar.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        client_ip = get_client_ip(request)
+        logger.info(f"Importación masiva de empleados ({archivo.name}) desde la IP: {client_ip}")
+        parcial = str(request.data.get('parcial', '')).lower() in ('1', 'true', 'si')
+        simular = str(request.data.get('simular', '')).lower() in ('1', 'true', 'si')
+        protocol = 'https' if request.is_secure() else 'http'
+        login_url = f"{protocol}://{request.get_host().split(':')[0]}/login"
+
+        try:
+            resumen = importar_empleados(archivo, archivo.name, parcial=parcial, simular=simular, login_url=login_url)
+        except FormatoInvalido as e:
+            return Response({'error': f'El archivo no tiene un formato válido: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if resumen['creados']:
+            return Response(resumen, status=status.HTTP_201_CREATED)
+        if resumen['errores']:
+            return Response(resumen, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resumen, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'], url_path='perfil')
     def perfil(self, request):
         """
@@ -67,6 +106,26 @@ class EmpleadoBasicoViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = EmpleadoBasicoSerializer
     permission_classes = [IsAuthenticated]
 
+    @action(detail=False, methods=['get'], url_path='buscar')
+    def buscar(self, request):
+        """
+        Búsqueda para autocompletar: ?q= con nombre, apellido, email o DNI (admite
+        prefijos y errores de tipeo) y ?limite= opcional. Devuelve los empleados activos
+        más parecidos, sin paginar.
+        """
+        texto = request.query_params.get('q', '').strip()
+        if not texto:
+            return Response({'error': 'Se requiere el parámetro q.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limite = int(request.query_params.get('limite', settings.EMPLEADOS_BUSQUEDA_LIMITE))
+        except ValueError:
+            return Response({'error': 'El límite debe ser un número entero.'}, status=status.HTTP_400_BAD_REQUEST)
+        limite = max(1, min(limite, settings.EMPLEADOS_BUSQUEDA_LIMITE_MAXIMO))
+
+        empleados = buscar_empleados(self.get_queryset(), texto, limite)
+        serializer = self.get_serializer(empleados, many=True)
+        return Response(serializer.data)
+
 
 @extend_schema(tags=['Empleados'])
 class LegajoViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
@@ -76,13 +135,67 @@ class LegajoViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if user.is_superuser or user.groups.filter(name__in=['Administrador', 'Empleado']).exists():
-            return Legajo.objects.all()
-        if user.groups.filter(name='Empleado').exists():
+        if es_admin_o_consultor(user):
+            return Legajo.objects.select_related('id_empl')
+        if es_empleado(user):
             # Filtra a través de la relación Empleado -> User
-            return Legajo.objects.filter(id_empl__id_usu=user)
+            return Legajo.objects.filter(id_empl__user=user).select_related('id_empl')
         return Legajo.objects.none()
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='estado', description="'completo' o 'incompleto'", required=False, type=OpenApiTypes.STR),
+            OpenApiParameter(name='minimo', description='Completitud mínima en porcentaje (inclusiva)', required=False, type=OpenApiTypes.FLOAT),
+            OpenApiParameter(name='maximo', description='Completitud máxima en porcentaje (inclusiva)', required=False, type=OpenApiTypes.FLOAT),
+            OpenApiParameter(name='falta', description='Id de un requisito: solo los legajos que no lo tienen cargado', required=False, type=OpenApiTypes.INT),
+            OpenApiParameter(name='estado_empleado', description="Estado del empleado (p. ej. 'Activo')", required=False, type=OpenApiTypes.STR),
+            OpenApiParameter(name='orden', description="'completitud' (por defecto, los menos completos primero) o '-completitud'", required=False, type=OpenApiTypes.STR),
+        ],
+        responses=CompletitudLegajoSerializer(many=True),
+    )
+    @action(detail=False, methods=['get'], url_path='completitud')
+    def completitud(self, request):
+        """
+        Tablero de completitud de legajos: por legajo, requisitos obligatorios, cargados,
+        porcentaje y requisitos faltantes, calculados en una sola consulta agregada.
+        Incluye el resumen de la empresa y los totales por requisito.
+        Solo Administradores y Consultores pueden acceder.
+        """
+        if not es_admin_o_consultor(request.user):
+            return Response({'error': 'No tiene permiso para ver este reporte.'}, status=status.HTTP_403_FORBIDDEN)
+
+        parametros = request.query_params
+        estado = parametros.get('estado')
+        if estado not in (None, '', 'completo', 'incompleto'):
+            return Response({'error': "El estado debe ser 'completo' o 'incompleto'."}, status=status.HTTP_400_BAD_REQUEST)
+        orden = parametros.get('orden', 'completitud')
+        if orden not in ('completitud', '-completitud'):
+            return Response({'error': "El orden debe ser 'completitud' o '-completitud'."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            minimo = float(parametros['minimo']) if parametros.get('minimo') else None
+            maximo = float(parametros['maximo']) if parametros.get('maximo') else None
+            falta = int(parametros['falta']) if parametros.get('falta') else None
+        except ValueError:
+            return Response({'error': 'El mínimo y el máximo deben ser números y falta el id de un requisito.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        legajos = filtrar_completitud(
+            legajos_con_completitud(), estado=estado, minimo=minimo, maximo=maximo,
+            falta=falta, estado_empleado=parametros.get('estado_empleado'),
+        )
+        # La clave de orden es única (completitud y id): el cursor no repite ni saltea legajos.
+        self.orden_cursor = ('orden_completitud',) if orden == 'completitud' else ('-orden_completitud',)
+        requisitos = totales_por_requisito()
+        contexto = {**self.get_serializer_context(), 'requisitos_obligatorios': [requisito['id'] for requisito in requisitos]}
+
+        pagina = self.paginate_queryset(legajos)
+        serializer = CompletitudLegajoSerializer(pagina if pagina is not None else legajos, many=True, context=contexto)
+        extra = {'resumen': resumen_completitud(), 'requisitos': requisitos}
+        if pagina is not None:
+            respuesta = self.get_paginated_response(serializer.data)
+            respuesta.data.update(extra)
+            return respuesta
+        return Response({'legajos': serializer.data, **extra})
+
 @extend_schema(tags=['Empleados'])
 class DocumentoViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
     queryset = Documento.objects.all()
@@ -91,11 +204,12 @@ class DocumentoViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if user.is_superuser or user.groups.filter(name__in=['Administrador', 'Empleado']).exists():
-            return Documento.objects.all()
-        if user.groups.filter(name='Empleado').exists():
+        # Las mismas reglas que la descarga de documentos (archivos/descargas.py).
+        if es_admin(user):
+            return Documento.objects.select_related('id_leg__id_empl')
+        if es_empleado(user):
             # Filtra a través de la relación Documento -> Legajo -> Empleado -> User
-            return Documento.objects.filter(id_legajo__id_empl__id_usu=user)
+            return Documento.objects.filter(id_leg__id_empl__user=user).select_related('id_leg__id_empl')
         return Documento.objects.none()
 
     @action(detail=True, methods=['post'], url_path='aprobar-documento')
@@ -122,7 +236,11 @@ class DocumentoViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
         return Response({'status': 'Documento aprobado y empleado notificado.'}, status=status.HTTP_200_OK)
 
 @extend_schema(tags=['Empleados'])
-class RequisitoDocumentoViewSet(viewsets.ReadOnlyModelViewSet):
+class RequisitoDocumentoViewSet(CatalogoCondicionalMixin, viewsets.ReadOnlyModelViewSet):
     queryset = RequisitoDocumento.objects.all()
     serializer_class = RequisitoDocumentoSerializer
-    permission_classes = [IsAuthenticated]
\ No newline at end of file
+    permission_classes = [IsAuthenticated]
+    # Catálogo chico: se devuelve completo, sin paginar.
+    pagination_class = None
+    claves_version = ('requisitos_documento',)
+    cache_publica = True
\ No newline at end of file
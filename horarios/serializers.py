@@ -15,9 +15,9 @@ class HorarioSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
     def get_empleados_asignados(self, obj):
-        # obj es la instancia de Horarios
-        asignaciones_activas = obj.asignaciones.filter(estado=True)
-        empleados = [asignacion.id_empl for asignacion in asignaciones_activas]
+        # obj es la instancia de Horarios. Filtramos en Python para aprovechar
+        # el prefetch de 'asignaciones__id_empl' que hacen las vistas.
+        empleados = [asignacion.id_empl for asignacion in obj.asignaciones.all() if asignacion.estado]
         return EmpleadoBasicoSerializer(empleados, many=True).data
 
 class AsignacionHorarioDetalleSerializer(serializers.Serializer):
@@ -2,24 +2,26 @@ from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.conf import settings
+from django.db import transaction
 import logging
 from .models import Horarios, AsignacionHorario
 from .serializers import HorarioSerializer, AsignacionHorarioSerializer, AsignacionHorarioDetalleSerializer
 from .serializers import AsignacionHorarioListSerializer
-from notificaciones.models import Notificacion
+from notificaciones.correos import encolar_correos
+from notificaciones.servicios import notificar
 from empleados.mixins import AdminWriteAccessMixin
+from api_nuevas_energias.condicional import CatalogoCondicionalMixin
 from .filters import AsignacionHorarioFilter
 from rest_framework.generics import ListAPIView
 from empleados.models import Empleado
+from api_nuevas_energias.cache import incrementar_version
+from empleados.serializer import optimizar_consulta_empleados
 
 logger = logging.getLogger(__name__)
 from drf_spectacular.utils import extend_schema
 
 @extend_schema(tags=['Horarios'])
-class HorarioViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet): # Renombrado de HorariosViewSet a HorarioViewSet para consistencia
+class HorarioViewSet(CatalogoCondicionalMixin, AdminWriteAccessMixin, viewsets.ModelViewSet): # Renombrado de HorariosViewSet a HorarioViewSet para consistencia
     """
     ViewSet para gestionar los Horarios (turnos de trabajo).
 
@@ -31,6 +33,11 @@ class HorarioViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet): # Renombrado
     queryset = Horarios.objects.prefetch_related('asignaciones__id_empl').all()
     serializer_class = HorarioSerializer
     permission_classes = [IsAuthenticated]
+    # Catálogo chico: se devuelve completo, sin paginar.
+    pagination_class = None
+    # Muestra los empleados asignados: depende también de sus datos, y por tenerlos no
+    # se deja en caches compartidos.
+    claves_version = ('horarios', 'empleados')
 
     @action(detail=True, methods=['post'], url_path='sincronizar-empleados')
     def sincronizar_empleados(self, request, pk=None):
@@ -67,6 +74,8 @@ class HorarioViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet): # Renombrado
                 id_empl_id__in=ids_a_desasignar,
                 estado=True
             ).update(estado=False)
+            # update() no dispara señales: invalidamos a mano los cálculos que dependen de los horarios.
+            incrementar_version('horarios')
             # Aquí podrías agregar lógica para notificar la desasignación si es necesario.
 
         # 3. Identificar empleados a asignar
@@ -109,17 +118,26 @@ class AsignacionHorarioViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
     serializer_class = AsignacionHorarioSerializer
     permission_classes = [IsAuthenticated]
     filterset_class = AsignacionHorarioFilter
+    # El listado se pagina por horario (ver list()).
+    orden_cursor = 'id'
 
     def list(self, request, *args, **kwargs):
         """
         Sobrescribe el método list para devolver los empleados agrupados por horario.
+        La paginación es por horario: cada página trae sus horarios completos.
         """
         # Obtenemos el queryset filtrado (por ejemplo, si se usa ?id_horario=1)
-        queryset = self.filter_queryset(self.get_queryset())
+        queryset = self.filter_queryset(self.get_queryset()).filter(estado=True)
+
+        horarios = Horarios.objects.filter(id__in=queryset.values('id_horario'))
+        pagina = self.paginate_queryset(horarios)
+        if pagina is not None:
+            queryset = queryset.filter(id_horario__in=[horario.id for horario in pagina])
 
         # Agrupamos los empleados por horario
         horarios_agrupados = {}
-        for asignacion in queryset.filter(estado=True):
+        queryset = optimizar_consulta_empleados(queryset, 'id_empl').prefetch_related('id_horario__asignaciones__id_empl')
+        for asignacion in queryset.order_by('id_horario_id', 'id'):
             horario = asignacion.id_horario
             if horario.id not in horarios_agrupados:
                 horarios_agrupados[horario.id] = {
@@ -132,9 +150,12 @@ class AsignacionHorarioViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
         data_para_serializar = list(horarios_agrupados.values())
         serializer = AsignacionHorarioDetalleSerializer(data_para_serializar, many=True)
 
+        if pagina is not None:
+            return self.get_paginated_response(serializer.data)
         return Response(serializer.data)
 
 
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         """
         Sobrescribe el método de creación para manejar la asignación de múltiples empleados.
@@ -151,47 +172,45 @@ class AsignacionHorarioViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
             asignacion = AsignacionHorario.objects.create(id_horario=horario, id_empl=empleado)
             asignaciones_creadas.append(asignacion)
 
-            # 2. Creamos la notificación para el empleado
-            Notificacion.objects.create(
-                id_user=empleado.user,
-                mensaje=f"Se te ha asignado un nuevo horario: {horario.nombre}.",
-                enlace="/horarios/mis-horarios/"
-            )
-
-            # 3. Enviar correo electrónico de notificación
-            if empleado.email:
-                try:
-                    logger.info(f"Intentando enviar correo de horario a: {empleado.email}")
-                    
-                    # Construir la URL absoluta para el portal
-                    host = request.get_host()
-                    protocol = 'https' if request.is_secure() else 'http'
-                    portal_url = f"{protocol}://{host.split(':')[0]}/horarios/mis-horarios/" # Ajusta esta URL si es necesario
-
-                    asunto = f"Asignación de nuevo horario: {horario.nombre}"
-                    
-                    dias = []
-                    if horario.lunes: dias.append('Lunes')
-                    if horario.martes: dias.append('Martes')
-                    if horario.miercoles: dias.append('Miércoles')
-                    if horario.jueves: dias.append('Jueves')
-                    if horario.viernes: dias.append('Viernes')
-                    if horario.sabado: dias.append('Sábado')
-                    if horario.domingo: dias.append('Domingo')
-                    dias_laborables = ", ".join(dias)
-
-                    # Renderizar el template HTML
-                    cuerpo_mensaje_html = render_to_string('email/notificacion_horario.html', {
-                        'empleado_nombre': empleado.nombre,
-                        'horario': horario,
-                        'dias_laborables': dias_laborables,
-                        'portal_url': portal_url,
-                    })
-                    send_mail(asunto, '', settings.DEFAULT_FROM_EMAIL, [empleado.email], html_message=cuerpo_mensaje_html)
-                    logger.info(f"Correo de horario enviado exitosamente a {empleado.email}")
-                except Exception as e:
-                    logger.error(f"ERROR al enviar correo de horario a {empleado.email}: {e}")
-            
+        # 2. Creamos las notificaciones de todos los empleados con un solo INSERT
+        notificar(
+            empleados, "Se te ha asignado un nuevo horario: {horario}.",
+            enlace="/horarios/mis-horarios/", horario=horario.nombre,
+        )
+
+        # 3. Encolar los correos electrónicos de notificación, también con un solo INSERT
+        # Construir la URL absoluta para el portal
+        host = request.get_host()
+        protocol = 'https' if request.is_secure() else 'http'
+        portal_url = f"{protocol}://{host.split(':')[0]}/horarios/mis-horarios/" # Ajusta esta URL si es necesario
+
+        dias = []
+        if horario.lunes: dias.append('Lunes')
+        if horario.martes: dias.append('Martes')
+        if horario.miercoles: dias.append('Miércoles')
+        if horario.jueves: dias.append('Jueves')
+        if horario.viernes: dias.append('Viernes')
+        if horario.sabado: dias.append('Sábado')
+        if horario.domingo: dias.append('Domingo')
+        dias_laborables = ", ".join(dias)
+
+        encolados = encolar_correos([
+            {
+                'destinatario': empleado.email,
+                'asunto': f"Asignación de nuevo horario: {horario.nombre}",
+                'plantilla': 'email/notificacion_horario.html',
+                'contexto': {
+                    'empleado_nombre': empleado.nombre,
+                    'horario': horario,
+                    'dias_laborables': dias_laborables,
+                    'portal_url': portal_url,
+                },
+                'tipo': 'horario',
+            }
+            for empleado in empleados
+        ])
+        logger.info(f"Correos de horario encolados: {encolados}")
+
         # Serializamos la lista de asignaciones creadas para la respuesta
         response_serializer = self.get_serializer(asignaciones_creadas, many=True)
         headers = self.get_success_headers(serializer.data)
@@ -236,6 +255,11 @@ class MisHorariosView(ListAPIView):
         if not queryset.exists():
             return Response({"detail": "No tienes horarios asignados."}, status=status.HTTP_200_OK)
         
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
@@ -248,10 +272,13 @@ class AsignacionHorarioListView(ListAPIView):
     """
     serializer_class = AsignacionHorarioListSerializer
     permission_classes = [IsAuthenticated]
+    # Orden de alta: el cursor es la clave primaria, así cada página usa su índice en
+    # lugar de ordenar la tabla entera.
+    orden_cursor = 'id'
 
     def get_queryset(self):
         """
         Devuelve todas las asignaciones, optimizando la consulta
         para incluir los datos relacionados del horario y del empleado.
         """
-        return AsignacionHorario.objects.all().select_related('id_horario', 'id_empl').order_by('id_horario__nombre', 'id_empl__apellido')
+        return AsignacionHorario.objects.all().select_related('id_horario', 'id_empl')
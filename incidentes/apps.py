@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class IncidentesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'incidentes'
+
+    def ready(self):
+        # Registra los receptores de señales de la app.
+        from . import signals  # noqa: F401
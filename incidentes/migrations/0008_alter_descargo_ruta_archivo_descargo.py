@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:28
+
+import archivos.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidentes', '0007_incidenteempleado_grupo_anterior'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='descargo',
+            name='ruta_archivo_descargo',
+            field=models.FileField(blank=True, null=True, storage=archivos.storage.AlmacenamientoDeduplicado(), upload_to='descargos/'),
+        ),
+    ]
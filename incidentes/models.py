@@ -3,6 +3,9 @@ from empleados.models import Empleado
 from django.conf import settings
 import uuid
 from django.utils import timezone
+from django.utils.functional import cached_property
+
+from archivos.storage import almacenamiento_deduplicado
 
 # INCIDENTES
 class Incidente(models.Model):
@@ -18,7 +21,7 @@ class Descargo(models.Model):
     autor = models.ForeignKey(Empleado, on_delete=models.SET_NULL, null=True, blank=True)
     fecha_descargo = models.DateTimeField(default=timezone.now)
     contenido_descargo = models.CharField(max_length=255)
-    ruta_archivo_descargo = models.FileField(upload_to='descargos/', blank=True, null=True)
+    ruta_archivo_descargo = models.FileField(upload_to='descargos/', storage=almacenamiento_deduplicado, blank=True, null=True)
     estado = models.BooleanField(default=True)
 
     def __str__(self):
@@ -65,3 +68,9 @@ class Resolucion(models.Model):
         
     def get_incidentes_asociados(self):
         return IncidenteEmpleado.objects.filter(grupo_incidente=self.grupo_incidente)
+
+    @cached_property
+    def incidentes_del_grupo(self):
+        # Los listados lo completan para toda la página de una vez
+        # (ResolucionSerializer.precargar_incidentes_asociados).
+        return list(self.get_incidentes_asociados().order_by('id'))
@@ -1,13 +1,14 @@
 from empleados.models import Empleado
 from rest_framework import serializers
 import uuid
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.conf import settings
+from django.db import transaction
 import logging
-from notificaciones.models import Notificacion
+from collections import defaultdict
+from notificaciones.correos import encolar_correos
+from notificaciones.servicios import notificar
 from .models import Incidente, IncidenteEmpleado, Descargo, Resolucion
-from empleados.serializer import EmpleadoSerializer
+from empleados.serializer import EmpleadoSerializer, optimizar_consulta_empleados
+from api_nuevas_energias.expansion import CampoExpandible, SerializerExpandibleMixin, campos_pedidos, expansiones_pedidas
 
 class EmpleadoBasicoSerializer(serializers.ModelSerializer):
     """Serializer básico para mostrar solo información esencial del empleado."""
@@ -29,19 +30,22 @@ class DescargoGrupoSerializer(serializers.ModelSerializer):
         model = Descargo
         fields = ['id', 'autor', 'fecha_descargo', 'contenido_descargo']
 
-class DescargoSerializer(serializers.ModelSerializer):
-    autor = EmpleadoSerializer(read_only=True)
+class DescargoSerializer(SerializerExpandibleMixin, serializers.ModelSerializer):
+    # Autor resumido; completo con ?expand=autor.
+    autor = CampoExpandible(EmpleadoSerializer, compacto=EmpleadoBasicoSerializer, precargar=optimizar_consulta_empleados)
     class Meta:
         model = Descargo
         fields = ['id', 'id_incid_empl', 'autor', 'fecha_descargo', 'contenido_descargo', 'ruta_archivo_descargo', 'estado']
         read_only_fields = ('fecha_descargo', 'autor')
 
-class IncidenteEmpleadoSerializer(serializers.ModelSerializer):
-    # Usamos representaciones de solo lectura para las relaciones anidadas
+class IncidenteEmpleadoSerializer(SerializerExpandibleMixin, serializers.ModelSerializer):
+    # Usamos representaciones de solo lectura para las relaciones anidadas.
+    # Por defecto los empleados van resumidos y los descargos como ids; se piden completos
+    # con ?expand=id_empl,responsable_registro,descargos (o descargos.autor).
     id_incidente = IncidenteSerializer(read_only=True)
-    id_empl = EmpleadoSerializer(read_only=True)
-    responsable_registro = EmpleadoBasicoSerializer(read_only=True)
-    descargos = DescargoSerializer(many=True, read_only=True)
+    id_empl = CampoExpandible(EmpleadoSerializer, compacto=EmpleadoBasicoSerializer, precargar=optimizar_consulta_empleados)
+    responsable_registro = CampoExpandible(EmpleadoSerializer, compacto=EmpleadoBasicoSerializer, precargar=optimizar_consulta_empleados)
+    descargos = CampoExpandible(DescargoSerializer, many=True)
 
     # Campos de solo escritura para la creación y actualización
     incidente_id = serializers.PrimaryKeyRelatedField(
@@ -69,6 +73,7 @@ class IncidenteEmpleadoSerializer(serializers.ModelSerializer):
         # No es necesario hacer pop de 'empleado_ids' porque no está en el modelo y no se incluirá por defecto.
         return ret
 
+    @transaction.atomic
     def create(self, validated_data):
         """
         Crea múltiples instancias de IncidenteEmpleado, una para cada empleado_id.
@@ -107,48 +112,47 @@ class IncidenteEmpleadoSerializer(serializers.ModelSerializer):
             )
             incidentes_creados.append(incidente_empleado)
 
-            # 2. Creamos la notificación para el empleado involucrado
-            enlace_incidente = f"/incidentes/detalle/{grupo_id}/"
-            mensaje = f"Has sido involucrado en un nuevo incidente: {incidente.tipo_incid}."
-            Notificacion.objects.create(
-                id_user=empleado.user,
-                mensaje=mensaje,
-                enlace=enlace_incidente
-            )
+        # 2. Creamos las notificaciones de los empleados involucrados con un solo INSERT
+        enlace_incidente = f"/incidentes/detalle/{grupo_id}/"
+        notificar(
+            empleados, "Has sido involucrado en un nuevo incidente: {tipo}.",
+            enlace=enlace_incidente, tipo=incidente.tipo_incid,
+        )
+
+        # 3. Encolar los correos electrónicos de notificación, también con un solo INSERT
+        if request:
+            host = request.get_host()
+            protocol = 'https' if request.is_secure() else 'http'
+            detalle_url = f"{protocol}://{host.split(':')[0]}{enlace_incidente}"
+        else:
+            detalle_url = "Por favor, accede al portal para ver los detalles."
+
+        encolados = encolar_correos([
+            {
+                'destinatario': empleado.email,
+                'asunto': f"Notificación de Incidente: {incidente.tipo_incid}",
+                'plantilla': 'email/notificacion_incidente.html',
+                'contexto': {
+                    'empleado_nombre': empleado.nombre,
+                    'incidente_tipo': incidente.tipo_incid,
+                    'fecha_ocurrencia': fecha_ocurrencia.strftime('%d/%m/%Y'),
+                    'descripcion': descripcion,
+                    'detalle_url': detalle_url,
+                },
+                'tipo': 'incidente',
+            }
+            for empleado in empleados
+        ])
+        logger.info(f"Correos de incidente encolados: {encolados}")
 
-            # 3. Enviar correo electrónico de notificación
-            if empleado.email:
-                try:
-                    logger.info(f"Intentando enviar correo de incidente a: {empleado.email}")
-                    request = self.context.get('request')
-                    if request:
-                        host = request.get_host()
-                        protocol = 'https' if request.is_secure() else 'http'
-                        detalle_url = f"{protocol}://{host.split(':')[0]}{enlace_incidente}"
-                    else:
-                        detalle_url = "Por favor, accede al portal para ver los detalles."
-
-                    asunto = f"Notificación de Incidente: {incidente.tipo_incid}"
-
-                    # Renderizar el template HTML
-                    cuerpo_mensaje_html = render_to_string('email/notificacion_incidente.html', {
-                        'empleado_nombre': empleado.nombre,
-                        'incidente_tipo': incidente.tipo_incid,
-                        'fecha_ocurrencia': fecha_ocurrencia.strftime('%d/%m/%Y'),
-                        'descripcion': descripcion,
-                        'detalle_url': detalle_url,
-                    })
-                    send_mail(asunto, '', settings.DEFAULT_FROM_EMAIL, [empleado.email], html_message=cuerpo_mensaje_html)
-                    logger.info(f"Correo de incidente enviado exitosamente a {empleado.email}")
-                except Exception as e:
-                    logger.error(f"ERROR al enviar correo de incidente a {empleado.email}: {e}")
-        
         # Devolvemos la primera instancia creada como representación, o podrías devolver una lista.
         return incidentes_creados[0]
 
-class ResolucionSerializer(serializers.ModelSerializer):
-    responsable = EmpleadoSerializer(read_only=True)
-    incidentes_asociados = IncidenteEmpleadoSerializer(many=True, read_only=True, source='get_incidentes_asociados')
+class ResolucionSerializer(SerializerExpandibleMixin, serializers.ModelSerializer):
+    responsable = CampoExpandible(EmpleadoSerializer, compacto=EmpleadoBasicoSerializer, precargar=optimizar_consulta_empleados)
+    # Ids de los incidentes del grupo; completos con ?expand=incidentes_asociados. En los
+    # listados los carga precargar_incidentes_asociados para toda la página.
+    incidentes_asociados = CampoExpandible(IncidenteEmpleadoSerializer, many=True, source='incidentes_del_grupo')
 
     class Meta:
         model = Resolucion
@@ -161,6 +165,31 @@ class ResolucionSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ('fecha_resolucion', 'responsable')
 
+    @classmethod
+    def precargar_incidentes_asociados(cls, resoluciones, request=None):
+        """
+        Carga con una sola consulta los incidentes de los grupos de `resoluciones` y los
+        deja en cada una. Como no es una relación del modelo, optimizar_consulta no puede
+        precargarlos: sin esto cada resolución hace su propia consulta.
+        """
+        campos = campos_pedidos(request)
+        if not resoluciones or (campos is not None and 'incidentes_asociados' not in campos):
+            return
+        expandir = expansiones_pedidas(request).get('incidentes_asociados')
+        incidentes = IncidenteEmpleado.objects.filter(
+            grupo_incidente__in={resolucion.grupo_incidente for resolucion in resoluciones}
+        ).order_by('id')
+        if expandir is None:
+            incidentes = incidentes.only('id', 'grupo_incidente')
+        else:
+            incidentes = IncidenteEmpleadoSerializer.optimizar_consulta(incidentes.select_related('id_incidente'), expandir=expandir)
+        por_grupo = defaultdict(list)
+        for incidente in incidentes:
+            por_grupo[incidente.grupo_incidente].append(incidente)
+        for resolucion in resoluciones:
+            resolucion.incidentes_del_grupo = por_grupo[resolucion.grupo_incidente]
+
+    @transaction.atomic
     def create(self, validated_data):
         """
         Al crear una resolución, se actualiza el estado del IncidenteEmpleado a 'CERRADO'.
@@ -172,18 +201,18 @@ class ResolucionSerializer(serializers.ModelSerializer):
         # 2. Obtenemos el grupo de incidentes para buscar a los empleados.
         grupo_id = validated_data.get('grupo_incidente')
 
-        # 3. Buscamos todos los empleados involucrados en este grupo de incidentes.
-        # Usamos select_related para optimizar la consulta y traer el usuario asociado.
-        incidentes_del_grupo = IncidenteEmpleado.objects.filter(grupo_incidente=grupo_id).select_related('id_empl__user')
-        
-        # 4. Enviamos una notificación a cada empleado.
-        for incidente_empleado in incidentes_del_grupo:
-            empleado = incidente_empleado.id_empl
-            mensaje = f"El incidente '{incidente_empleado.id_incidente.tipo_incid}' ha sido resuelto."
-            Notificacion.objects.create(
-                id_user=empleado.user,
-                mensaje=mensaje,
-                enlace=f"/incidentes/detalle/{grupo_id}/"
+        # 3. Notificamos a todos los empleados involucrados en este grupo de incidentes con un
+        #    solo INSERT. Todas las filas del grupo son del mismo incidente.
+        involucrados = list(
+            IncidenteEmpleado.objects.filter(grupo_incidente=grupo_id)
+            .values_list('id_empl__user_id', 'id_incidente__tipo_incid')
+        )
+        if involucrados:
+            notificar(
+                [id_user for id_user, _ in involucrados],
+                "El incidente '{tipo}' ha sido resuelto.",
+                enlace=f"/incidentes/detalle/{grupo_id}/",
+                tipo=involucrados[0][1],
             )
 
         return resolucion
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api_nuevas_energias.cache import incrementar_version
+from .models import Incidente
+
+
+@receiver([post_save, post_delete], sender=Incidente)
+def catalogo_modificado(sender, instance, **kwargs):
+    # Invalida las respuestas condicionales del catálogo (ver CatalogoCondicionalMixin).
+    incrementar_version('incidentes')
@@ -1,3 +1,80 @@
+import uuid
+from datetime import date
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from empleados.models import Empleado
+
+from .models import Descargo, Incidente, IncidenteEmpleado, Resolucion
+
+
+class ResolucionListadoConsultasTests(TestCase):
+    """
+    El listado de resoluciones cuesta las mismas consultas sin importar cuántas haya,
+    también con los incidentes del grupo expandidos.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        cls.incidente = Incidente.objects.create(tipo_incid='Llegada tarde', descripcion_incid='Más de 15 minutos')
+        cls.empleados = [
+            Empleado.objects.create(
+                user=User.objects.create_user(username=f'empleado{i}', password='x'),
+                nombre=f'Nombre {i}', apellido=f'Apellido {i}', dni=30000000 + i,
+                email=f'empleado{i}@example.com', fecha_nacimiento=date(1990, 1, 1),
+            )
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def crear_resoluciones(self, cantidad):
+        for _ in range(cantidad):
+            grupo = uuid.uuid4()
+            for empleado in self.empleados:
+                incidente = IncidenteEmpleado.objects.create(
+                    grupo_incidente=grupo, id_incidente=self.incidente, id_empl=empleado,
+                    fecha_ocurrencia=date(2026, 3, 2), responsable_registro=self.empleados[0],
+                )
+                Descargo.objects.create(id_incid_empl=incidente, autor=empleado, contenido_descargo='Hubo un corte de ruta')
+            Resolucion.objects.create(grupo_incidente=grupo, descripcion='Se aplica apercibimiento', responsable=self.empleados[0])
+
+    def test_cantidad_de_consultas_no_depende_de_las_filas(self):
+        # Resoluciones (con el responsable por JOIN) + incidentes de la página.
+        # Expandidos, además los descargos de esos incidentes.
+        casos = [('/api/resoluciones/', 2), ('/api/resoluciones/?expand=incidentes_asociados', 3)]
+
+        self.crear_resoluciones(2)
+        for ruta, consultas in casos:
+            with self.assertNumQueries(consultas):
+                respuesta = self.client.get(ruta)
+            self.assertEqual(len(respuesta.data['results']), 2)
+
+        self.crear_resoluciones(4)
+        for ruta, consultas in casos:
+            with self.assertNumQueries(consultas):
+                respuesta = self.client.get(ruta)
+            self.assertEqual(len(respuesta.data['results']), 6)
+
+        compacta, expandida = (self.client.get(ruta).data['results'][0] for ruta, _ in casos)
+        self.assertEqual(len(compacta['incidentes_asociados']), 2)
+        self.assertIsInstance(compacta['incidentes_asociados'][0], int)
+        self.assertEqual(
+            [incidente['id'] for incidente in expandida['incidentes_asociados']], compacta['incidentes_asociados'],
+        )
+        self.assertEqual(expandida['incidentes_asociados'][0]['id_incidente']['tipo_incid'], 'Llegada tarde')
+        self.assertEqual(len(expandida['incidentes_asociados'][0]['descargos']), 1)
 
-# Create your tests here.
+    def test_detalle(self):
+        self.crear_resoluciones(1)
+        resolucion = Resolucion.objects.get()
+        respuesta = self.client.get(f'/api/resoluciones/{resolucion.pk}/')
+        self.assertEqual(
+            respuesta.data['incidentes_asociados'],
+            list(IncidenteEmpleado.objects.order_by('id').values_list('id', flat=True)),
+        )
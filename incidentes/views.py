@@ -5,16 +5,30 @@ from .serializers import IncidenteSerializer, IncidenteEmpleadoSerializer, Desca
 from rest_framework.permissions import IsAuthenticated
 from drf_spectacular.utils import extend_schema
 from empleados.mixins import AdminWriteAccessMixin
+from api_nuevas_energias.condicional import CatalogoCondicionalMixin
+from usuarios.roles import es_admin, es_empleado
 from rest_framework.decorators import action
 from django.db import transaction
+from django.db.models import Min
 import uuid
 from rest_framework.views import APIView
 
+def optimizar_incidentes_empleado(queryset, request=None):
+    """
+    Precarga lo que serializa IncidenteEmpleadoSerializer: el incidente y, resumidas o
+    completas según ?expand=, las relaciones expandibles (empleado, responsable, descargos).
+    """
+    return IncidenteEmpleadoSerializer.optimizar_consulta(queryset.select_related('id_incidente'), request)
+
 @extend_schema(tags=['Incidentes'])
-class IncidenteViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
+class IncidenteViewSet(CatalogoCondicionalMixin, AdminWriteAccessMixin, viewsets.ModelViewSet):
     queryset = Incidente.objects.filter(estado_incid=True)
     serializer_class = IncidenteSerializer
     permission_classes = [IsAuthenticated]
+    # Catálogo chico: se devuelve completo, sin paginar.
+    pagination_class = None
+    claves_version = ('incidentes',)
+    cache_publica = True
 
 @extend_schema(tags=['Incidentes'])
 class IncidenteEmpleadoViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
@@ -24,13 +38,13 @@ class IncidenteEmpleadoViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if user.is_superuser or user.groups.filter(name='Administrador').exists():
-            return IncidenteEmpleado.objects.all()
+        if es_admin(user):
+            return optimizar_incidentes_empleado(IncidenteEmpleado.objects.all(), self.request)
         
-        if user.groups.filter(name='Empleado').exists():
+        if es_empleado(user):
             try:
                 empleado = Empleado.objects.get(user=user)
-                return IncidenteEmpleado.objects.filter(id_empl=empleado)
+                return optimizar_incidentes_empleado(IncidenteEmpleado.objects.filter(id_empl=empleado), self.request)
             except Empleado.DoesNotExist:
                 return IncidenteEmpleado.objects.none()
         
@@ -53,11 +67,11 @@ class DescargoViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if user.is_superuser or user.groups.filter(name='Administrador').exists():
-            return Descargo.objects.all()
+        if es_admin(user):
+            return DescargoSerializer.optimizar_consulta(Descargo.objects.all(), self.request)
         
-        if user.groups.filter(name='Empleado').exists():
-            return Descargo.objects.filter(id_incid_empl__id_empl__user=user)
+        if es_empleado(user):
+            return DescargoSerializer.optimizar_consulta(Descargo.objects.filter(id_incid_empl__id_empl__user=user), self.request)
         
         return Descargo.objects.none()
 
@@ -67,6 +81,21 @@ class ResolucionViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
     serializer_class = ResolucionSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_queryset(self):
+        return ResolucionSerializer.optimizar_consulta(super().get_queryset(), self.request)
+
+    def paginate_queryset(self, queryset):
+        # Los incidentes de toda la página, en una consulta.
+        pagina = super().paginate_queryset(queryset)
+        if pagina is not None:
+            ResolucionSerializer.precargar_incidentes_asociados(pagina, self.request)
+        return pagina
+
+    def get_object(self):
+        resolucion = super().get_object()
+        ResolucionSerializer.precargar_incidentes_asociados([resolucion], self.request)
+        return resolucion
+
     def perform_create(self, serializer):
         try:
             # Buscamos el empleado asociado al usuario que está haciendo la petición
@@ -86,6 +115,8 @@ class GrupoIncidenteViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, vi
     queryset = IncidenteEmpleado.objects.all()
     permission_classes = [IsAuthenticated]
     lookup_field = 'grupo_incidente' # Usamos el UUID para buscar
+    # El listado se pagina por grupo, usando el primer registro de cada grupo como cursor (ver list()).
+    orden_cursor = ('-primer_id',)
 
     def get_serializer_class(self):
         """
@@ -96,8 +127,14 @@ class GrupoIncidenteViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, vi
         return GrupoIncidenteDetalleSerializer
 
     def list(self, request, *args, **kwargs):
+        # Paginamos los grupos (no los registros) para no cortar un grupo entre dos páginas.
+        grupos_ids = self.get_queryset().values('grupo_incidente').annotate(primer_id=Min('id'))
+        pagina = self.paginate_queryset(grupos_ids)
+
         # Obtenemos todos los incidentes y optimizamos las consultas
         queryset = self.get_queryset().select_related('id_incidente', 'id_empl').prefetch_related('descargos__autor')
+        if pagina is not None:
+            queryset = queryset.filter(grupo_incidente__in=[grupo['grupo_incidente'] for grupo in pagina])
         
         # Agrupamos los incidentes por 'grupo_incidente'
         grupos = {}
@@ -122,8 +159,14 @@ class GrupoIncidenteViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, vi
 
         # Convertimos el diccionario de grupos a una lista para el serializer
         lista_agrupada = list(grupos.values())
+        if pagina is not None:
+            # Respetamos el orden de la página.
+            orden = {str(grupo['grupo_incidente']): posicion for posicion, grupo in enumerate(pagina)}
+            lista_agrupada.sort(key=lambda grupo: orden[str(grupo['grupo_incidente'])])
         
         serializer = self.get_serializer(lista_agrupada, many=True)
+        if pagina is not None:
+            return self.get_paginated_response(serializer.data)
         return Response(serializer.data)
 
     def retrieve(self, request, *args, **kwargs):
@@ -251,6 +294,6 @@ class MisIncidentesView(generics.ListAPIView):
         user = self.request.user
         try:
             empleado = Empleado.objects.get(user=user)
-            return IncidenteEmpleado.objects.filter(id_empl=empleado)
+            return optimizar_incidentes_empleado(IncidenteEmpleado.objects.filter(id_empl=empleado), self.request)
         except Empleado.DoesNotExist:
             return IncidenteEmpleado.objects.none()
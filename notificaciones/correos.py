@@ -0,0 +1,218 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Count, F, Max, Min
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from api_nuevas_energias.tareas import encolar
+
+from .models import CorreoSaliente
+
+logger = logging.getLogger(__name__)
+
+
+def _correo(destinatario, asunto, plantilla=None, contexto=None, texto='', tipo=''):
+    return CorreoSaliente(
+        tipo=tipo,
+        destinatario=destinatario,
+        asunto=asunto[:255],
+        cuerpo_texto=texto,
+        cuerpo_html=render_to_string(plantilla, contexto or {}) if plantilla else '',
+    )
+
+
+def encolar_correo(destinatario, asunto, plantilla=None, contexto=None, texto='', tipo=''):
+    """
+    Guarda el correo en la bandeja de salida, dentro de la transacción en curso: si la
+    transacción se revierte el correo no sale. El HTML se arma ya con `plantilla` y
+    `contexto`. Devuelve el CorreoSaliente, o None si no hay destinatario.
+    """
+    if not destinatario:
+        return None
+    correo = _correo(destinatario, asunto, plantilla, contexto, texto, tipo)
+    correo.save()
+    _avisar_envio()
+    return correo
+
+
+def encolar_correos(correos):
+    """
+    Como encolar_correo para varios correos a la vez, con un solo INSERT. `correos` es una
+    lista de dicts con los argumentos de encolar_correo. Devuelve cuántos se encolaron.
+    """
+    creados = CorreoSaliente.objects.bulk_create([
+        _correo(**datos) for datos in correos if datos.get('destinatario')
+    ])
+    if creados:
+        _avisar_envio()
+    return len(creados)
+
+
+def _avisar_envio():
+    # Un envío en segundo plano apenas se confirma la transacción, para que los correos
+    # no esperen a la próxima pasada del comando; los reintentos quedan para el comando.
+    if getattr(settings, 'CORREOS_ENVIO_INMEDIATO', True):
+        encolar(enviar_pendientes)
+
+
+def espera_reintento(intentos):
+    """Espera antes del próximo intento: crece al doble con cada intento fallido, con tope."""
+    base = getattr(settings, 'CORREOS_ESPERA_BASE', 60)
+    maxima = getattr(settings, 'CORREOS_ESPERA_MAXIMA', 3600)
+    return timedelta(seconds=min(base * 2 ** max(intentos - 1, 0), maxima))
+
+
+def _reservar(lote):
+    """
+    Toma hasta `lote` correos pendientes cuyo intento ya llegó y los aparta durante
+    CORREOS_TIEMPO_RESERVA: otro proceso que envíe a la vez no los toma (SKIP LOCKED) y,
+    si este proceso muere a mitad del envío, vuelven a quedar disponibles.
+    """
+    ahora = timezone.now()
+    reserva = timedelta(seconds=getattr(settings, 'CORREOS_TIEMPO_RESERVA', 300))
+    with transaction.atomic():
+        correos = list(
+            CorreoSaliente.objects.select_for_update(skip_locked=True)
+            .filter(estado=CorreoSaliente.PENDIENTE, proximo_intento__lte=ahora)
+            .order_by('proximo_intento', 'id')[:lote]
+        )
+        if correos:
+            CorreoSaliente.objects.filter(pk__in=[correo.pk for correo in correos]).update(
+                intentos=F('intentos') + 1, proximo_intento=ahora + reserva,
+            )
+    for correo in correos:
+        correo.intentos += 1
+    return correos
+
+
+def _devolver(correos, error):
+    # No se llegó a intentar el envío: vuelven a la cola sin gastar el intento.
+    CorreoSaliente.objects.filter(pk__in=[correo.pk for correo in correos]).update(
+        intentos=F('intentos') - 1, proximo_intento=timezone.now() + espera_reintento(1), ultimo_error=str(error),
+    )
+
+
+def _mensaje(correo, conexion):
+    mensaje = EmailMultiAlternatives(
+        correo.asunto, correo.cuerpo_texto, settings.DEFAULT_FROM_EMAIL, [correo.destinatario],
+        connection=conexion,
+    )
+    if correo.cuerpo_html:
+        mensaje.attach_alternative(correo.cuerpo_html, 'text/html')
+    return mensaje
+
+
+def enviar_lote(lote=None, conexion=None):
+    """
+    Envía un lote de correos pendientes por una sola conexión SMTP. Los que fallan se
+    reprograman con espera creciente (espera_reintento) y pasan a 'Fallido' al llegar a
+    CORREOS_MAXIMO_INTENTOS. Devuelve {'enviados': n, 'reintentar': n, 'fallidos': n}.
+    """
+    lote = lote or getattr(settings, 'CORREOS_LOTE', 50)
+    maximo_intentos = getattr(settings, 'CORREOS_MAXIMO_INTENTOS', 5)
+    resultado = {'enviados': 0, 'reintentar': 0, 'fallidos': 0}
+    correos = _reservar(lote)
+    if not correos:
+        return resultado
+
+    propia = conexion is None
+    conexion = conexion or get_connection(fail_silently=False)
+    try:
+        conexion.open()
+    except Exception as e:
+        logger.error(f"No se pudo abrir la conexión SMTP: {e}")
+        _devolver(correos, e)
+        resultado['reintentar'] = len(correos)
+        return resultado
+
+    try:
+        for posicion, correo in enumerate(correos):
+            try:
+                _mensaje(correo, conexion).send()
+            except Exception as e:
+                agotado = correo.intentos >= maximo_intentos
+                CorreoSaliente.objects.filter(pk=correo.pk).update(
+                    estado=CorreoSaliente.FALLIDO if agotado else CorreoSaliente.PENDIENTE,
+                    proximo_intento=timezone.now() + espera_reintento(correo.intentos),
+                    ultimo_error=str(e),
+                )
+                resultado['fallidos' if agotado else 'reintentar'] += 1
+                logger.warning(f"Falló el envío del correo {correo.pk} a {correo.destinatario} (intento {correo.intentos}): {e}")
+                # La conexión puede haber quedado inutilizable: se abre otra para el resto.
+                conexion.close()
+                try:
+                    conexion.open()
+                except Exception as e:
+                    logger.error(f"No se pudo reabrir la conexión SMTP: {e}")
+                    _devolver(correos[posicion + 1:], e)
+                    resultado['reintentar'] += len(correos) - posicion - 1
+                    break
+            else:
+                # El cuerpo ya no hace falta y puede tener datos sensibles (la contraseña
+                # inicial del correo de bienvenida): no se conserva.
+                CorreoSaliente.objects.filter(pk=correo.pk).update(
+                    estado=CorreoSaliente.ENVIADO, fecha_envio=timezone.now(), ultimo_error='',
+                    cuerpo_texto='', cuerpo_html='',
+                )
+                resultado['enviados'] += 1
+    finally:
+        if propia:
+            conexion.close()
+    logger.info(
+        f"Lote de correos: {resultado['enviados']} enviados, {resultado['reintentar']} a reintentar, "
+        f"{resultado['fallidos']} fallidos."
+    )
+    return resultado
+
+
+def enviar_pendientes(lote=None, maximo_lotes=None):
+    """Envía lotes hasta vaciar los pendientes listos (o `maximo_lotes`). Devuelve los totales."""
+    totales = {'enviados': 0, 'reintentar': 0, 'fallidos': 0}
+    lotes = 0
+    while maximo_lotes is None or lotes < maximo_lotes:
+        resultado = enviar_lote(lote)
+        lotes += 1
+        for clave, cantidad in resultado.items():
+            totales[clave] += cantidad
+        if not any(resultado.values()):
+            break
+    return totales
+
+
+def purgar_bandeja(dias):
+    """
+    Borra los correos enviados y fallidos creados hace más de `dias` días; los pendientes
+    no se tocan. Devuelve cuántos se borraron.
+    """
+    borrados, _ = CorreoSaliente.objects.filter(
+        estado__in=[CorreoSaliente.ENVIADO, CorreoSaliente.FALLIDO],
+        fecha_creacion__lt=timezone.now() - timedelta(days=dias),
+    ).delete()
+    return borrados
+
+
+def estado_bandeja():
+    """Cantidades por estado, antigüedad del pendiente más viejo y último envío."""
+    por_estado = dict(CorreoSaliente.objects.values_list('estado').annotate(total=Count('id')).order_by())
+    pendientes = CorreoSaliente.objects.filter(estado=CorreoSaliente.PENDIENTE).aggregate(
+        mas_antiguo=Min('fecha_creacion'), proximo=Min('proximo_intento'),
+    )
+    ultimo_envio = CorreoSaliente.objects.filter(estado=CorreoSaliente.ENVIADO).aggregate(ultimo=Max('fecha_envio'))['ultimo']
+    ahora = timezone.now()
+    return {
+        'pendientes': por_estado.get(CorreoSaliente.PENDIENTE, 0),
+        'enviados': por_estado.get(CorreoSaliente.ENVIADO, 0),
+        'fallidos': por_estado.get(CorreoSaliente.FALLIDO, 0),
+        'listos_para_enviar': CorreoSaliente.objects.filter(
+            estado=CorreoSaliente.PENDIENTE, proximo_intento__lte=ahora,
+        ).count(),
+        'segundos_pendiente_mas_antiguo': (
+            int((ahora - pendientes['mas_antiguo']).total_seconds()) if pendientes['mas_antiguo'] else None
+        ),
+        'proximo_intento': pendientes['proximo'],
+        'ultimo_envio': ultimo_envio,
+    }
@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from notificaciones.correos import enviar_lote, estado_bandeja, purgar_bandeja
+
+
+class Command(BaseCommand):
+    help = (
+        "Envía los correos pendientes de la bandeja de salida en lotes, por una sola conexión "
+        "SMTP por lote, reintentando los que fallan. Pensado para ejecutarse desde cron o, con "
+        "--continuo, como proceso permanente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, help='Correos por lote. Por defecto, CORREOS_LOTE.')
+        parser.add_argument(
+            '--continuo', action='store_true',
+            help='No termina al vaciar la bandeja: espera --intervalo segundos y vuelve a revisar.',
+        )
+        parser.add_argument('--intervalo', type=int, default=30, help='Segundos entre revisiones con --continuo.')
+        parser.add_argument('--estado', action='store_true', help='Solo muestra el estado de la bandeja.')
+        parser.add_argument(
+            '--purgar-dias', type=int,
+            help='Antes de enviar, borra los correos enviados y fallidos de hace más de N días.',
+        )
+
+    def handle(self, *args, **options):
+        if options['lote'] is not None and options['lote'] < 1:
+            raise CommandError("--lote debe ser mayor que cero.")
+        if options['purgar_dias'] is not None:
+            if options['purgar_dias'] < 1:
+                raise CommandError("--purgar-dias debe ser mayor que cero.")
+            self.stdout.write(f"Correos purgados: {purgar_bandeja(options['purgar_dias'])}.")
+        if options['estado']:
+            self._mostrar_estado()
+            return
+
+        totales = {'enviados': 0, 'reintentar': 0, 'fallidos': 0}
+        try:
+            while True:
+                resultado = enviar_lote(options['lote'])
+                if any(resultado.values()):
+                    for clave, cantidad in resultado.items():
+                        totales[clave] += cantidad
+                    self.stdout.write(
+                        f"Lote: {resultado['enviados']} enviados, {resultado['reintentar']} a reintentar, "
+                        f"{resultado['fallidos']} fallidos."
+                    )
+                    continue
+                if not options['continuo']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write("Interrumpido.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Correos enviados: {totales['enviados']}, a reintentar: {totales['reintentar']}, "
+            f"fallidos: {totales['fallidos']}."
+        ))
+        self._mostrar_estado()
+
+    def _mostrar_estado(self):
+        estado = estado_bandeja()
+        self.stdout.write(
+            f"Bandeja: {estado['pendientes']} pendientes ({estado['listos_para_enviar']} listos), "
+            f"{estado['enviados']} enviados, {estado['fallidos']} fallidos."
+        )
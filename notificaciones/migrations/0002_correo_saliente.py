@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:43
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorreoSaliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(blank=True, help_text='Origen del correo (bienvenida, horario, incidente, ...).', max_length=50)),
+                ('destinatario', models.EmailField(max_length=254)),
+                ('asunto', models.CharField(max_length=255)),
+                ('cuerpo_texto', models.TextField(blank=True)),
+                ('cuerpo_html', models.TextField(blank=True)),
+                ('estado', models.CharField(choices=[('Pendiente', 'Pendiente'), ('Enviado', 'Enviado'), ('Fallido', 'Fallido')], default='Pendiente', max_length=9)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now, help_text='No se intenta enviar antes de este momento.')),
+                ('ultimo_error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_envio', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Correo saliente',
+                'verbose_name_plural': 'Correos salientes',
+                'indexes': [models.Index(condition=models.Q(('estado', 'Pendiente')), fields=['proximo_intento'], name='correo_pendiente_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def vaciar_cuerpos_enviados(apps, schema_editor):
+    """Vacía el cuerpo de los correos ya enviados, que hasta ahora se conservaba."""
+    CorreoSaliente = apps.get_model('notificaciones', 'CorreoSaliente')
+    CorreoSaliente.objects.using(schema_editor.connection.alias).filter(estado='Enviado').exclude(
+        cuerpo_texto='', cuerpo_html='',
+    ).update(cuerpo_texto='', cuerpo_html='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0002_correo_saliente'),
+    ]
+
+    operations = [
+        migrations.RunPython(vaciar_cuerpos_enviados, migrations.RunPython.noop),
+    ]
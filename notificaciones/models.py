@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 # NOTIFICACIONES
@@ -19,3 +21,39 @@ class Notificacion(models.Model):
         ordering = ['-fecha_creacion']  # Ordena las notificaciones de más reciente a más antigua.
         verbose_name = "Notificación"
         verbose_name_plural = "Notificaciones"
+
+
+class CorreoSaliente(models.Model):
+    """
+    Correo pendiente de envío (bandeja de salida). Se guarda en la misma transacción que
+    el cambio que lo origina y lo envía después el comando enviar_correos, en lotes y
+    con reintentos (ver notificaciones/correos.py). Al enviarse se vacía el cuerpo; los
+    enviados y fallidos viejos se borran con enviar_correos --purgar-dias.
+    """
+    PENDIENTE = 'Pendiente'
+    ENVIADO = 'Enviado'
+    FALLIDO = 'Fallido'
+    ESTADOS = [(PENDIENTE, 'Pendiente'), (ENVIADO, 'Enviado'), (FALLIDO, 'Fallido')]
+
+    tipo = models.CharField(max_length=50, blank=True, help_text="Origen del correo (bienvenida, horario, incidente, ...).")
+    destinatario = models.EmailField()
+    asunto = models.CharField(max_length=255)
+    cuerpo_texto = models.TextField(blank=True)
+    cuerpo_html = models.TextField(blank=True)
+    estado = models.CharField(max_length=9, choices=ESTADOS, default=PENDIENTE)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now, help_text="No se intenta enviar antes de este momento.")
+    ultimo_error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_envio = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Correo saliente"
+        verbose_name_plural = "Correos salientes"
+        indexes = [
+            # El envío solo busca pendientes cuyo próximo intento ya llegó.
+            models.Index(fields=['proximo_intento'], condition=Q(estado='Pendiente'), name='correo_pendiente_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.asunto} -> {self.destinatario} ({self.estado})"
@@ -0,0 +1,68 @@
+from string import Formatter
+
+from django.contrib.auth.models import User
+
+from .models import Notificacion
+
+
+def _id_usuario(destinatario):
+    # Acepta el usuario, cualquier objeto con `user_id` (un Empleado) o el id directamente.
+    if destinatario is None:
+        return None
+    if isinstance(destinatario, User):
+        return destinatario.pk
+    if isinstance(destinatario, int):
+        return destinatario
+    return getattr(destinatario, 'user_id', None)
+
+
+def _usa_destinatario(plantilla):
+    return any(campo and campo.split('.')[0].split('[')[0] == 'destinatario'
+               for _, campo, _, _ in Formatter().parse(plantilla or ''))
+
+
+def armar_notificaciones(destinatarios, mensaje, enlace=None, **contexto):
+    """
+    Arma en memoria, sin guardarlas, una notificación por usuario destinatario.
+
+    - destinatarios: usuarios, empleados o ids de usuario. Los repetidos (o un usuario y
+      su empleado) reciben una sola notificación; los que no tienen usuario se omiten.
+    - mensaje / enlace: plantillas de str.format que se completan con `contexto` y con
+      `destinatario`, el objeto tal como vino: "¡Bienvenido/a, {destinatario.nombre}!".
+      Los datos variables van en `contexto`, no pegados en la plantilla, para que una
+      llave en el nombre de un horario no rompa el formato.
+    """
+    por_destinatario = _usa_destinatario(mensaje) or _usa_destinatario(enlace)
+    if not por_destinatario:
+        # El texto es el mismo para todos: se arma una sola vez.
+        mensaje = mensaje.format_map(contexto)
+        enlace = enlace.format_map(contexto) if enlace else enlace
+
+    notificaciones = []
+    vistos = set()
+    for destinatario in destinatarios:
+        id_user = _id_usuario(destinatario)
+        if id_user is None or id_user in vistos:
+            continue
+        vistos.add(id_user)
+        if por_destinatario:
+            valores = {**contexto, 'destinatario': destinatario}
+            notificaciones.append(Notificacion(
+                id_user_id=id_user,
+                mensaje=mensaje.format_map(valores),
+                enlace=enlace.format_map(valores) if enlace else enlace,
+            ))
+        else:
+            notificaciones.append(Notificacion(id_user_id=id_user, mensaje=mensaje, enlace=enlace))
+    return notificaciones
+
+
+def notificar(destinatarios, mensaje, enlace=None, **contexto):
+    """
+    Crea las notificaciones de armar_notificaciones con un solo INSERT, sin importar
+    cuántos destinatarios sean. Devuelve las notificaciones creadas.
+    """
+    notificaciones = armar_notificaciones(destinatarios, mensaje, enlace, **contexto)
+    if not notificaciones:
+        return []
+    return Notificacion.objects.bulk_create(notificaciones)
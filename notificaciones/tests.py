@@ -1,3 +1,232 @@
-from django.test import TestCase
+import io
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from empleados.models import Empleado
+from sanciones.models import Sancion, SancionEmpleado
+
+from .correos import encolar_correo, encolar_correos, enviar_lote, enviar_pendientes, espera_reintento, estado_bandeja
+from .models import CorreoSaliente, Notificacion
+from .servicios import armar_notificaciones, notificar
+
+
+class BackendContador(EmailBackend):
+    """Backend en memoria que cuenta las conexiones abiertas y rechaza las direcciones 'rebota...'."""
+
+    aperturas = 0
+
+    def open(self):
+        BackendContador.aperturas += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        for mensaje in messages:
+            if any(destinatario.startswith('rebota') for destinatario in mensaje.to):
+                raise ConnectionError('550 buzón inexistente')
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='notificaciones.tests.BackendContador',
+    CORREOS_LOTE=50, CORREOS_MAXIMO_INTENTOS=3, CORREOS_ESPERA_BASE=60, CORREOS_ESPERA_MAXIMA=3600,
+)
+class BandejaSalidaTests(TestCase):
+
+    def setUp(self):
+        BackendContador.aperturas = 0
+
+    def encolar(self, cantidad, dominio='example.com', prefijo='empleado'):
+        for i in range(cantidad):
+            encolar_correo(f'{prefijo}{i}@{dominio}', f'Asunto {i}', texto=f'Cuerpo {i}', tipo='prueba')
+
+    def vencer_esperas(self):
+        CorreoSaliente.objects.update(proximo_intento=timezone.now() - timedelta(seconds=1))
+
+    def test_el_correo_se_descarta_si_la_transaccion_se_revierte(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.encolar(1)
+                raise RuntimeError('falla el alta')
+        self.assertFalse(CorreoSaliente.objects.exists())
+
+        with transaction.atomic():
+            self.encolar(1)
+        self.assertEqual(CorreoSaliente.objects.get().estado, CorreoSaliente.PENDIENTE)
+        # Encolar no envía: el envío lo hace el lote.
+        self.assertEqual(mail.outbox, [])
+
+    @override_settings(TAREAS_EN_SEGUNDO_PLANO=False, CORREOS_ENVIO_INMEDIATO=True)
+    def test_envio_inmediato_al_confirmar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            encolar_correo('empleado@example.com', 'Bienvenida', plantilla='email/bienvenida_empleado.html', contexto={
+                'empleado_nombre': 'Ana', 'username': '1', 'password': '1', 'login_url': 'http://localhost/login',
+            })
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        correo = CorreoSaliente.objects.get()
+        self.assertEqual(correo.estado, CorreoSaliente.ENVIADO)
+        # El cuerpo (con la contraseña inicial) no queda guardado después del envío.
+        self.assertEqual((correo.cuerpo_texto, correo.cuerpo_html), ('', ''))
+
+    def test_un_lote_usa_una_sola_conexion(self):
+        encolar_correos([{'destinatario': f'e{i}@example.com', 'asunto': 'Aviso', 'texto': 'Hola'} for i in range(5)])
+        resultado = enviar_lote()
+
+        self.assertEqual(resultado, {'enviados': 5, 'reintentar': 0, 'fallidos': 0})
+        self.assertEqual(BackendContador.aperturas, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(CorreoSaliente.objects.filter(estado=CorreoSaliente.ENVIADO, intentos=1).count(), 5)
+        # Ya no queda nada para enviar.
+        self.assertEqual(enviar_lote(), {'enviados': 0, 'reintentar': 0, 'fallidos': 0})
+
+    def test_enviar_pendientes_recorre_varios_lotes(self):
+        self.encolar(5)
+        totales = enviar_pendientes(lote=2)
+
+        self.assertEqual(totales['enviados'], 5)
+        self.assertEqual(BackendContador.aperturas, 3)
+
+    def test_reintentos_con_espera_creciente_hasta_fallar(self):
+        self.encolar(1, prefijo='rebota')
+        self.encolar(2)
+
+        resultado = enviar_lote()
+        # El fallo no corta el lote: los demás salen por una conexión nueva.
+        self.assertEqual(resultado, {'enviados': 2, 'reintentar': 1, 'fallidos': 0})
+        self.assertEqual(BackendContador.aperturas, 2)
+        rebotado = CorreoSaliente.objects.get(destinatario='rebota0@example.com')
+        self.assertEqual((rebotado.estado, rebotado.intentos), (CorreoSaliente.PENDIENTE, 1))
+        self.assertIn('550', rebotado.ultimo_error)
+        self.assertGreater(rebotado.proximo_intento, timezone.now() + timedelta(seconds=50))
+
+        # Antes de que venza la espera no se reintenta.
+        self.assertEqual(enviar_lote(), {'enviados': 0, 'reintentar': 0, 'fallidos': 0})
+
+        self.vencer_esperas()
+        self.assertEqual(enviar_lote()['reintentar'], 1)
+        self.vencer_esperas()
+        self.assertEqual(enviar_lote()['fallidos'], 1)
+        rebotado.refresh_from_db()
+        self.assertEqual((rebotado.estado, rebotado.intentos), (CorreoSaliente.FALLIDO, 3))
+
+        # Un correo fallido no se vuelve a intentar.
+        self.vencer_esperas()
+        self.assertEqual(enviar_lote(), {'enviados': 0, 'reintentar': 0, 'fallidos': 0})
+
+    def test_espera_reintento(self):
+        self.assertEqual(espera_reintento(1), timedelta(seconds=60))
+        self.assertEqual(espera_reintento(3), timedelta(seconds=240))
+        self.assertEqual(espera_reintento(20), timedelta(seconds=3600))
+
+    def test_estado_bandeja_y_endpoint(self):
+        self.encolar(1, prefijo='rebota')
+        self.encolar(2)
+        enviar_lote()
+
+        estado = estado_bandeja()
+        self.assertEqual((estado['pendientes'], estado['enviados'], estado['fallidos']), (1, 2, 0))
+        self.assertEqual(estado['listos_para_enviar'], 0)
+        self.assertIsNotNone(estado['ultimo_envio'])
+
+        cliente = APIClient()
+        cliente.force_authenticate(User.objects.create_user('empleado', password='x'))
+        self.assertEqual(cliente.get('/api/correos/estado/').status_code, 403)
+        cliente.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'x'))
+        respuesta = cliente.get('/api/correos/estado/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data['enviados'], 2)
+
+    def test_comando_enviar_correos(self):
+        self.encolar(3)
+        salida = io.StringIO()
+        call_command('enviar_correos', lote=2, stdout=salida)
+
+        self.assertIn('Correos enviados: 3', salida.getvalue())
+        self.assertIn('0 pendientes', salida.getvalue())
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_purgar_enviados_y_fallidos_viejos(self):
+        self.encolar(1, prefijo='rebota')
+        self.encolar(2)
+        enviar_lote()
+        CorreoSaliente.objects.filter(destinatario='rebota0@example.com').update(estado=CorreoSaliente.FALLIDO)
+        self.encolar(1, prefijo='pendiente')
+        CorreoSaliente.objects.update(fecha_creacion=timezone.now() - timedelta(days=40))
+        CorreoSaliente.objects.filter(estado=CorreoSaliente.PENDIENTE).update(proximo_intento=timezone.now() + timedelta(hours=1))
+        self.encolar(1, prefijo='reciente')
+
+        salida = io.StringIO()
+        call_command('enviar_correos', purgar_dias=30, stdout=salida)
+        self.assertIn('Correos purgados: 3.', salida.getvalue())
+        self.assertEqual(
+            sorted(CorreoSaliente.objects.values_list('destinatario', flat=True)),
+            ['pendiente0@example.com', 'reciente0@example.com'],
+        )
+        with self.assertRaises(CommandError):
+            call_command('enviar_correos', purgar_dias=0, stdout=io.StringIO())
+
+
+class NotificarTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empleados = []
+        for i in range(3):
+            user = User.objects.create_user(username=f'empleado{i}', password='x')
+            cls.empleados.append(Empleado.objects.create(
+                user=user, nombre=f'Nombre {i}', apellido=f'Apellido {i}', dni=30000000 + i,
+                email=f'empleado{i}@example.com', fecha_nacimiento=date(1990, 1, 1),
+            ))
+
+    def test_un_solo_insert_y_sin_repetidos(self):
+        primero = self.empleados[0]
+        # El mismo usuario como empleado, como User y como id recibe una sola notificación.
+        destinatarios = self.empleados + [primero.user, primero.user_id, None]
+        with self.assertNumQueries(1):
+            creadas = notificar(destinatarios, "Nuevo horario: {horario}.", enlace='/horarios/', horario='Turno {mañana}')
+
+        self.assertEqual(len(creadas), 3)
+        self.assertEqual(
+            sorted(Notificacion.objects.values_list('id_user_id', flat=True)),
+            sorted(empleado.user_id for empleado in self.empleados),
+        )
+        self.assertEqual(set(Notificacion.objects.values_list('mensaje', flat=True)), {'Nuevo horario: Turno {mañana}.'})
+
+    def test_plantilla_por_destinatario(self):
+        notificaciones = armar_notificaciones(self.empleados, "Hola {destinatario.nombre}", enlace='/perfil/{destinatario.pk}/')
+        self.assertEqual(
+            [(n.mensaje, n.enlace) for n in notificaciones],
+            [(f'Hola {e.nombre}', f'/perfil/{e.pk}/') for e in self.empleados],
+        )
+
+    def test_sin_destinatarios_no_consulta(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(notificar([], "Aviso"), [])
+
+    def test_si_falla_encolar_el_correo_la_sancion_se_guarda_igual(self):
+        def encolar_con_error_de_base(*args, **kwargs):
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 / 0")
+
+        sancion = Sancion.objects.create(nombre='Apercibimiento', tipo='Leve')
+        cliente = APIClient()
+        cliente.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'x'))
+        with mock.patch('sanciones.views.encolar_correo', encolar_con_error_de_base), self.assertLogs('sanciones.views', 'ERROR'):
+            respuesta = cliente.post('/api/sanciones-empleados/', {
+                'empleado_id': self.empleados[0].pk, 'sancion_id': sancion.pk,
+                'fecha_inicio': '2026-10-01', 'motivo': 'Llegadas tarde',
+            }, format='json')
+
+        # El error de la base quedó en el savepoint del correo: el alta y la notificación siguen.
+        self.assertEqual(respuesta.status_code, 201, respuesta.data)
+        self.assertTrue(SancionEmpleado.objects.filter(id_empl=self.empleados[0]).exists())
+        self.assertEqual(Notificacion.objects.filter(id_user=self.empleados[0].user).count(), 1)
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('correos/estado/', views.estado_correos, name='estado-correos'),
+]
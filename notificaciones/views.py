@@ -1,3 +1,21 @@
-from django.shortcuts import render
+from drf_spectacular.utils import extend_schema
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
 
-# Create your views here.
+from usuarios.roles import es_admin
+
+from .correos import estado_bandeja
+
+
+@extend_schema(tags=['Notificaciones'])
+@api_view(['GET'])
+def estado_correos(request):
+    """
+    Estado de la bandeja de salida de correos: cuántos hay pendientes, enviados y
+    fallidos, cuánto hace que espera el pendiente más antiguo y cuándo salió el último.
+    Solo para administradores.
+    """
+    if not es_admin(request.user):
+        return Response({'error': 'No tiene permiso para realizar esta acción.'}, status=status.HTTP_403_FORBIDDEN)
+    return Response(estado_bandeja(), status=status.HTTP_200_OK)
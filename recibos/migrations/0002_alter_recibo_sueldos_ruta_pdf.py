@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:28
+
+import archivos.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recibo_sueldos',
+            name='ruta_pdf',
+            field=models.FileField(storage=archivos.storage.AlmacenamientoDeduplicado(), upload_to='recibos/pdf/'),
+        ),
+    ]
@@ -1,11 +1,13 @@
 from django.db import models
 
+from archivos.storage import almacenamiento_deduplicado
+
 # MODELS DE RECIBOS
 class Recibo_Sueldos(models.Model):
     id_empl = models.ForeignKey('empleados.Empleado', on_delete=models.CASCADE, related_name='recibos')
     fecha_emision = models.DateField()
     periodo = models.CharField(max_length=7)
-    ruta_pdf = models.FileField(upload_to='recibos/pdf/')
+    ruta_pdf = models.FileField(upload_to='recibos/pdf/', storage=almacenamiento_deduplicado)
     ruta_imagen = models.ImageField(upload_to='recibos/imagenes/', blank=True, null=True)
 
     def __str__(self):
@@ -1,11 +1,23 @@
 from rest_framework import serializers
 from .models import Recibo_Sueldos
+from archivos.descargas import enlace_si_puede
 
 class ReciboSueldosSerializer(serializers.ModelSerializer):
     """
     Serializer para el modelo Recibo_Sueldos.
     """
+    url_descarga = serializers.SerializerMethodField()
+
     class Meta:
         model = Recibo_Sueldos
-        fields = ['id', 'id_empl', 'fecha_emision', 'periodo', 'ruta_pdf', 'ruta_imagen']
-        read_only_fields = ('id',)
\ No newline at end of file
+        fields = ['id', 'id_empl', 'fecha_emision', 'periodo', 'ruta_pdf', 'ruta_imagen', 'url_descarga']
+        read_only_fields = ('id',)
+        # El PDF se lee solo por url_descarga: la ruta bajo /media/ no pasa por el control de acceso.
+        extra_kwargs = {'ruta_pdf': {'write_only': True}}
+
+    def get_url_descarga(self, obj):
+        """
+        Enlace firmado y con vencimiento al PDF (ver archivos/descargas.py), o None si el
+        usuario no puede descargarlo.
+        """
+        return enlace_si_puede('recibo', obj, self.context.get('request'))
\ No newline at end of file
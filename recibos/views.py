@@ -1,16 +1,16 @@
 from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.conf import settings
+from django.db import transaction
 import logging
 from .models import Recibo_Sueldos
 from rest_framework.response import Response
 from .serializers import ReciboSueldosSerializer
 from drf_spectacular.utils import extend_schema
-from notificaciones.models import Notificacion
+from notificaciones.correos import encolar_correo
+from notificaciones.servicios import notificar
 from empleados.mixins import AdminWriteAccessMixin
 from empleados.models import Empleado
+from usuarios.roles import es_admin_o_consultor, es_empleado
 from rest_framework.permissions import BasePermission
 
 logger = logging.getLogger(__name__)
@@ -37,21 +37,17 @@ class ReciboSueldosViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
         user = self.request.user
 
         # Superusuarios, Administradores y Consultores ven todos los recibos.
-        if user.is_superuser or user.groups.filter(name__in=['Administrador', 'Empleado']).exists():
+        if es_admin_o_consultor(user):
             return Recibo_Sueldos.objects.all()
 
         # Los empleados solo ven sus propios recibos.
-        if user.groups.filter(name='Empleado').exists():
-            try:
-                # Buscamos el empleado asociado al usuario actual
-                empleado = Empleado.objects.get(id_usu=user)
-                return Recibo_Sueldos.objects.filter(id_empl=empleado)
-            except Empleado.DoesNotExist:
-                return Recibo_Sueldos.objects.none()
+        if es_empleado(user):
+            return Recibo_Sueldos.objects.filter(id_empl__user=user).select_related('id_empl')
 
         # Si el usuario no pertenece a un grupo válido, no ve ningún recibo.
         return Recibo_Sueldos.objects.none()
 
+    @transaction.atomic
     def perform_create(self, serializer):
         """
         Sobrescribe el método para enviar una notificación al empleado
@@ -62,12 +58,10 @@ class ReciboSueldosViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
 
         # 2. Creamos la notificación para el empleado.
         empleado = recibo.id_empl
-        mensaje = f"Se ha cargado tu recibo de sueldo para el período {recibo.periodo}."
         enlace_recibos = "/recibos/mis-recibos/"
-        Notificacion.objects.create(
-            id_user=empleado.user,
-            mensaje=mensaje,
-            enlace=enlace_recibos
+        notificar(
+            [empleado], "Se ha cargado tu recibo de sueldo para el período {periodo}.",
+            enlace=enlace_recibos, periodo=recibo.periodo,
         )
 
         # 3. Enviar correo electrónico de notificación
@@ -81,17 +75,17 @@ class ReciboSueldosViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
 
                 asunto = f"Nuevo recibo de sueldo disponible: Período {recibo.periodo}"
 
-                # Renderizar el template HTML
-                cuerpo_mensaje_html = render_to_string('email/notificacion_recibo.html', {
-                    'empleado_nombre': empleado.nombre,
-                    'periodo': recibo.periodo,
-                    'portal_url': portal_url,
-                })
-                
-                send_mail(asunto, '', settings.DEFAULT_FROM_EMAIL, [empleado.email], html_message=cuerpo_mensaje_html)
-                logger.info(f"Correo de recibo enviado exitosamente a {empleado.email}")
+                # El correo se guarda en la bandeja de salida y sale al confirmarse la transacción.
+                # En su propio savepoint: si falla, no deja abortada la transacción del alta.
+                with transaction.atomic():
+                    encolar_correo(empleado.email, asunto, plantilla='email/notificacion_recibo.html', contexto={
+                        'empleado_nombre': empleado.nombre,
+                        'periodo': recibo.periodo,
+                        'portal_url': portal_url,
+                    }, tipo='recibo')
+                logger.info(f"Correo de recibo encolado para {empleado.email}")
             except Exception as e:
-                logger.error(f"ERROR al enviar correo de recibo a {empleado.email}: {e}")
+                logger.error(f"ERROR al encolar correo de recibo a {empleado.email}: {e}")
 
 @extend_schema(tags=['Recibos'])
 class MisRecibosView(ListAPIView):
@@ -110,7 +104,7 @@ class MisRecibosView(ListAPIView):
         try:
             # Buscamos el empleado asociado al usuario autenticado
             empleado = Empleado.objects.get(user=user)
-            return Recibo_Sueldos.objects.filter(id_empl=empleado)
+            return Recibo_Sueldos.objects.filter(id_empl=empleado).select_related('id_empl')
         except Empleado.DoesNotExist:
             # Si el usuario no tiene un perfil de empleado, no se devuelven recibos.
             return Recibo_Sueldos.objects.none()
@@ -119,6 +113,11 @@ class MisRecibosView(ListAPIView):
         queryset = self.get_queryset()
         if not queryset.exists():
             return Response({"detail": "No se encontraron recibos de sueldo para tu usuario."}, status=status.HTTP_200_OK)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
@@ -127,10 +126,7 @@ class IsAdminOrConsultor(BasePermission):
     Permiso personalizado para permitir el acceso solo a Administradores o Consultores.
     """
     def has_permission(self, request, view):
-        return request.user.is_authenticated and (
-            request.user.is_superuser or 
-            request.user.groups.filter(name__in=['Administrador', 'Consultor']).exists()
-        )
+        return es_admin_o_consultor(request.user)
 
 @extend_schema(tags=['Recibos'])
 class RecibosPorDNIView(ListAPIView):
@@ -140,6 +136,7 @@ class RecibosPorDNIView(ListAPIView):
     """
     serializer_class = ReciboSueldosSerializer
     permission_classes = [IsAuthenticated, IsAdminOrConsultor]
+    orden_cursor = ('-fecha_emision', '-id')
 
     def get_queryset(self):
         """
@@ -148,7 +145,7 @@ class RecibosPorDNIView(ListAPIView):
         dni = self.kwargs.get('dni')
         try:
             empleado = Empleado.objects.get(dni=dni)
-            return Recibo_Sueldos.objects.filter(id_empl=empleado).order_by('-fecha_emision')
+            return Recibo_Sueldos.objects.filter(id_empl=empleado).select_related('id_empl').order_by('-fecha_emision')
         except Empleado.DoesNotExist:
             return Recibo_Sueldos.objects.none()
 
@@ -157,5 +154,10 @@ class RecibosPorDNIView(ListAPIView):
         if not queryset.exists():
             return Response({"detail": f"No se encontraron recibos para el empleado con DNI {self.kwargs.get('dni')}."}, status=status.HTTP_404_NOT_FOUND)
         
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
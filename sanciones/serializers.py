@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from .models import Sancion, SancionEmpleado
 from empleados.models import Empleado
-from empleados.serializer import EmpleadoSerializer
+from empleados.serializer import EmpleadoSerializer, EmpleadoBasicoSerializer, optimizar_consulta_empleados
+from api_nuevas_energias.expansion import CampoExpandible, SerializerExpandibleMixin
 
 class SancionSerializer(serializers.ModelSerializer):
     """
@@ -12,14 +13,16 @@ class SancionSerializer(serializers.ModelSerializer):
         model = Sancion
         fields = '__all__'
 
-class SancionEmpleadoSerializer(serializers.ModelSerializer):
+class SancionEmpleadoSerializer(SerializerExpandibleMixin, serializers.ModelSerializer):
     """
     Serializer para gestionar las sanciones de los empleados.
+    El empleado y el responsable se muestran resumidos; completos (con legajo y
+    documentos) con ?expand=id_empl,responsable.
     """
     # Relaciones de solo lectura para la representación
-    id_empl = EmpleadoSerializer(read_only=True)
+    id_empl = CampoExpandible(EmpleadoSerializer, compacto=EmpleadoBasicoSerializer, precargar=optimizar_consulta_empleados)
     id_sancion = SancionSerializer(read_only=True)
-    responsable = EmpleadoSerializer(read_only=True)
+    responsable = CampoExpandible(EmpleadoSerializer, compacto=EmpleadoBasicoSerializer, precargar=optimizar_consulta_empleados)
 
     # Campos de solo escritura para la creación
     empleado_id = serializers.PrimaryKeyRelatedField(queryset=Empleado.objects.all(), source='id_empl', write_only=True)
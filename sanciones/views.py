@@ -1,27 +1,31 @@
 from rest_framework import viewsets, generics, status
 from rest_framework.permissions import IsAuthenticated
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.conf import settings
+from django.db import transaction
 import logging
 from .models import Sancion, SancionEmpleado
 from .serializers import SancionSerializer, SancionEmpleadoSerializer
 from drf_spectacular.utils import extend_schema
-from notificaciones.models import Notificacion
+from notificaciones.correos import encolar_correo
+from notificaciones.servicios import notificar
 from empleados.mixins import AdminWriteAccessMixin
+from api_nuevas_energias.condicional import CatalogoCondicionalMixin
 from empleados.models import Empleado
 from rest_framework.response import Response
 
 logger = logging.getLogger(__name__)
 
 @extend_schema(tags=['Sanciones'])
-class SancionViewSet(viewsets.ReadOnlyModelViewSet):
+class SancionViewSet(CatalogoCondicionalMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para ver las sanciones predefinidas. Solo permite la lectura.
     """
     queryset = Sancion.objects.filter(estado=True)
     serializer_class = SancionSerializer
     permission_classes = [IsAuthenticated]
+    # Catálogo chico: se devuelve completo, sin paginar.
+    pagination_class = None
+    claves_version = ('sanciones',)
+    cache_publica = True
 
 @extend_schema(tags=['Sanciones'])
 class SancionEmpleadoViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
@@ -34,6 +38,13 @@ class SancionEmpleadoViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
     serializer_class = SancionEmpleadoSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_queryset(self):
+        # Precarga según las relaciones pedidas con ?expand= (ver api_nuevas_energias/expansion.py).
+        return SancionEmpleadoSerializer.optimizar_consulta(
+            super().get_queryset().select_related('id_sancion'), self.request,
+        )
+
+    @transaction.atomic
     def perform_create(self, serializer):
         """
         1. Asigna automáticamente al empleado que está registrando la sanción como responsable.
@@ -49,12 +60,9 @@ class SancionEmpleadoViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
         # 2. Creamos y enviamos la notificación al empleado sancionado.
         empleado_sancionado = sancion_empleado.id_empl
         enlace_sancion = f"/sanciones/detalle/{sancion_empleado.id}/"
-        mensaje = f"Se te ha aplicado una nueva sanción: {sancion_empleado.id_sancion.nombre}."
-        
-        Notificacion.objects.create(
-            id_user=empleado_sancionado.user,
-            mensaje=mensaje,
-            enlace=enlace_sancion
+        notificar(
+            [empleado_sancionado], "Se te ha aplicado una nueva sanción: {sancion}.",
+            enlace=enlace_sancion, sancion=sancion_empleado.id_sancion.nombre,
         )
 
         # 3. Enviar correo electrónico de notificación
@@ -68,17 +76,17 @@ class SancionEmpleadoViewSet(AdminWriteAccessMixin, viewsets.ModelViewSet):
 
                 asunto = f"Notificación de Nueva Sanción: {sancion_empleado.id_sancion.nombre}"
 
-                # Renderizar el template HTML
-                cuerpo_mensaje_html = render_to_string('email/notificacion_sancion.html', {
-                    'empleado_nombre': empleado_sancionado.nombre,
-                    'sancion_empleado': sancion_empleado,
-                    'detalle_url': detalle_url,
-                })
-                
-                send_mail(asunto, '', settings.DEFAULT_FROM_EMAIL, [empleado_sancionado.email], html_message=cuerpo_mensaje_html)
-                logger.info(f"Correo de sanción enviado exitosamente a {empleado_sancionado.email}")
+                # El correo se guarda en la bandeja de salida y sale al confirmarse la transacción.
+                # En su propio savepoint: si falla, no deja abortada la transacción del alta.
+                with transaction.atomic():
+                    encolar_correo(empleado_sancionado.email, asunto, plantilla='email/notificacion_sancion.html', contexto={
+                        'empleado_nombre': empleado_sancionado.nombre,
+                        'sancion_empleado': sancion_empleado,
+                        'detalle_url': detalle_url,
+                    }, tipo='sancion')
+                logger.info(f"Correo de sanción encolado para {empleado_sancionado.email}")
             except Exception as e:
-                logger.error(f"ERROR al enviar correo de sanción a {empleado_sancionado.email}: {e}")
+                logger.error(f"ERROR al encolar correo de sanción a {empleado_sancionado.email}: {e}")
 
 @extend_schema(tags=['Sanciones'])
 class MisSancionesView(generics.ListAPIView):
@@ -96,7 +104,8 @@ class MisSancionesView(generics.ListAPIView):
         try:
             # Buscamos el empleado asociado al usuario autenticado
             empleado = Empleado.objects.get(user=user)
-            return SancionEmpleado.objects.filter(id_empl=empleado)
+            queryset = SancionEmpleado.objects.filter(id_empl=empleado).select_related('id_sancion')
+            return SancionEmpleadoSerializer.optimizar_consulta(queryset, self.request)
         except Empleado.DoesNotExist:
             # Si el usuario no tiene un perfil de empleado, no se devuelven sanciones.
             return SancionEmpleado.objects.none()
@@ -105,5 +114,10 @@ class MisSancionesView(generics.ListAPIView):
         queryset = self.get_queryset()
         if not queryset.exists():
             return Response({"detail": "No se encontraron sanciones para tu usuario."}, status=status.HTTP_200_OK)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
@@ -0,0 +1,85 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError, IntegrityError, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .models import TokenActividad
+
+logger = logging.getLogger(__name__)
+
+# Actividad de tokens pendiente de escribir, por proceso: {key: momento}. Cada token se
+# anota a lo sumo una vez por TOKEN_ACTIVIDAD_INTERVALO y las anotaciones se escriben
+# juntas, en una sola sentencia, al terminar una petición cada TOKEN_ACTIVIDAD_VOLCADO.
+_lock = threading.Lock()
+_pendientes = {}
+_ultimo_registro = {}
+_ultimo_volcado = time.monotonic()
+
+
+def _segundos(nombre, defecto):
+    return getattr(settings, nombre, defecto).total_seconds()
+
+
+def registrar_actividad(key, momento=None):
+    """
+    Anota que el token se usó en `momento`. Devuelve True si la anotación se hizo y
+    False si el token ya se había anotado dentro del intervalo (no hace falta escribir).
+    """
+    intervalo = _segundos('TOKEN_ACTIVIDAD_INTERVALO', timedelta(minutes=5))
+    ahora = time.monotonic()
+    with _lock:
+        anterior = _ultimo_registro.get(key)
+        if anterior is not None and ahora - anterior < intervalo:
+            return False
+        _ultimo_registro[key] = ahora
+        _pendientes[key] = momento or timezone.now()
+    return True
+
+
+def volcar_actividad():
+    """
+    Escribe la actividad pendiente con un único INSERT ... ON CONFLICT DO UPDATE.
+    Devuelve la cantidad de tokens actualizados.
+    """
+    global _ultimo_volcado
+    intervalo = _segundos('TOKEN_ACTIVIDAD_INTERVALO', timedelta(minutes=5))
+    with _lock:
+        pendientes = dict(_pendientes)
+        _pendientes.clear()
+        _ultimo_volcado = time.monotonic()
+        # Lo anotado hace más de un intervalo ya no frena nuevas anotaciones.
+        for key in [key for key, anotado in _ultimo_registro.items() if _ultimo_volcado - anotado >= intervalo]:
+            del _ultimo_registro[key]
+    if not pendientes:
+        return 0
+
+    # Los tokens borrados mientras tanto (login, expiración) se descartan.
+    vigentes = set(Token.objects.filter(key__in=pendientes).values_list('key', flat=True))
+    filas = [TokenActividad(token_id=key, ultima_actividad=pendientes[key]) for key in vigentes]
+    try:
+        with transaction.atomic():
+            TokenActividad.objects.bulk_create(
+                filas, update_conflicts=True, unique_fields=['token'], update_fields=['ultima_actividad'],
+            )
+    except (IntegrityError, DatabaseError) as e:
+        # Perder una actualización solo adelanta la expiración en a lo sumo un intervalo.
+        logger.warning(f"No se pudo registrar la actividad de {len(filas)} tokens: {e}")
+        return 0
+    return len(filas)
+
+
+@receiver(request_finished)
+def volcar_actividad_pendiente(sender, **kwargs):
+    # request_finished se emite cuando ya se envió la respuesta: la escritura no la demora.
+    if not _pendientes:
+        return
+    if time.monotonic() - _ultimo_volcado < _segundos('TOKEN_ACTIVIDAD_VOLCADO', timedelta(seconds=30)):
+        return
+    volcar_actividad()
@@ -1,28 +1,197 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.authtoken.models import Token
+from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
 from django.conf import settings
 
+from .actividad import registrar_actividad
+from .models import TokenActividad
+from .roles import recordar_grupos
+
+
+class CacheTokens:
+    """
+    Cache LRU en memoria del proceso de los tokens ya validados, con vencimiento corto.
+
+    La clave es el sha256 del token (el token en claro no queda en memoria como clave) y
+    el valor guarda lo necesario para armar request.user sin ir a la base: los campos
+    del usuario, los nombres de sus grupos, la fecha de creación del token y su última
+    actividad conocida.
+    """
+
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.invalidaciones = 0
+
+    @staticmethod
+    def clave(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def obtener(self, key):
+        clave = self.clave(key)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada['vence'] <= time.monotonic():
+                if entrada is not None:
+                    del self._entradas[clave]
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada
+
+    def guardar(self, key, user, grupos, creado, actividad):
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        entrada = {
+            'user_id': user.pk,
+            'campos': {campo.attname: getattr(user, campo.attname) for campo in User._meta.concrete_fields},
+            'grupos': frozenset(grupos),
+            'creado': creado,
+            'actividad': actividad,
+            'vence': time.monotonic() + self.ttl,
+        }
+        clave = self.clave(key)
+        with self._lock:
+            self._entradas[clave] = entrada
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.maxsize:
+                self._entradas.popitem(last=False)
+                self.desalojos += 1
+
+    def actualizar_actividad(self, key, momento):
+        with self._lock:
+            entrada = self._entradas.get(self.clave(key))
+            if entrada is not None:
+                entrada['actividad'] = max(entrada['actividad'], momento)
+
+    def invalidar_token(self, key):
+        with self._lock:
+            if self._entradas.pop(self.clave(key), None) is not None:
+                self.invalidaciones += 1
+
+    def invalidar_usuarios(self, *user_ids):
+        user_ids = set(user_ids)
+        with self._lock:
+            claves = [clave for clave, entrada in self._entradas.items() if entrada['user_id'] in user_ids]
+            for clave in claves:
+                del self._entradas[clave]
+            self.invalidaciones += len(claves)
+
+    def limpiar(self):
+        with self._lock:
+            self.invalidaciones += len(self._entradas)
+            self._entradas.clear()
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'tamano_maximo': self.maxsize,
+                'ttl_segundos': self.ttl,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else None,
+                'desalojos': self.desalojos,
+                'invalidaciones': self.invalidaciones,
+            }
+
+
+cache_tokens = CacheTokens(
+    ttl=getattr(settings, 'TOKEN_CACHE_TTL', 30),
+    maxsize=getattr(settings, 'TOKEN_CACHE_MAXSIZE', 1000),
+)
+
+
+def _desde_cache(key, entrada):
+    # Se arman User y Token nuevos en cada petición, como si vinieran de la base: así
+    # nada de lo que una vista memorice en request.user se comparte con otras peticiones.
+    user = User(**entrada['campos'])
+    user._state.adding = False
+    user._state.db = 'default'
+    recordar_grupos(user, entrada['grupos'])
+    token = Token(key=key, user_id=user.pk, created=entrada['creado'])
+    token._state.adding = False
+    token._state.db = 'default'
+    token.user = user
+    return user, token
+
+
+def _ultima_actividad(token):
+    try:
+        return max(token.created, token.actividad.ultima_actividad)
+    except TokenActividad.DoesNotExist:
+        return token.created
+
 
 class ExpiringTokenAuthentication(TokenAuthentication):
     """
     Extiende la autenticación por token para añadir un tiempo de expiración.
+
+    Los tokens validados se guardan unos segundos en cache_tokens (TOKEN_CACHE_TTL) para
+    no leer token, usuario y grupos de la base en cada petición. La expiración se
+    comprueba igual en cada petición.
+
+    La expiración es deslizante: TOKEN_LIFETIME se cuenta desde el último uso del token
+    (TokenActividad). El uso se anota a lo sumo una vez por TOKEN_ACTIVIDAD_INTERVALO y
+    se escribe en lotes (ver usuarios/actividad.py), no en cada petición.
     """
     def authenticate_credentials(self, key):
-        # Llama al método original para obtener el usuario y el token
-        user, token = super().authenticate_credentials(key)
+        entrada = cache_tokens.obtener(key)
+        if entrada is not None:
+            self._verificar_vigencia(key, entrada['actividad'])
+            user, token = _desde_cache(key, entrada)
+            if not user.is_active:
+                raise AuthenticationFailed('Usuario inactivo o eliminado.')
+            self._registrar_uso(key)
+            return (user, token)
+
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user', 'actividad').get(key=key)
+        except model.DoesNotExist:
+            raise AuthenticationFailed('Token inválido.')
+        user = token.user
+        if not user.is_active:
+            raise AuthenticationFailed('Usuario inactivo o eliminado.')
 
         # Comprueba si el token ha expirado
+        actividad = _ultima_actividad(token)
+        self._verificar_vigencia(key, actividad, token)
+
+        grupos = frozenset(user.groups.values_list('name', flat=True))
+        cache_tokens.guardar(key, user, grupos, token.created, actividad)
+        recordar_grupos(user, grupos)
+        self._registrar_uso(key)
+        return (user, token)
+
+    def _registrar_uso(self, key):
+        ahora = timezone.now()
+        if registrar_actividad(key, ahora):
+            cache_tokens.actualizar_actividad(key, ahora)
+
+    def _verificar_vigencia(self, key, ultima_actividad, token=None):
         token_lifetime = getattr(settings, 'TOKEN_LIFETIME', timedelta(days=1))
 
-        if token.created < timezone.now() - token_lifetime:
+        if ultima_actividad < timezone.now() - token_lifetime:
             # El token ha expirado, lo eliminamos y lanzamos un error
-            token.delete()
+            if token is not None:
+                token.delete()
+            else:
+                self.get_model().objects.filter(key=key).delete()
+            cache_tokens.invalidar_token(key)
             raise AuthenticationFailed('El token ha expirado.')
-
-        # Si se quiere que el token se renueve con cada petición (sliding window)
-        # token.created = timezone.now()
-        # token.save()
-
-        return (user, token)
\ No newline at end of file
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('authtoken', '0004_alter_tokenproxy_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenActividad',
+            fields=[
+                ('token', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='actividad', serialize=False, to='authtoken.token')),
+                ('ultima_actividad', models.DateTimeField()),
+            ],
+        ),
+    ]
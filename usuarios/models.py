@@ -1,3 +1,15 @@
 from django.db import models
+from rest_framework.authtoken.models import Token
 
-# Create your models here.
+
+class TokenActividad(models.Model):
+    """
+    Último uso registrado de un token. La expiración del token se cuenta desde acá
+    (o desde su creación si todavía no hay registro), así la sesión se mantiene viva
+    mientras se use. Se actualiza en lotes desde usuarios/actividad.py.
+    """
+    token = models.OneToOneField(Token, on_delete=models.CASCADE, primary_key=True, related_name='actividad')
+    ultima_actividad = models.DateTimeField()
+
+    def __str__(self):
+        return f"Actividad del token de {self.token.user_id}: {self.ultima_actividad}"
@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.core.cache import caches
+
+ADMINISTRADOR = 'Administrador'
+CONSULTOR = 'Consultor'
+EMPLEADO = 'Empleado'
+
+# Atributo del objeto usuario donde se memorizan sus grupos. request.user es un objeto
+# nuevo en cada petición, así que la memoria dura lo que dura la petición.
+_ATRIBUTO = '_nombres_grupos'
+
+
+def _cache_roles():
+    return caches[getattr(settings, 'ROLES_CACHE_ALIAS', 'roles')]
+
+
+def _clave(user_id):
+    return f"roles_usuario:{user_id}"
+
+
+def grupos_de(user):
+    """
+    Devuelve los nombres de los grupos del usuario como frozenset.
+
+    Se consultan una sola vez por petición y, si ROLES_CACHE_TIMEOUT es mayor que cero,
+    se reutilizan entre peticiones desde el cache de roles (se invalida al cambiar los
+    grupos del usuario, ver usuarios/signals.py).
+    """
+    if user is None or not user.is_authenticated:
+        return frozenset()
+
+    grupos = getattr(user, _ATRIBUTO, None)
+    if grupos is not None:
+        return grupos
+
+    timeout = getattr(settings, 'ROLES_CACHE_TIMEOUT', 60)
+    if timeout:
+        grupos = _cache_roles().get(_clave(user.pk))
+    if grupos is None:
+        grupos = frozenset(user.groups.values_list('name', flat=True))
+        if timeout:
+            _cache_roles().set(_clave(user.pk), grupos, timeout)
+
+    setattr(user, _ATRIBUTO, grupos)
+    return grupos
+
+
+def recordar_grupos(user, grupos):
+    """Asocia al objeto usuario sus grupos ya conocidos (p. ej. traídos del cache de tokens)."""
+    setattr(user, _ATRIBUTO, frozenset(grupos))
+
+
+def tiene_rol(user, *nombres):
+    """True si el usuario pertenece a alguno de los grupos indicados."""
+    return not grupos_de(user).isdisjoint(nombres)
+
+
+def es_admin(user):
+    """Superusuario o miembro del grupo Administrador."""
+    return bool(user and user.is_authenticated) and (user.is_superuser or tiene_rol(user, ADMINISTRADOR))
+
+
+def es_consultor(user):
+    return tiene_rol(user, CONSULTOR)
+
+
+def es_empleado(user):
+    return tiene_rol(user, EMPLEADO)
+
+
+def es_admin_o_consultor(user):
+    return es_admin(user) or es_consultor(user)
+
+
+def invalidar_roles(*user_ids):
+    """Descarta los grupos cacheados de los usuarios indicados."""
+    if user_ids:
+        _cache_roles().delete_many([_clave(user_id) for user_id in user_ids])
+
+
+def invalidar_todos_los_roles():
+    """Descarta los grupos cacheados de todos los usuarios (p. ej. al renombrar un grupo)."""
+    _cache_roles().clear()
@@ -0,0 +1,56 @@
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import cache_tokens
+from .roles import invalidar_roles, invalidar_todos_los_roles
+
+
+def _invalidar_usuarios(*user_ids):
+    invalidar_roles(*user_ids)
+    cache_tokens.invalidar_usuarios(*user_ids)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidar_roles_por_cambio_de_grupos(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Invalida el cache de roles (y los tokens cacheados, que guardan los grupos) cuando
+    cambian los grupos de un usuario, tanto desde el usuario (user.groups.add) como
+    desde el grupo (group.user_set.add).
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if not reverse:
+        _invalidar_usuarios(instance.pk)
+    elif action == 'pre_clear':
+        # Tras vaciar el grupo ya no se sabe qué usuarios tenía: se capturan antes.
+        _invalidar_usuarios(*instance.user_set.values_list('pk', flat=True))
+    elif pk_set:
+        _invalidar_usuarios(*pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidar_roles_por_cambio_en_grupo(sender, instance, **kwargs):
+    # Un grupo renombrado o eliminado puede afectar a cualquier usuario.
+    invalidar_todos_los_roles()
+    cache_tokens.limpiar()
+
+
+@receiver(post_save, sender=User)
+def invalidar_tokens_de_usuario_modificado(sender, instance, created, **kwargs):
+    # Los tokens cacheados guardan una copia de los campos del usuario (is_active, etc.).
+    if not created:
+        cache_tokens.invalidar_usuarios(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def invalidar_roles_de_usuario_eliminado(sender, instance, **kwargs):
+    _invalidar_usuarios(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def invalidar_token_eliminado(sender, instance, **kwargs):
+    # Cubre el login (que borra el token anterior) y la expiración.
+    cache_tokens.invalidar_token(instance.key)
@@ -11,5 +11,6 @@ urlpatterns = [
     # path('', include(router.urls)),
     path('login/', views.login, name='login'),
     path('register/', views.register, name='register'),
-    path('profile/', views.profile, name='profile')
+    path('profile/', views.profile, name='profile'),
+    path('cache-tokens/', views.estadisticas_cache_tokens, name='estadisticas-cache-tokens'),
 ]
\ No newline at end of file
@@ -9,6 +9,8 @@ from rest_framework.permissions import AllowAny
 import logging
 from drf_spectacular.utils import extend_schema
 from empleados.utils import get_client_ip
+from .authentication import cache_tokens
+from .roles import es_admin
 
 
 # Create your views here.
@@ -72,4 +74,16 @@ def profile(request):
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+@extend_schema(tags=['Usuarios'])
+@api_view(['GET'])
+def estadisticas_cache_tokens(request):
+    """
+    Devuelve el estado del cache de tokens de este proceso: entradas, aciertos, fallos,
+    tasa de aciertos, desalojos e invalidaciones. Solo para administradores.
+    """
+    if not es_admin(request.user):
+        return Response({'error': 'No tiene permiso para realizar esta acción.'}, status=status.HTTP_403_FORBIDDEN)
+    return Response(cache_tokens.estadisticas(), status=status.HTTP_200_OK)
+
+
 # Create your views here.